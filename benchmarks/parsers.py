@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+#
+# vim: expandtab shiftwidth=4 softtabstop=4
+#
+"""Microbenchmarks of the response parsers
+
+Feeds PROPFIND multistatus and OCS share payloads of various sizes through
+the parsing stages of the client, without any network:
+
+- dav: XML parsing, _strip_dav_path() with parse.unquote() for every href,
+  FileInfo construction, _parse_dav_element() and the whole
+  _parse_dav_response()
+- shares: _parse_ocs_response(), _xml_to_dict() of every share, ShareInfo
+  construction and the whole _parse_shares(), in XML and JSON
+
+Both benchmarks run with every available XML backend. Every stage reports
+the parsed entries per second and by how much it raised the peak resident
+memory (ru_maxrss) of a fresh process which prepared its input and ran it
+once, so that the trees of lxml are counted too. The stage can reuse
+memory freed while preparing its input, so small values are lower bounds.
+The memory is not measured on Windows, which lacks the resource module.
+Payloads are generated, or read from files recorded from a real server
+with --dav-payload and --ocs-payload. Results are written and compared
+like with benchmarks/suite.py::
+
+    python benchmarks/parsers.py --sizes 1000,100000,1000000 --output a.json
+
+Usage: python benchmarks/parsers.py [--sizes N,N,...] [--repeat N]
+       [--filter NAME] [--dav-payload FILE] [--ocs-payload FILE]
+       [--output FILE] [--compare FILE] [--threshold PERCENT]
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import owncloud  # noqa: E402
+from suite import clock, compare, get_commit, get_key, result  # noqa: E402
+
+DAV_PATH = '/remote.php/dav/files/admin'
+
+# ru_maxrss is in bytes on macOS and in KiB elsewhere
+MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+DAV_FILE = (
+    '<d:response>'
+    '<d:href>' + DAV_PATH + '/bench/d%(dir)i/file%%20%(index)i.txt</d:href>'
+    '<d:propstat><d:prop>'
+    '<d:getlastmodified>Mon, 01 Jun 2020 10:00:00 GMT</d:getlastmodified>'
+    '<d:getcontentlength>%(index)i</d:getcontentlength>'
+    '<d:resourcetype/>'
+    '<d:getetag>&quot;5ed4d1c0%(index)08x&quot;</d:getetag>'
+    '<d:getcontenttype>text/plain</d:getcontenttype>'
+    '</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat>'
+    '</d:response>'
+)
+
+DAV_DIR = (
+    '<d:response>'
+    '<d:href>' + DAV_PATH + '/bench/d%(dir)i/%%E6%%96%%87%%E4%%BB%%B6%(index)i/'
+    '</d:href>'
+    '<d:propstat><d:prop>'
+    '<d:getlastmodified>Mon, 01 Jun 2020 10:00:00 GMT</d:getlastmodified>'
+    '<d:resourcetype><d:collection/></d:resourcetype>'
+    '<d:quota-used-bytes>%(index)i</d:quota-used-bytes>'
+    '<d:quota-available-bytes>-3</d:quota-available-bytes>'
+    '<d:getetag>&quot;5ed4d1c0%(index)08x&quot;</d:getetag>'
+    '</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat>'
+    '</d:response>'
+)
+
+SHARE = {
+    'share_type': 3,
+    'uid_owner': 'admin',
+    'displayname_owner': 'admin',
+    'permissions': 1,
+    'stime': 1590000000,
+    'parent': None,
+    'expiration': None,
+    'uid_file_owner': 'admin',
+    'displayname_file_owner': 'admin',
+    'item_type': 'file',
+    'mimetype': 'text/plain',
+    'storage_id': 'home::admin',
+    'storage': 1,
+    'file_parent': 1,
+    'share_with': None,
+    'share_with_displayname': None,
+    'name': None,
+    'mail_send': 0
+}
+
+
+def make_multistatus(entries):
+    """Returns a multistatus body with one directory every ten entries"""
+    body = [
+        '<?xml version="1.0"?>'
+        '<d:multistatus xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns">'
+    ]
+    for index in range(entries):
+        template = DAV_DIR if index % 10 == 0 else DAV_FILE
+        body.append(template % {'index': index, 'dir': index // 1000})
+    body.append('</d:multistatus>')
+    return ''.join(body).encode('utf-8')
+
+
+def make_shares(entries):
+    """Returns the shares of a share listing"""
+    shares = []
+    for index in range(entries):
+        share = dict(SHARE)
+        share.update({
+            'id': index + 1,
+            'token': 'tok%012i' % index,
+            'path': '/bench/file %i.txt' % index,
+            'file_target': '/file %i.txt' % index,
+            'item_source': index + 100,
+            'file_source': index + 100,
+            'url': 'https://cloud.example.com/index.php/s/tok%012i' % index
+        })
+        shares.append(share)
+    return shares
+
+
+def make_ocs_xml(shares):
+    body = [
+        '<?xml version="1.0"?><ocs><meta><status>ok</status>'
+        '<statuscode>100</statuscode><message/></meta><data>'
+    ]
+    for share in shares:
+        body.append('<element>')
+        for key, value in share.items():
+            if value is None:
+                body.append('<%s/>' % key)
+            else:
+                body.append('<%s>%s</%s>' % (key, value, key))
+        body.append('</element>')
+    body.append('</data></ocs>')
+    return ''.join(body).encode('utf-8')
+
+
+def make_ocs_json(shares):
+    return json.dumps({'ocs': {
+        'meta': {'status': 'ok', 'statuscode': 100, 'message': None},
+        'data': shares
+    }}).encode('utf-8')
+
+
+def make_response(content, status_code):
+    res = requests.Response()
+    res.status_code = status_code
+    res._content = content
+    return res
+
+
+def measure(func, repeat):
+    """Returns the durations of the runs of a function"""
+    samples = []
+    for _ in range(repeat):
+        start = clock()
+        func()
+        samples.append(clock() - start)
+    return samples
+
+
+# started by MemoryProbe, runs the command lines it reads from stdin and
+# writes their output to stdout
+LAUNCHER = """
+import json, subprocess, sys
+for line in iter(sys.stdin.readline, ''):
+    sys.stdout.write(subprocess.check_output(json.loads(line)).decode('ascii'))
+    sys.stdout.flush()
+"""
+
+
+class MemoryProbe(object):
+    """Runs stages once in fresh processes to measure their peak resident
+    memory
+
+    On Linux a process starts with the peak resident memory of the process
+    which started it, so the measured processes are started by a small
+    launcher process instead of the benchmark, which holds the payloads.
+    The probe must be created before the payloads.
+    """
+
+    def __init__(self):
+        self.launcher = None
+        if resource is not None:
+            self.launcher = subprocess.Popen(
+                [sys.executable, '-c', LAUNCHER],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE
+            )
+
+    def measure(self, spec):
+        """Returns by how many bytes a stage raised the peak resident
+        memory of a fresh process, or None without the resource module
+
+        :param spec: dictionary of the benchmark, stage, payload file, XML
+            backend and OCS format, see :func:`run_memory_stage`
+        """
+        if self.launcher is None:
+            return None
+        command = [sys.executable, os.path.abspath(__file__),
+                   '--measure-memory', json.dumps(spec)]
+        self.launcher.stdin.write((json.dumps(command) + '\n').encode('ascii'))
+        self.launcher.stdin.flush()
+        return json.loads(self.launcher.stdout.readline().decode('ascii'))
+
+    def close(self):
+        if self.launcher is not None:
+            self.launcher.stdin.close()
+            self.launcher.wait()
+
+
+def run_memory_stage(spec):
+    """Prepares the input of a stage, runs it once and returns by how many
+    bytes it raised the peak resident memory of the process
+    """
+    with open(spec['payload'], 'rb') as f:
+        content = f.read()
+    client = make_client(spec['backend'], spec['format'])
+    stages = dav_stages if spec['bench'] == 'dav' else share_stages
+    func = dict(stages(client, content))[spec['stage']]()
+    gc.collect()
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    func()
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (after - before) * MAXRSS_UNIT
+
+
+def get_backends():
+    """Returns the names of the available XML backends"""
+    backends = ['etree']
+    try:
+        owncloud.LxmlBackend()
+        backends.append('lxml')
+    except ImportError:
+        pass
+    return backends
+
+
+def make_client(backend, ocs_format='xml'):
+    client = owncloud.Client('http://localhost/', xml_backend=backend,
+                             ocs_format=ocs_format)
+    client._davpath = DAV_PATH
+    return client
+
+
+def dav_stages(client, content):
+    """Returns the stages of the DAV benchmark as (name, prepare) pairs,
+    prepare builds the input of the stage and returns the function to
+    measure
+    """
+    response = make_response(content, 207)
+
+    def prepare_strip():
+        hrefs = [element.find('{DAV:}href').text
+                 for element in client._xml.fromstring(content)]
+        return lambda: [
+            owncloud.owncloud.parse.unquote(client._strip_dav_path(href))
+            for href in hrefs
+        ]
+
+    def prepare_file_info():
+        entries = []
+        for element in client._xml.fromstring(content):
+            attributes = dict((prop.tag, prop.text) for prop in element.find(
+                '{DAV:}propstat/{DAV:}prop'
+            ))
+            path = client._parse_dav_element(element).path
+            entries.append((path, attributes))
+        return lambda: [
+            owncloud.FileInfo(path, 'dir' if path[-1] == '/' else 'file',
+                              attributes)
+            for path, attributes in entries
+        ]
+
+    def prepare_element():
+        elements = list(client._xml.fromstring(content))
+        return lambda: [
+            client._parse_dav_element(element) for element in elements
+        ]
+
+    return [
+        ('dav xml', lambda: lambda: client._xml.fromstring(content)),
+        ('dav strip+unquote', prepare_strip),
+        ('dav FileInfo', prepare_file_info),
+        ('dav element', prepare_element),
+        ('dav response',
+         lambda: lambda: client._parse_dav_response(response))
+    ]
+
+
+def share_elements(client, response):
+    """Returns the shares of a listing as elements, or as the decoded
+    objects for JSON which the client parses without an element view
+    """
+    ocs = client._parse_ocs_response(response)
+    if client._ocs_format == 'json':
+        return ocs.tree.get('data')
+    return list(ocs.data.iter('element'))
+
+
+def share_stages(client, content):
+    """Returns the stages of the shares benchmark like
+    :func:`dav_stages`
+    """
+    response = make_response(content, 200)
+
+    def prepare_to_dict():
+        elements = share_elements(client, response)
+        return lambda: [client._xml_to_dict(element) for element in elements]
+
+    def prepare_share_info():
+        dicts = [client._xml_to_dict(element)
+                 for element in share_elements(client, response)]
+        return lambda: [owncloud.ShareInfo(share) for share in dicts]
+
+    return [
+        ('shares ocs', lambda: lambda: client._parse_ocs_response(response)),
+        ('shares xml_to_dict', prepare_to_dict),
+        ('shares ShareInfo', prepare_share_info),
+        ('shares parse', lambda: lambda: client._parse_shares(
+            client._parse_ocs_response(response)
+        ))
+    ]
+
+
+def run_stages(bench, stages, params, count, spec, options, probe):
+    """Measures the stages of a benchmark and yields their results
+
+    :param spec: payload file, XML backend and OCS format of the stages
+    :param probe: :class:`MemoryProbe` measuring the memory of the stages
+    """
+    for stage, prepare in stages:
+        if options.filter and options.filter not in stage:
+            continue
+        samples = measure(prepare(), options.repeat)
+        res = result(stage, params, 'entries/s',
+                     [count / duration for duration in samples])
+        res['peak_rss'] = probe.measure(dict(spec, bench=bench, stage=stage))
+        yield res
+
+
+def write_payload(content):
+    """Writes a payload to a temporary file for the memory measurements
+    and returns its path
+    """
+    fd, path = tempfile.mkstemp(suffix='.payload')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def bench_dav(content, options, probe):
+    payload = write_payload(content)
+    try:
+        for backend in get_backends():
+            client = make_client(backend)
+            count = len(client._xml.fromstring(content))
+            params = {'backend': backend, 'entries': count}
+            spec = {'payload': payload, 'backend': backend, 'format': 'xml'}
+            for res in run_stages('dav', dav_stages(client, content), params,
+                                  count, spec, options, probe):
+                yield res
+    finally:
+        os.remove(payload)
+
+
+def bench_shares(contents, options, probe):
+    for ocs_format, content in contents:
+        payload = write_payload(content)
+        try:
+            # the JSON format does not use the XML backend
+            backends = get_backends() if ocs_format == 'xml' else ['etree']
+            for backend in backends:
+                client = make_client(backend, ocs_format)
+                count = len(share_elements(client,
+                                           make_response(content, 200)))
+                params = {'format': ocs_format, 'entries': count}
+                if ocs_format == 'xml':
+                    params['backend'] = backend
+                spec = {'payload': payload, 'backend': backend,
+                        'format': ocs_format}
+                for res in run_stages('shares', share_stages(client, content),
+                                      params, count, spec, options, probe):
+                    yield res
+        finally:
+            os.remove(payload)
+
+
+def print_result(res):
+    peak = res['peak_rss']
+    print('%-60s %12.0f %s %10s' % (
+        get_key(res), res['best'], res['unit'],
+        '%.1f MiB' % (peak / 1048576.0) if peak is not None else '-'
+    ))
+    sys.stdout.flush()
+
+
+def run(options):
+    results = []
+
+    def add(generator):
+        for res in generator:
+            print_result(res)
+            results.append(res)
+
+    probe = MemoryProbe()
+    try:
+        if options.dav_payload or options.ocs_payload:
+            if options.dav_payload:
+                with open(options.dav_payload, 'rb') as f:
+                    add(bench_dav(f.read(), options, probe))
+            if options.ocs_payload:
+                with open(options.ocs_payload, 'rb') as f:
+                    content = f.read()
+                ocs_format = 'json' if content.lstrip()[:1] == b'{' else 'xml'
+                add(bench_shares([(ocs_format, content)], options, probe))
+        else:
+            for size in options.sizes:
+                add(bench_dav(make_multistatus(size), options, probe))
+                shares = make_shares(size)
+                add(bench_shares([
+                    ('xml', make_ocs_xml(shares)),
+                    ('json', make_ocs_json(shares))
+                ], options, probe))
+    finally:
+        probe.close()
+
+    return {
+        'commit': get_commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': {
+            'sizes': options.sizes,
+            'repeat': options.repeat
+        },
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the response parsers'
+    )
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        type=lambda value: [int(v) for v in value.split(',')],
+                        help='comma separated numbers of entries')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of runs of every stage')
+    parser.add_argument('--filter',
+                        help='only run the stages containing this name')
+    parser.add_argument('--dav-payload',
+                        help='recorded multistatus body to parse instead')
+    parser.add_argument('--ocs-payload',
+                        help='recorded share listing body to parse instead')
+    parser.add_argument('--output', help='file to write the results to')
+    parser.add_argument('--compare', help='results of a previous run')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='change in percent reported as regression')
+    parser.add_argument('--measure-memory', help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.measure_memory:
+        # child process of measure_memory()
+        print(json.dumps(run_memory_stage(json.loads(options.measure_memory))))
+        return
+
+    report = run(options)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, options.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+#
+# vim: expandtab shiftwidth=4 softtabstop=4
+#
+"""End-to-end benchmarks of transfers, listings and OCS calls
+
+Runs the client against the in-process stand-in server of
+owncloud/test/server.py and measures:
+
+- upload throughput with put_file() by file size and chunk size
+- download throughput with get_file() by file size
+- PROPFIND listing rate with list() by tree size and depth
+- small file upload rate with put_directory()
+- latency of OCS calls
+- latency of calls with the debug logging of the client off and on
+
+The measured times include the work of the stand-in server, which does
+not change between commits, so results of different commits are
+comparable when run on the same machine. Every benchmark is repeated and
+reports its best and median value. Results are written as JSON, and
+compared with the results of a previous run with --compare::
+
+    python benchmarks/suite.py --output before.json
+    (apply changes)
+    python benchmarks/suite.py --output after.json --compare before.json
+
+With --compare, results worse than the baseline by more than --threshold
+percent are reported as regressions and the exit status is 1.
+
+Usage: python benchmarks/suite.py [--quick] [--repeat N] [--filter NAME]
+       [--latency SECONDS] [--bandwidth BYTES] [--output FILE]
+       [--compare FILE] [--threshold PERCENT]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import owncloud  # noqa: E402
+from owncloud.test.server import Conditions, StandInServer  # noqa: E402
+
+KIB = 1024
+MIB = 1024 * 1024
+
+# clock for all measurements, Python 2 has no perf_counter
+clock = getattr(time, 'perf_counter', time.time)
+
+USER = 'admin'
+PASSWORD = 'admin'
+
+FULL = {
+    'transfer_sizes': [64 * KIB, MIB, 16 * MIB, 64 * MIB],
+    'chunk_sizes': [MIB, 10 * MIB],
+    'listing_sizes': [100, 1000, 10000],
+    'small_files': 200,
+    'ocs_calls': 50
+}
+
+QUICK = {
+    'transfer_sizes': [64 * KIB, MIB, 4 * MIB],
+    'chunk_sizes': [MIB, 10 * MIB],
+    'listing_sizes': [100, 1000],
+    'small_files': 50,
+    'ocs_calls': 20
+}
+
+
+def make_data(size, seed=0):
+    """Returns reproducible pseudo random bytes"""
+    rng = random.Random(seed)
+    block = bytearray(rng.getrandbits(8) for _ in range(min(size, 64 * KIB)))
+    data = bytes(block) * (size // len(block) + 1)
+    return data[:size]
+
+
+def measure(func, repeat, setup=None):
+    """Calls a function repeatedly and returns the duration of every call
+
+    :param func: function to measure, called with the result of setup
+    :param repeat: number of calls
+    :param setup: function called before every measured call, not measured
+    """
+    samples = []
+    for index in range(repeat):
+        arg = setup(index) if setup is not None else index
+        start = clock()
+        func(arg)
+        samples.append(clock() - start)
+    return samples
+
+
+def result(name, params, unit, values, higher_is_better=True):
+    """Returns the result of a benchmark from the values of its runs"""
+    ordered = sorted(values)
+    return {
+        'name': name,
+        'params': params,
+        'unit': unit,
+        'higher_is_better': higher_is_better,
+        'best': ordered[-1] if higher_is_better else ordered[0],
+        'median': ordered[len(ordered) // 2],
+        'samples': values
+    }
+
+
+def bench_upload(client, server, options, work_dir):
+    for size in options['transfer_sizes']:
+        local_file = os.path.join(work_dir, 'upload.bin')
+        with open(local_file, 'wb') as f:
+            f.write(make_data(size))
+        for chunk_size in options['chunk_sizes']:
+            samples = measure(
+                lambda index: client.put_file(
+                    '/bench/upload-%i' % index, local_file,
+                    chunk_size=chunk_size
+                ),
+                options['repeat']
+            )
+            yield result(
+                'upload', {'size': size, 'chunk_size': chunk_size}, 'MiB/s',
+                [float(size) / MIB / duration for duration in samples]
+            )
+
+
+def bench_download(client, server, options, work_dir):
+    local_file = os.path.join(work_dir, 'download.bin')
+    for size in options['transfer_sizes']:
+        server.add_file(USER, '/bench/download-%i' % size, make_data(size))
+        samples = measure(
+            lambda index: client.get_file(
+                '/bench/download-%i' % size, local_file
+            ),
+            options['repeat']
+        )
+        yield result(
+            'download', {'size': size}, 'MiB/s',
+            [float(size) / MIB / duration for duration in samples]
+        )
+
+
+def bench_listing(client, server, options, work_dir):
+    for entries in options['listing_sizes']:
+        # flat directory, listed with depth 1
+        path = '/bench/flat-%i' % entries
+        for index in range(entries):
+            server.add_file(USER, '%s/file%06i.txt' % (path, index), b'x')
+        samples = measure(lambda index: client.list(path), options['repeat'])
+        yield result(
+            'listing', {'entries': entries, 'depth': '1'}, 'entries/s',
+            [entries / duration for duration in samples]
+        )
+
+        # tree of ten directories, listed with depth infinity
+        path = '/bench/tree-%i' % entries
+        for index in range(entries):
+            server.add_file(
+                USER, '%s/dir%i/file%06i.txt' % (path, index % 10, index),
+                b'x'
+            )
+        samples = measure(
+            lambda index: client.list(path, depth='infinity'),
+            options['repeat']
+        )
+        total = entries + 10
+        yield result(
+            'listing', {'entries': entries, 'depth': 'infinity'},
+            'entries/s', [total / duration for duration in samples]
+        )
+
+
+def bench_put_directory(client, server, options, work_dir):
+    count = options['small_files']
+    local_dir = os.path.join(work_dir, 'small')
+    os.mkdir(local_dir)
+    for index in range(count):
+        with open(os.path.join(local_dir, 'file%04i.txt' % index), 'wb') as f:
+            f.write(make_data(KIB, index))
+
+    def setup(index):
+        target = '/bench/put-directory-%i' % index
+        client.mkdir(target)
+        return target
+
+    samples = measure(
+        lambda target: client.put_directory(target, local_dir),
+        options['repeat'], setup
+    )
+    yield result(
+        'put_directory', {'files': count, 'size': KIB}, 'files/s',
+        [count / duration for duration in samples]
+    )
+
+
+def bench_ocs(client, server, options, work_dir):
+    calls = options['ocs_calls']
+    client.put_file_contents('/bench/shared.txt', b'x')
+    client.share_file_with_link('/bench/shared.txt')
+    operations = [
+        ('get_config', lambda: client.get_config()),
+        ('get_user', lambda: client.get_user(USER)),
+        ('get_shares', lambda: client.get_shares('/bench/shared.txt')),
+        ('get_attribute', lambda: client.get_attribute('bench'))
+    ]
+    for name, call in operations:
+        def run(index):
+            for _ in range(calls):
+                call()
+
+        samples = measure(run, options['repeat'])
+        yield result(
+            'ocs', {'call': name}, 'ms',
+            [duration * 1000 / calls for duration in samples],
+            higher_is_better=False
+        )
+
+
+class _NullStream(object):
+    """Stream discarding what is written, so that the logging benchmark
+    measures the formatting of the messages but not the output
+    """
+
+    def write(self, data):
+        pass
+
+    def flush(self):
+        pass
+
+
+def bench_logging(client, server, options, work_dir):
+    calls = options['ocs_calls']
+    client.put_file_contents('/bench/logged.txt', b'x')
+    operations = [
+        ('file_info', lambda: client.file_info('/bench/logged.txt')),
+        ('get_file_contents',
+         lambda: client.get_file_contents('/bench/logged.txt')),
+        ('get_config', lambda: client.get_config())
+    ]
+    logger = logging.getLogger('owncloud')
+    level = logger.level
+    handler = logging.StreamHandler(_NullStream())
+    handler.setFormatter(logging.Formatter('%(name)s: %(message)s'))
+    try:
+        for logging_level in ('off', 'debug'):
+            if logging_level == 'debug':
+                logger.setLevel(logging.DEBUG)
+                logger.addHandler(handler)
+            for name, call in operations:
+                def run(index):
+                    for _ in range(calls):
+                        call()
+
+                samples = measure(run, options['repeat'])
+                yield result(
+                    'logging', {'call': name, 'level': logging_level}, 'ms',
+                    [duration * 1000 / calls for duration in samples],
+                    higher_is_better=False
+                )
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+
+
+BENCHMARKS = [
+    ('upload', bench_upload),
+    ('download', bench_download),
+    ('listing', bench_listing),
+    ('put_directory', bench_put_directory),
+    ('ocs', bench_ocs),
+    ('logging', bench_logging)
+]
+
+
+def get_commit():
+    """Returns the current git commit or None"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.STDOUT
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_key(res):
+    return res['name'] + ' ' + ' '.join(
+        '%s=%s' % item for item in sorted(res['params'].items())
+    )
+
+
+def run(args):
+    options = dict(QUICK if args.quick else FULL)
+    options['repeat'] = args.repeat
+    conditions = Conditions(latency=args.latency, bandwidth=args.bandwidth)
+    results = []
+    with StandInServer({USER: PASSWORD}, conditions=conditions) as server:
+        client = owncloud.Client(server.url)
+        client.login(USER, PASSWORD)
+        for name, bench in BENCHMARKS:
+            if args.filter and args.filter not in name:
+                continue
+            work_dir = tempfile.mkdtemp()
+            try:
+                client.mkdir('/bench')
+                for res in bench(client, server, options, work_dir):
+                    print('%-50s %12.2f %s' % (get_key(res), res['best'],
+                                               res['unit']))
+                    sys.stdout.flush()
+                    results.append(res)
+                client.delete('/bench')
+            finally:
+                shutil.rmtree(work_dir)
+        client.logout()
+
+    return {
+        'commit': get_commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': {
+            'quick': args.quick,
+            'repeat': args.repeat,
+            'latency': args.latency,
+            'bandwidth': args.bandwidth
+        },
+        'results': results
+    }
+
+
+def compare(report, baseline, threshold):
+    """Prints the changes against a baseline report
+
+    :returns: number of regressions
+    """
+    previous = dict((get_key(res), res) for res in baseline['results'])
+    regressions = 0
+    print('\nchanges against %s:' % (baseline.get('commit') or 'baseline'))
+    for res in report['results']:
+        key = get_key(res)
+        if key not in previous or not previous[key]['best']:
+            continue
+        change = (res['best'] - previous[key]['best']) / \
+            previous[key]['best'] * 100
+        if not res['higher_is_better']:
+            change = -change
+        regression = change < -threshold
+        regressions += regression
+        print('%-50s %+8.1f%%%s' % (
+            key, change, '  REGRESSION' if regression else ''
+        ))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the client against a stand-in server'
+    )
+    parser.add_argument('--quick', action='store_true',
+                        help='use smaller files and trees')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of runs of every benchmark')
+    parser.add_argument('--filter',
+                        help='only run the benchmarks containing this name')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='simulated latency per request in seconds')
+    parser.add_argument('--bandwidth', type=int, default=None,
+                        help='simulated bandwidth in bytes per second')
+    parser.add_argument('--output', help='file to write the results to')
+    parser.add_argument('--compare', help='results of a previous run')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='change in percent reported as regression')
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
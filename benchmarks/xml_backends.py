@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# vim: expandtab shiftwidth=4 softtabstop=4
+#
+"""Compares the parse throughput of the available XML backends
+
+Feeds a generated PROPFIND multistatus response through
+Client._parse_dav_response() with every available backend and prints the
+number of parsed entries per second.
+
+Usage: python benchmarks/xml_backends.py [entries] [repeat]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import owncloud  # noqa: E402
+
+DAV_PATH = '/remote.php/webdav'
+
+ENTRY = (
+    '<d:response>'
+    '<d:href>' + DAV_PATH + '/dir/file%%20%(index)i.txt</d:href>'
+    '<d:propstat><d:prop>'
+    '<d:getlastmodified>Mon, 01 Jun 2020 10:00:00 GMT</d:getlastmodified>'
+    '<d:getcontentlength>%(index)i</d:getcontentlength>'
+    '<d:resourcetype/>'
+    '<d:getetag>&quot;5ed4d1c0%(index)08x&quot;</d:getetag>'
+    '<d:getcontenttype>text/plain</d:getcontenttype>'
+    '<oc:fileid>%(index)i</oc:fileid>'
+    '</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat>'
+    '</d:response>'
+)
+
+
+def make_multistatus(entries):
+    """Returns a multistatus response body with the given number of entries"""
+    body = [
+        '<?xml version="1.0"?>'
+        '<d:multistatus xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns">'
+    ]
+    for index in range(entries):
+        body.append(ENTRY % {'index': index})
+    body.append('</d:multistatus>')
+    return ''.join(body).encode('utf-8')
+
+
+def bench(backend, content, entries, repeat):
+    """Returns the best throughput in entries per second"""
+    client = owncloud.Client('http://localhost/', xml_backend=backend)
+    client._davpath = DAV_PATH
+    res = requests.Response()
+    res.status_code = 207
+    res._content = content
+
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        items = client._parse_dav_response(res)
+        duration = time.time() - start
+        assert len(items) == entries
+        if best is None or duration < best:
+            best = duration
+    return entries / best
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    content = make_multistatus(entries)
+
+    backends = ['etree']
+    try:
+        owncloud.LxmlBackend()
+        backends.append('lxml')
+    except ImportError:
+        print('lxml is not installed, skipping it')
+
+    print('%i entries, %i bytes, best of %i' % (entries, len(content), repeat))
+    for backend in backends:
+        rate = bench(backend, content, entries, repeat)
+        print('%-6s %12.0f entries/s' % (backend, rate))
+
+
+if __name__ == '__main__':
+    main()
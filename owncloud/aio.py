@@ -0,0 +1,845 @@
+# -*- coding: utf-8 -*-
+#
+# vim: expandtab shiftwidth=4 softtabstop=4
+#
+"""asyncio ownCloud client module
+
+Offers the file, sharing and provisioning API of :class:`owncloud.Client`
+as coroutines, so that many requests can run concurrently on a single
+thread. Requires Python 3.5 or newer and the aiohttp module.
+
+Example::
+
+    async with AsyncClient('https://cloud.example.com/') as oc:
+        await oc.login('user', 'password')
+        infos = await asyncio.gather(*[oc.file_info(p) for p in paths])
+"""
+
+import asyncio
+import os
+
+from six.moves.urllib import parse
+
+from .owncloud import Client, HTTPResponseError, OCSResponseError, \
+    ResponseError
+
+try:
+    import aiohttp
+    import yarl
+except ImportError:
+    aiohttp = None
+
+
+class _Response(object):
+    """Response of an asynchronous request, offering the attributes of
+    :class:`requests.Response` which the parsers of :class:`Client` use
+    """
+
+    def __init__(self, raw, content=None):
+        self.raw = raw
+        self.status_code = raw.status
+        self.headers = raw.headers
+        self.content = content
+
+    def close(self):
+        self.raw.release()
+
+
+class AsyncClient(object):
+    """asyncio ownCloud client
+
+    All requests share the connection pool of a single aiohttp session,
+    which is created on the first request and closed by :meth:`logout`.
+    Requests are built and responses parsed by the same code as the one
+    of :class:`owncloud.Client`.
+
+    The client only offers the methods defined here: logging in, the file,
+    sharing, provisioning, app and private data methods, and the connection
+    pool and retry statistics. Event hooks, tracing, request tracking,
+    batches and token or session based authentication are only available
+    in :class:`owncloud.Client`.
+    """
+
+    OCS_SERVICE_SHARE = Client.OCS_SERVICE_SHARE
+    OCS_SERVICE_CLOUD = Client.OCS_SERVICE_CLOUD
+
+    OCS_PERMISSION_READ = Client.OCS_PERMISSION_READ
+    OCS_PERMISSION_UPDATE = Client.OCS_PERMISSION_UPDATE
+    OCS_PERMISSION_CREATE = Client.OCS_PERMISSION_CREATE
+    OCS_PERMISSION_DELETE = Client.OCS_PERMISSION_DELETE
+    OCS_PERMISSION_SHARE = Client.OCS_PERMISSION_SHARE
+    OCS_PERMISSION_ALL = Client.OCS_PERMISSION_ALL
+    OCS_SHARE_TYPE_USER = Client.OCS_SHARE_TYPE_USER
+    OCS_SHARE_TYPE_GROUP = Client.OCS_SHARE_TYPE_GROUP
+    OCS_SHARE_TYPE_LINK = Client.OCS_SHARE_TYPE_LINK
+    OCS_SHARE_TYPE_REMOTE = Client.OCS_SHARE_TYPE_REMOTE
+
+    # arguments of owncloud.Client which change how requests are sent,
+    # which this client does not implement
+    UNSUPPORTED_ARGUMENTS = (
+        'transport',
+        'recording',
+        'reuse_session',
+        'lazy_login',
+        'event_hooks',
+        'tracer'
+    )
+
+    def __init__(self, url, **kwargs):
+        """Instantiates a client
+
+        Accepts the arguments of :class:`owncloud.Client` except the ones
+        in :attr:`UNSUPPORTED_ARGUMENTS`, with the difference that
+        ``pool_maxsize`` is the maximum number of connections per host
+        and defaults to 100.
+
+        :raises: TypeError if an unsupported argument is given
+        """
+        if aiohttp is None:
+            raise ImportError('aiohttp is not installed')
+        for name in self.UNSUPPORTED_ARGUMENTS:
+            if name in kwargs:
+                raise TypeError(
+                    'AsyncClient does not support the "%s" argument' % name
+                )
+        kwargs.setdefault('pool_maxsize', 100)
+        # keeps the configuration and state of the session and parses the
+        # responses, it never sends requests itself
+        self._client = Client(url, **kwargs)
+        self.url = self._client.url
+        self._session = None
+        self._auth_header = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.logout()
+
+    async def login(self, user_id, password):
+        """Authenticate to ownCloud.
+
+        :param user_id: user id
+        :param password: password
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        self._auth_header = Client._get_basic_auth_header(user_id, password)
+        self._client._user_id = user_id
+        if self._client._load_cached_capabilities():
+            self._client._set_dav_urls(user_id)
+            return
+        try:
+            await self._update_capabilities()
+            self._client._set_dav_urls(user_id)
+        except HTTPResponseError as e:
+            await self.logout()
+            raise e
+
+    async def logout(self):
+        """Closes the session and its connections
+
+        :returns: True
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        return True
+
+    from_public_link = classmethod(Client.from_public_link.__func__)
+
+    def anon_login(self, folder_token, folder_password=''):
+        self._auth_header = Client._get_basic_auth_header(
+            folder_token, folder_password
+        )
+
+        url_components = parse.urlparse(self.url)
+        self._client._davpath = url_components.path + 'public.php/webdav'
+        self._client._webdav_url = self.url + 'public.php/webdav'
+
+    def get_pool_stats(self):
+        """Returns statistics about the connection pool of the session
+
+        :returns: dictionary with the number of open connections and the
+            connection limits, or None if no request was made yet
+        """
+        if self._session is None:
+            return None
+        connector = self._session.connector
+        return {
+            'connections': sum(
+                len(conns) for conns in connector._conns.values()
+            ),
+            'limit': connector.limit,
+            'limit_per_host': connector.limit_per_host
+        }
+
+    def get_retry_stats(self):
+        """Returns statistics about retried requests,
+        see :meth:`owncloud.Client.get_retry_stats`
+        """
+        return self._client.get_retry_stats()
+
+    async def file_info(self, path, properties=None):
+        """Returns the file info for the given remote file,
+        see :meth:`owncloud.Client.file_info`
+        """
+        data = self._client._get_propfind_body(properties)
+        res = await self._make_dav_request(
+            'PROPFIND', path, headers={'Depth': '0'}, data=data
+        )
+        if res:
+            return res[0]
+        return None
+
+    async def file_info_many(self, paths, properties=None, **kwargs):
+        """Returns the file info for many remote files at once,
+        see :meth:`owncloud.Client.file_info_many`
+
+        All requests run concurrently, ``max_workers`` is ignored.
+        """
+        tasks = self._client._get_file_info_tasks(
+            paths, kwargs.get('sibling_threshold', 3),
+            kwargs.get('sibling_ratio', 0.1)
+        )
+        task_results = await asyncio.gather(*[
+            self._file_info_task(task, properties) for task in tasks
+        ])
+        results = {}
+        for task_result in task_results:
+            results.update(task_result)
+        return results
+
+    async def _file_info_task(self, task, properties):
+        parent, entries = task
+        try:
+            if parent is None:
+                path, key = entries[0]
+                return {path: await self.file_info(key or '/', properties)}
+            listing = await self.list(parent, properties=properties)
+        except HTTPResponseError as e:
+            if e.status_code != 404:
+                raise e
+            listing = []
+        return self._client._match_listing(entries, listing)
+
+    async def list(self, path, depth=1, properties=None):
+        """Returns the listing/contents of the given remote directory,
+        see :meth:`owncloud.Client.list`
+        """
+        if not path.endswith('/'):
+            path += '/'
+
+        headers = {}
+        if isinstance(depth, int) or depth == "infinity":
+            headers['Depth'] = str(depth)
+
+        data = self._client._get_propfind_body(properties)
+        res = await self._make_dav_request(
+            'PROPFIND', path, headers=headers, data=data
+        )
+        # first one is always the root, remove it from listing
+        if res:
+            if depth == 1:
+                self._client._record_listing_size(path, len(res) - 1)
+            return res[1:]
+        return None
+
+    async def filter_files(self, path='', favorite=None, systemtag=None,
+                           properties=None):
+        """Returns the files matching the given filter rules,
+        see :meth:`owncloud.Client.filter_files`
+        """
+        data = self._client._get_filter_files_body(favorite, systemtag, properties)
+        if not path.endswith('/'):
+            path += '/'
+        res = await self._make_dav_request('REPORT', path, data=data)
+        if res is True:
+            return []
+        return res
+
+    async def search_files(self, pattern, limit=None, properties=None):
+        """Searches files by name on the server side,
+        see :meth:`owncloud.Client.search_files`
+        """
+        data = self._client._get_search_files_body(pattern, limit, properties)
+        res = await self._make_dav_request('REPORT', '/', data=data)
+        if res is True:
+            return []
+        return res
+
+    async def get_file_contents(self, path):
+        """Returns the contents of a remote file,
+        see :meth:`owncloud.Client.get_file_contents`
+        """
+        path = Client._normalize_path(path)
+        res = await self._request(
+            'GET',
+            self._client._webdav_url + parse.quote(Client._encode_string(path)),
+            'dav'
+        )
+        if res.status_code == 200:
+            return res.content
+        elif res.status_code >= 400:
+            raise HTTPResponseError(res)
+        return False
+
+    async def get_file(self, remote_path, local_file=None):
+        """Downloads a remote file, see :meth:`owncloud.Client.get_file`
+        """
+        remote_path = Client._normalize_path(remote_path)
+        res = await self._request(
+            'GET',
+            self._client._webdav_url + parse.quote(Client._encode_string(remote_path)),
+            'dav',
+            stream=True
+        )
+        try:
+            if res.status_code == 200:
+                if local_file is None:
+                    local_file = os.path.basename(remote_path)
+
+                with open(local_file, 'wb', 8192) as file_handle:
+                    async for chunk in res.raw.content.iter_chunked(8192):
+                        file_handle.write(chunk)
+                return True
+            elif res.status_code >= 400:
+                res.content = await res.raw.read()
+                raise HTTPResponseError(res)
+            return False
+        finally:
+            res.close()
+
+    async def put_file_contents(self, remote_path, data):
+        """Write data into a remote file,
+        see :meth:`owncloud.Client.put_file_contents`
+        """
+        return await self._make_dav_request('PUT', remote_path, data=data)
+
+    async def put_file(self, remote_path, local_source_file, **kwargs):
+        """Upload a file, see :meth:`owncloud.Client.put_file`
+        """
+        if kwargs.get('chunked', True):
+            return await self._put_file_chunked(
+                remote_path,
+                local_source_file,
+                **kwargs
+            )
+
+        remote_path, headers = self._client._get_upload_request(
+            remote_path, local_source_file, **kwargs
+        )
+        with open(local_source_file, 'rb', 8192) as file_handle:
+            return await self._make_dav_request(
+                'PUT',
+                remote_path,
+                data=file_handle,
+                headers=headers
+            )
+
+    async def put_directory(self, target_path, local_directory, **kwargs):
+        """Upload a directory with all its contents,
+        see :meth:`owncloud.Client.put_directory`
+
+        The files are uploaded concurrently, as many at a time as the
+        connection pool has connections.
+        """
+        target_path = Client._normalize_path(target_path)
+        if not target_path.endswith('/'):
+            target_path += '/'
+
+        if not local_directory.endswith('/'):
+            local_directory += '/'
+
+        # every upload opens its file, so only start as many as can be sent
+        # at the same time, instead of opening all files of a directory
+        semaphore = asyncio.Semaphore(self._client._pool_maxsize)
+
+        async def upload(remote_path, local_file):
+            async with semaphore:
+                return await self.put_file(remote_path, local_file, **kwargs)
+
+        basedir = os.path.basename(local_directory[0: -1]) + '/'
+        for path, _, files in os.walk(local_directory):
+            remote_path = basedir + path[len(local_directory):]
+            await self.mkdir(target_path + remote_path + '/')
+            results = await asyncio.gather(*[
+                upload(target_path + remote_path + '/', path + '/' + name)
+                for name in files
+            ])
+            if not all(results):
+                return False
+        return True
+
+    async def drop_file(self, file_name):
+        """ Convenience wrapper for put_file """
+        destination = '/' + os.path.basename(file_name)
+        return await self.put_file(destination, file_name)
+
+    async def _put_file_chunked(self, remote_path, local_source_file,
+                                **kwargs):
+        _, headers, chunk_size, chunk_paths = \
+            self._client._get_chunked_upload_request(
+                remote_path, local_source_file, **kwargs
+            )
+        loop = asyncio.get_event_loop()
+
+        with open(local_source_file, 'rb', 8192) as file_handle:
+            for chunk_path in chunk_paths:
+                # keep the event loop responsive while reading from disk
+                data = await loop.run_in_executor(
+                    None, file_handle.read, chunk_size
+                )
+                if not await self._make_dav_request(
+                        'PUT',
+                        chunk_path,
+                        data=data,
+                        headers=headers
+                ):
+                    return False
+        return True
+
+    async def mkdir(self, path):
+        """Creates a remote directory, see :meth:`owncloud.Client.mkdir`
+        """
+        if not path.endswith('/'):
+            path += '/'
+        return await self._make_dav_request('MKCOL', path)
+
+    async def delete(self, path):
+        """Deletes a remote file or directory,
+        see :meth:`owncloud.Client.delete`
+        """
+        return await self._make_dav_request('DELETE', path)
+
+    async def move(self, remote_path_source, remote_path_target):
+        """Moves a remote file or directory, see :meth:`owncloud.Client.move`
+        """
+        return await self._webdav_move_copy(
+            remote_path_source, remote_path_target, "MOVE"
+        )
+
+    async def copy(self, remote_path_source, remote_path_target):
+        """Copies a remote file or directory, see :meth:`owncloud.Client.copy`
+        """
+        return await self._webdav_move_copy(
+            remote_path_source, remote_path_target, "COPY"
+        )
+
+    async def share_file_with_link(self, path, **kwargs):
+        """Shares a remote file with link,
+        see :meth:`owncloud.Client.share_file_with_link`
+        """
+        return await self._run_ocs_request(
+            self._client._get_share_file_with_link_request(path, **kwargs)
+        )
+
+    async def share_file_with_user(self, path, user, **kwargs):
+        """Shares a remote file with specified user,
+        see :meth:`owncloud.Client.share_file_with_user`
+        """
+        request = self._client._get_share_file_with_user_request(
+            path, user, **kwargs
+        )
+        if request is None:
+            return False
+        return await self._run_ocs_request(request)
+
+    async def share_file_with_group(self, path, group, **kwargs):
+        """Shares a remote file with specified group,
+        see :meth:`owncloud.Client.share_file_with_group`
+        """
+        request = self._client._get_share_file_with_group_request(
+            path, group, **kwargs
+        )
+        if request is None:
+            return False
+        return await self._run_ocs_request(request)
+
+    async def is_shared(self, path):
+        """Checks whether a path is already shared,
+        see :meth:`owncloud.Client.is_shared`
+        """
+        # make sure that the path exist - if not, raise HTTPResponseError
+        await self.file_info(path)
+        try:
+            result = await self.get_shares(path)
+            if result:
+                return len(result) > 0
+        except ResponseError as e:
+            # OCS v2 reports a missing share with an HTTP error status
+            if e.status_code != 404:
+                raise e
+            return False
+        return False
+
+    async def get_share(self, share_id):
+        """Returns share information about known share,
+        see :meth:`owncloud.Client.get_share`
+        """
+        request = self._client._get_share_request(share_id)
+        if request is None:
+            return None
+        return await self._run_ocs_request(request)
+
+    async def get_shares(self, path='', **kwargs):
+        """Returns array of shares, see :meth:`owncloud.Client.get_shares`
+        """
+        request = self._client._get_shares_request(path, **kwargs)
+        if request is None:
+            return None
+        return await self._run_ocs_request(request)
+
+    async def update_share(self, share_id, **kwargs):
+        """Updates a given share, see :meth:`owncloud.Client.update_share`
+        """
+        request = self._client._get_update_share_request(share_id, **kwargs)
+        if request is None:
+            return False
+        return await self._run_ocs_request(request)
+
+    async def delete_share(self, share_id):
+        """Unshares a file or directory,
+        see :meth:`owncloud.Client.delete_share`
+        """
+        request = self._client._get_delete_share_request(share_id)
+        if request is None:
+            return False
+        return await self._run_ocs_request(request)
+
+    async def create_user(self, user_name, initial_password):
+        """Create a new user, see :meth:`owncloud.Client.create_user`
+        """
+        return await self._run_ocs_request(
+            self._client._get_create_user_request(user_name, initial_password)
+        )
+
+    async def delete_user(self, user_name):
+        """Deletes a user, see :meth:`owncloud.Client.delete_user`
+        """
+        return await self._run_ocs_request(
+            self._client._get_delete_user_request(user_name)
+        )
+
+    async def user_exists(self, user_name):
+        """Checks a user, see :meth:`owncloud.Client.user_exists`
+        """
+        users = await self.search_users(user_name)
+        return user_name in users
+
+    async def search_users(self, user_name):
+        """Searches for users, see :meth:`owncloud.Client.search_users`
+        """
+        return await self._run_ocs_request(
+            self._client._get_search_users_request(user_name)
+        )
+
+    async def get_users(self):
+        """Get users, see :meth:`owncloud.Client.get_users`
+        """
+        return await self.search_users('')
+
+    async def get_user(self, user_name):
+        """Retrieves information about a user,
+        see :meth:`owncloud.Client.get_user`
+        """
+        return await self._run_ocs_request(
+            self._client._get_user_request(user_name)
+        )
+
+    async def set_user_attribute(self, user_name, key, value):
+        """Sets a user attribute, see :meth:`owncloud.Client.set_user_attribute`
+        """
+        return await self._run_ocs_request(
+            self._client._get_set_user_attribute_request(user_name, key, value)
+        )
+
+    async def add_user_to_group(self, user_name, group_name):
+        """Adds a user to a group,
+        see :meth:`owncloud.Client.add_user_to_group`
+        """
+        return await self._run_ocs_request(
+            self._client._get_add_user_to_group_request(user_name, group_name)
+        )
+
+    async def remove_user_from_group(self, user_name, group_name):
+        """Removes a user from a group,
+        see :meth:`owncloud.Client.remove_user_from_group`
+        """
+        return await self._run_ocs_request(
+            self._client._get_remove_user_from_group_request(
+                user_name, group_name
+            )
+        )
+
+    async def get_user_groups(self, user_name):
+        """Get a list of groups associated to a user,
+        see :meth:`owncloud.Client.get_user_groups`
+        """
+        return await self._run_ocs_request(
+            self._client._get_user_groups_request(user_name)
+        )
+
+    async def user_is_in_group(self, user_name, group_name):
+        """Checks if a user is in a group,
+        see :meth:`owncloud.Client.user_is_in_group`
+        """
+        return group_name in await self.get_user_groups(user_name)
+
+    async def create_group(self, group_name):
+        """Create a new group, see :meth:`owncloud.Client.create_group`
+        """
+        return await self._run_ocs_request(
+            self._client._get_create_group_request(group_name)
+        )
+
+    async def delete_group(self, group_name):
+        """Delete a group, see :meth:`owncloud.Client.delete_group`
+        """
+        return await self._run_ocs_request(
+            self._client._get_delete_group_request(group_name)
+        )
+
+    async def get_groups(self):
+        """Get groups, see :meth:`owncloud.Client.get_groups`
+        """
+        return await self._run_ocs_request(
+            self._client._get_groups_request()
+        )
+
+    async def get_group_members(self, group_name):
+        """Get group members, see :meth:`owncloud.Client.get_group_members`
+        """
+        return await self._run_ocs_request(
+            self._client._get_group_members_request(group_name)
+        )
+
+    async def group_exists(self, group_name):
+        """Checks a group, see :meth:`owncloud.Client.group_exists`
+        """
+        return await self._run_ocs_request(
+            self._client._get_group_exists_request(group_name)
+        )
+
+    async def get_attribute(self, app=None, key=None):
+        """Returns an application attribute,
+        see :meth:`owncloud.Client.get_attribute`
+        """
+        return await self._run_ocs_request(
+            self._client._get_attribute_request(app, key)
+        )
+
+    async def set_attribute(self, app, key, value):
+        """Sets an application attribute,
+        see :meth:`owncloud.Client.set_attribute`
+        """
+        return await self._run_ocs_request(
+            self._client._get_set_attribute_request(app, key, value)
+        )
+
+    async def delete_attribute(self, app, key):
+        """Deletes an application attribute,
+        see :meth:`owncloud.Client.delete_attribute`
+        """
+        return await self._run_ocs_request(
+            self._client._get_delete_attribute_request(app, key)
+        )
+
+    async def get_apps(self):
+        """List all enabled apps, see :meth:`owncloud.Client.get_apps`
+        """
+        apps, enabled_apps = await asyncio.gather(
+            self._run_ocs_request(self._client._get_apps_request()),
+            self._run_ocs_request(
+                self._client._get_apps_request(enabled=True)
+            )
+        )
+        ena_apps = dict.fromkeys(apps, False)
+        ena_apps.update(dict.fromkeys(enabled_apps, True))
+        return ena_apps
+
+    async def enable_app(self, appname):
+        """Enable an app, see :meth:`owncloud.Client.enable_app`
+        """
+        return await self._run_ocs_request(
+            self._client._get_enable_app_request(appname)
+        )
+
+    async def disable_app(self, appname):
+        """Disable an app, see :meth:`owncloud.Client.disable_app`
+        """
+        return await self._run_ocs_request(
+            self._client._get_disable_app_request(appname)
+        )
+
+    async def get_version(self):
+        """Gets the ownCloud version of the connected server
+        """
+        if self._client._version is None:
+            await self._update_capabilities()
+        return self._client._version
+
+    async def get_capabilities(self):
+        """Gets the ownCloud app capabilities
+        """
+        if self._client._capabilities is None:
+            await self._update_capabilities()
+        return self._client._capabilities
+
+    async def make_ocs_request(self, method, service, action, **kwargs):
+        """Makes a OCS API request and analyses the response,
+        see :meth:`owncloud.Client.make_ocs_request`
+        """
+        accepted_codes = kwargs.pop('accepted_codes', [100])
+
+        res = await self._make_ocs_request(method, service, action, **kwargs)
+        if res.status_code == 200:
+            res.ocs = self._client._parse_ocs_response(res)
+            self._client._check_ocs_status(res.ocs, accepted_codes=accepted_codes)
+            return res
+
+        raise OCSResponseError(res)
+
+    async def _ocs_request(self, method, service, action, **kwargs):
+        """Makes a OCS API request and parses the response,
+        see :meth:`owncloud.Client._ocs_request`
+        """
+        accepted_codes = kwargs.pop('accepted_codes', [100])
+
+        res = await self._make_ocs_request(method, service, action, **kwargs)
+        if res.status_code != 200:
+            raise HTTPResponseError(res)
+        ocs = self._client._parse_ocs_response(res)
+        if accepted_codes is not None:
+            self._client._check_ocs_status(ocs, accepted_codes)
+        return ocs
+
+    async def _update_capabilities(self):
+        return await self._run_ocs_request(
+            self._client._get_capabilities_request()
+        )
+
+    async def _run_ocs_request(self, request):
+        """Sends an OCS API request built by the ``_get_*_request`` methods
+        of :class:`owncloud.Client`, see
+        :meth:`owncloud.Client._run_ocs_request`
+        """
+        if request.raw:
+            res = await self._make_ocs_request(
+                request.method, request.service, request.action,
+                **request.kwargs
+            )
+        else:
+            res = await self._ocs_request(
+                request.method, request.service, request.action,
+                **request.kwargs
+            )
+        return request.parse(res)
+
+    async def _webdav_move_copy(self, remote_path_source, remote_path_target,
+                                operation):
+        if operation != "MOVE" and operation != "COPY":
+            return False
+
+        return await self._make_dav_request(
+            operation,
+            remote_path_source,
+            headers=self._client._get_move_copy_headers(remote_path_source,
+                                                        remote_path_target)
+        )
+
+    async def _make_ocs_request(self, method, service, action, **kwargs):
+        path = self._client._get_ocs_path(service, action)
+
+        attributes = kwargs.copy()
+        attributes['headers'] = dict(attributes.get('headers') or {})
+        attributes['headers']['OCS-APIREQUEST'] = 'true'
+
+        return await self._request(method, self.url + path, 'ocs/' + service,
+                                   **attributes)
+
+    async def _make_dav_request(self, method, path, **kwargs):
+        path = Client._normalize_path(path)
+        res = await self._request(
+            method,
+            self._client._webdav_url + parse.quote(Client._encode_string(path)),
+            'dav',
+            **kwargs
+        )
+        return self._client._handle_dav_response(res)
+
+    def _create_session(self):
+        """Creates the aiohttp session using the configured connection
+        pool settings
+        """
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=self._client._pool_maxsize,
+            ssl=None if self._client._verify_certs else False,
+            force_close=not self._client._keep_alive
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    async def _request(self, method, url, endpoint, **kwargs):
+        """Sends an HTTP request, retrying it according to the retry policy
+
+        :param method: HTTP method
+        :param url: already quoted URL to send the request to
+        :param endpoint: label of the targeted endpoint, used for statistics
+        :param stream: (optional) True to return the response without
+            reading its body
+        :param \\*\\*kwargs: optional arguments that
+            ``aiohttp.ClientSession.request`` accepts
+        :returns: response
+        """
+        if self._session is None:
+            self._session = self._create_session()
+        stream = kwargs.pop('stream', False)
+        if self._auth_header is not None:
+            kwargs['headers'] = dict(kwargs.get('headers') or {})
+            kwargs['headers']['Authorization'] = self._auth_header
+        url = yarl.URL(url, encoded=True)
+
+        policy = self._client._retry_policy
+        if policy is not None:
+            policy.on_request()
+            if not policy.is_retryable(method):
+                policy = None
+
+        data = kwargs.get('data')
+        position = None
+        if policy is not None and hasattr(data, 'seek'):
+            position = data.tell()
+
+        attempt = 0
+        while True:
+            res = None
+            error = None
+            try:
+                raw = await self._session.request(method, url, **kwargs)
+                if stream:
+                    res = _Response(raw)
+                else:
+                    try:
+                        res = _Response(raw, await raw.read())
+                    finally:
+                        raw.release()
+            except aiohttp.ClientConnectionError as e:
+                if policy is None:
+                    raise e
+                error = e
+
+            if policy is None:
+                return res
+            delay = policy.get_retry_delay(attempt, res, error)
+            if delay is None or not policy.acquire(method + ' ' + endpoint):
+                if error is not None:
+                    raise error
+                return res
+
+            if res is not None:
+                res.close()
+            if position is not None:
+                data.seek(position)
+            await asyncio.sleep(delay)
+            attempt += 1
+
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+#
+# vim: expandtab shiftwidth=4 softtabstop=4
+#
+"""Local index of a remote ownCloud tree
+
+Keeps the file information of a remote directory tree in a local SQLite
+database so that questions like "all files bigger than 1 GB modified this
+week under /projects" can be answered without walking the server.
+
+The index is refreshed incrementally: ownCloud propagates etag changes up to
+the root, so directories whose etag did not change since the last refresh
+are skipped together with their whole subtree.
+"""
+
+import calendar
+import datetime
+import sqlite3
+import email.utils
+import six
+
+from .owncloud import Client, FileInfo, HTTPResponseError
+
+
+class RemoteIndex(object):
+    """Local SQLite index of a remote directory tree"""
+
+    # properties requested for every indexed entry
+    PROPERTIES = [
+        'd:getetag',
+        'd:getlastmodified',
+        'd:getcontentlength',
+        'd:getcontenttype',
+        'd:resourcetype',
+        'oc:fileid',
+        'oc:size'
+    ]
+
+    _SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS entries ('
+        ' path TEXT PRIMARY KEY,'
+        ' parent TEXT NOT NULL,'
+        ' name TEXT NOT NULL,'
+        ' is_dir INTEGER NOT NULL,'
+        ' size INTEGER,'
+        ' etag TEXT,'
+        ' mtime INTEGER,'
+        ' content_type TEXT,'
+        ' fileid TEXT'
+        ')',
+        'CREATE INDEX IF NOT EXISTS entries_parent ON entries (parent)',
+        'CREATE INDEX IF NOT EXISTS entries_size ON entries (size)',
+        'CREATE INDEX IF NOT EXISTS entries_mtime ON entries (mtime)',
+        'CREATE INDEX IF NOT EXISTS entries_fileid ON entries (fileid)',
+    ]
+
+    _COLUMNS = 'path, is_dir, size, etag, mtime, content_type, fileid'
+
+    def __init__(self, client, db_path=':memory:', root='/'):
+        """Opens (or creates) an index
+
+        :param client: logged in :class:`owncloud.Client` instance used
+            for refreshing the index
+        :param db_path: path to the SQLite database file, defaults to an
+            in-memory database
+        :param root: remote directory to index, defaults to "/"
+        """
+        self._client = client
+        self._root = self._normalize(root)
+        self._db = sqlite3.connect(db_path)
+        for statement in self._SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+
+    def close(self):
+        """Closes the underlying database"""
+        self._db.close()
+
+    def refresh(self, path=None):
+        """Synchronizes the index with the server
+
+        Only directories whose etag changed since the last refresh are
+        listed again, unchanged subtrees are skipped entirely. If the path
+        no longer exists, it is removed from the index with its subtree.
+
+        :param path: remote directory to refresh, defaults to the index root
+        :returns: dictionary with the counts of listed and skipped
+            directories, and of added, updated and removed entries
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        path = self._normalize(path or self._root)
+        stats = {
+            'listed': 0,
+            'skipped': 0,
+            'added': 0,
+            'updated': 0,
+            'removed': 0
+        }
+
+        try:
+            info = self._client.file_info(path, self.PROPERTIES)
+        except HTTPResponseError as e:
+            if e.status_code != 404:
+                raise
+            info = None
+        with self._db:
+            if info is None:
+                stats['removed'] += self._remove_tree(path)
+                return stats
+            row = self._db.execute(
+                'SELECT etag, is_dir FROM entries WHERE path = ?', (path,)
+            ).fetchone()
+            if row is not None and self._is_unchanged(row, info):
+                stats['skipped'] += 1
+                return stats
+            stats['added' if row is None else 'updated'] += 1
+            if row is not None and row[1] and not info.is_dir():
+                stats['removed'] += self._remove_children(path)
+            self._store(path, info)
+            if not info.is_dir():
+                return stats
+
+            pending = [path]
+            while pending:
+                dir_path = pending.pop()
+                stats['listed'] += 1
+                listing = self._client.list(dir_path, properties=self.PROPERTIES)
+                known = dict(
+                    (child_path, (etag, is_dir))
+                    for child_path, etag, is_dir in self._db.execute(
+                        'SELECT path, etag, is_dir FROM entries '
+                        'WHERE parent = ?',
+                        (dir_path,)
+                    )
+                )
+                for child in listing:
+                    child_path = self._normalize(child.path)
+                    if child_path in known:
+                        row = known.pop(child_path)
+                        if self._is_unchanged(row, child):
+                            if child.is_dir():
+                                stats['skipped'] += 1
+                            continue
+                        stats['updated'] += 1
+                        if row[1] and not child.is_dir():
+                            # the entries of a directory replaced by a
+                            # file would be left behind
+                            stats['removed'] += self._remove_children(
+                                child_path
+                            )
+                    else:
+                        stats['added'] += 1
+                    self._store(child_path, child)
+                    if child.is_dir():
+                        pending.append(child_path)
+
+                for gone in known:
+                    stats['removed'] += self._remove_tree(gone)
+
+        return stats
+
+    def get(self, path):
+        """Returns the indexed file info for the given path
+
+        :param path: remote path
+        :returns: :class:`owncloud.FileInfo` or None if the path
+            is not indexed
+        """
+        row = self._db.execute(
+            'SELECT ' + self._COLUMNS + ' FROM entries WHERE path = ?',
+            (self._normalize(path),)
+        ).fetchone()
+        if row is None:
+            return None
+        return self._to_file_info(row)
+
+    def query(self, prefix=None, glob=None, min_size=None, max_size=None,
+              modified_after=None, modified_before=None, file_type=None,
+              order_by='path', limit=None):
+        """Queries the local index
+
+        All given criteria must match.
+
+        :param prefix: only return the entry at this remote path and the
+            entries below it
+        :param glob: shell-style pattern matched against the full path,
+            e.g. "/projects/*.iso"
+        :param min_size: minimum size in bytes (inclusive)
+        :param max_size: maximum size in bytes (inclusive)
+        :param modified_after: datetime or unix timestamp, only return
+            entries modified at or after that time
+        :param modified_before: datetime or unix timestamp, only return
+            entries modified before that time
+        :param file_type: "file" or "dir" to only return files or
+            directories, defaults to both
+        :param order_by: one of "path", "size", "mtime", prefix with "-"
+            for descending order
+        :param limit: maximum number of entries to return
+        :returns: array of :class:`owncloud.FileInfo`
+        """
+        where, args = self._build_where(
+            prefix, glob, min_size, max_size, modified_after,
+            modified_before, file_type
+        )
+        descending = order_by.startswith('-')
+        order_column = order_by.lstrip('-')
+        if order_column not in ('path', 'size', 'mtime'):
+            raise ValueError('Invalid order_by column: %s' % order_column)
+
+        sql = 'SELECT ' + self._COLUMNS + ' FROM entries'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY ' + order_column + (' DESC' if descending else '')
+        if limit is not None:
+            sql += ' LIMIT %i' % int(limit)
+
+        return [self._to_file_info(row) for row in self._db.execute(sql, args)]
+
+    def count(self, **kwargs):
+        """Counts the entries matching the given criteria
+
+        :param \\*\\*kwargs: same criteria as :meth:`query`
+        :returns: number of matching entries
+        """
+        where, args = self._build_where(
+            kwargs.get('prefix'), kwargs.get('glob'), kwargs.get('min_size'),
+            kwargs.get('max_size'), kwargs.get('modified_after'),
+            kwargs.get('modified_before'), kwargs.get('file_type')
+        )
+        sql = 'SELECT COUNT(*) FROM entries'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return self._db.execute(sql, args).fetchone()[0]
+
+    def _build_where(self, prefix, glob, min_size, max_size, modified_after,
+                     modified_before, file_type):
+        where = []
+        args = []
+        if prefix is not None:
+            prefix = self._normalize(prefix)
+            if prefix != '/':
+                # a range on the primary key lets SQLite use its index,
+                # "0" is the character following "/"
+                where.append('(path = ? OR (path >= ? AND path < ?))')
+                args.extend([prefix, prefix + '/', prefix + '0'])
+        if glob is not None:
+            where.append('path GLOB ?')
+            args.append(glob)
+        if min_size is not None:
+            where.append('size >= ?')
+            args.append(int(min_size))
+        if max_size is not None:
+            where.append('size <= ?')
+            args.append(int(max_size))
+        if modified_after is not None:
+            where.append('mtime >= ?')
+            args.append(self._to_timestamp(modified_after))
+        if modified_before is not None:
+            where.append('mtime < ?')
+            args.append(self._to_timestamp(modified_before))
+        if file_type is not None:
+            where.append('is_dir = ?')
+            args.append(1 if file_type == 'dir' else 0)
+        return where, args
+
+    def _store(self, path, file_info):
+        attrs = file_info.attributes
+        if file_info.is_dir():
+            size = attrs.get('{http://owncloud.org/ns}size')
+        else:
+            size = attrs.get('{DAV:}getcontentlength')
+        mtime = attrs.get('{DAV:}getlastmodified')
+        if mtime is not None:
+            mtime = calendar.timegm(email.utils.parsedate_tz(mtime)[:9])
+
+        parent, _, name = path.rpartition('/')
+        if path == '/':
+            parent = ''
+        elif parent == '':
+            parent = '/'
+
+        self._db.execute(
+            'INSERT OR REPLACE INTO entries (path, parent, name, is_dir, size, '
+            'etag, mtime, content_type, fileid) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                path, parent, name,
+                1 if file_info.is_dir() else 0,
+                int(size) if size is not None else None,
+                attrs.get('{DAV:}getetag'),
+                mtime,
+                attrs.get('{DAV:}getcontenttype'),
+                attrs.get('{http://owncloud.org/ns}fileid')
+            )
+        )
+
+    @staticmethod
+    def _is_unchanged(row, file_info):
+        etag, is_dir = row
+        return etag == file_info.get_etag() and \
+            bool(is_dir) == file_info.is_dir()
+
+    def _remove_tree(self, path):
+        cursor = self._db.execute(
+            'DELETE FROM entries WHERE path = ? OR (path >= ? AND path < ?)',
+            (path, path + '/', path + '0')
+        )
+        return cursor.rowcount
+
+    def _remove_children(self, path):
+        cursor = self._db.execute(
+            'DELETE FROM entries WHERE path >= ? AND path < ?',
+            (path + '/', path + '0')
+        )
+        return cursor.rowcount
+
+    def _to_file_info(self, row):
+        path, is_dir, size, etag, mtime, content_type, fileid = row
+        attributes = {}
+        if etag is not None:
+            attributes['{DAV:}getetag'] = etag
+        if mtime is not None:
+            attributes['{DAV:}getlastmodified'] = email.utils.formatdate(
+                mtime, usegmt=True
+            )
+        if content_type is not None:
+            attributes['{DAV:}getcontenttype'] = content_type
+        if fileid is not None:
+            attributes['{http://owncloud.org/ns}fileid'] = fileid
+        if size is not None:
+            if is_dir:
+                attributes['{http://owncloud.org/ns}size'] = str(size)
+            else:
+                attributes['{DAV:}getcontentlength'] = str(size)
+
+        if is_dir:
+            if path != '/':
+                path += '/'
+            return FileInfo(path, 'dir', attributes)
+        return FileInfo(path, 'file', attributes)
+
+    @staticmethod
+    def _to_timestamp(value):
+        if isinstance(value, datetime.datetime):
+            return calendar.timegm(value.utctimetuple())
+        return int(value)
+
+    @staticmethod
+    def _normalize(path):
+        """Returns the given path with a leading slash and without
+        trailing slash
+        """
+        path = Client._normalize_path(path)
+        if six.PY2 and isinstance(path, str):
+            path = path.decode('utf-8')
+        if len(path) > 1 and path.endswith('/'):
+            path = path[:-1]
+        return path
@@ -0,0 +1,417 @@
+# -*- coding: utf-8 -*-
+#
+# vim: expandtab shiftwidth=4 softtabstop=4
+#
+"""Load generator for server capacity planning
+
+Runs simulated users, each with its own :class:`owncloud.Client` and
+working directory, through a weighted mix of operations at a target rate,
+and reports the throughput, error rates and latency percentiles of every
+operation::
+
+    generator = LoadGenerator(
+        'https://cloud.example.com/', [('loadtest', 'secret')],
+        users=20, rate=50, duration=60,
+        workload={'list': 4, 'get_small': 4, 'put_small': 2, 'share': 1}
+    )
+    report = generator.run()
+    print(report['operations']['list']['p99'])
+
+It can also be run from the command line, against a server or against the
+in-process stand-in server of the tests::
+
+    python -m owncloud.loadgen --standin --users 10 --rate 100 --duration 10
+"""
+
+from __future__ import print_function
+
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from .owncloud import Client
+from .metrics import MetricsCollector
+
+# Python 2 has no perf_counter
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+class _SimulatedUser(object):
+    """Client, working directory and random generator of one simulated
+    user
+    """
+
+    def __init__(self, generator, index, login, password):
+        self.generator = generator
+        self.index = index
+        self.login = login
+        self.password = password
+        self.random = random.Random(
+            None if generator.seed is None else generator.seed + index
+        )
+        self.client = None
+        self.work_dir = '/%s-%i' % (generator.prefix, index)
+        self.small_count = 0
+        self.latencies = {}
+        self.errors = {}
+
+    def setup(self):
+        generator = self.generator
+        self.client = Client(generator.url, **generator.client_options)
+        self.client.add_event_hook(generator.metrics)
+        self.client.login(self.login, self.password)
+        self.client.mkdir(self.work_dir)
+        self.client.put_file_contents(self.work_dir + '/read.txt',
+                                      generator.small_data)
+
+    def teardown(self):
+        if self.client is None:
+            return
+        try:
+            if self.generator.cleanup:
+                self.client.delete(self.work_dir)
+        finally:
+            self.client.logout()
+
+    def op_list(self):
+        self.client.list(self.work_dir)
+
+    def op_put_small(self):
+        # cycles over a few names to bound the used storage
+        self.small_count = (self.small_count + 1) % 20
+        self.client.put_file_contents(
+            '%s/small%i.txt' % (self.work_dir, self.small_count),
+            self.generator.small_data
+        )
+
+    def op_get_small(self):
+        self.client.get_file_contents(self.work_dir + '/read.txt')
+
+    def op_chunked_upload(self):
+        self.client.put_file(
+            self.work_dir + '/chunked.bin', self.generator.chunked_file,
+            chunk_size=self.generator.chunk_size
+        )
+
+    def op_share(self):
+        self.client.share_file_with_link(self.work_dir + '/read.txt')
+
+    def run(self, operations, weights, start, stop_time, max_operations):
+        """Runs operations until the stop time or the maximum number of
+        operations, spaced by the interval of the target rate
+
+        With a target rate, the latency of an operation is measured from
+        the time it was scheduled to start. An operation delayed by slow
+        previous ones thereby reports the delay, instead of the slow
+        periods being hidden by the operations which were not sent
+        during them (coordinated omission).
+        """
+        interval = self.generator.get_user_interval()
+        # spread the users over the first interval to avoid bursts
+        next_time = start + (self.random.random() * interval
+                             if interval else 0)
+        count = 0
+        while max_operations is None or count < max_operations:
+            now = _clock()
+            if interval:
+                if next_time > now:
+                    time.sleep(next_time - now)
+                begin = next_time
+                next_time += interval
+            if stop_time is not None and _clock() >= stop_time:
+                break
+            name = self._choose(operations, weights)
+            if not interval:
+                begin = _clock()
+            try:
+                getattr(self, 'op_' + name)()
+            except Exception as e:
+                key = (name, type(e).__name__)
+                self.errors[key] = self.errors.get(key, 0) + 1
+            self.latencies.setdefault(name, []).append(_clock() - begin)
+            count += 1
+
+    def _choose(self, operations, weights):
+        value = self.random.random() * sum(weights)
+        for name, weight in zip(operations, weights):
+            value -= weight
+            if value < 0:
+                return name
+        return operations[-1]
+
+
+class LoadGenerator(object):
+    """Runs simulated users against a server and reports their
+    performance
+    """
+
+    # operations of the workload mixes and their default weights
+    DEFAULT_WORKLOAD = {
+        'list': 4,
+        'get_small': 4,
+        'put_small': 2,
+        'chunked_upload': 1,
+        'share': 1
+    }
+
+    def __init__(self, url, credentials, users=1, workload=None, rate=None,
+                 duration=None, operations=None, small_size=1024,
+                 chunked_size=4 * 1024 * 1024, chunk_size=1024 * 1024,
+                 prefix='loadgen', cleanup=True, seed=None,
+                 client_options=None):
+        """Instantiates a load generator
+
+        :param url: URL of the server
+        :param credentials: list of (login, password) tuples, assigned to
+            the simulated users in turn
+        :param users: number of simulated users, each with its own client
+        :param workload: dictionary of the weights of the operations to
+            run: "list", "get_small", "put_small", "chunked_upload" and
+            "share", defaults to :attr:`DEFAULT_WORKLOAD`
+        :param rate: target number of operations per second of all users
+            together, defaults to None to run them back to back. The
+            operations are scheduled independently of the responses and
+            their latencies include the time they were behind schedule
+        :param duration: duration of the run in seconds
+        :param operations: number of operations per user, used when no
+            duration is given, defaults to 100
+        :param small_size: size in bytes of the files of "put_small" and
+            "get_small"
+        :param chunked_size: size in bytes of the file of
+            "chunked_upload"
+        :param chunk_size: chunk size in bytes of "chunked_upload"
+        :param prefix: prefix of the working directories of the users,
+            which are created in the root folder
+        :param cleanup: True to delete the working directories at the end
+        :param seed: seed of the random choice of the operations, for
+            reproducible runs
+        :param client_options: dictionary of arguments of the clients, like
+            ``retry_policy`` or ``transport``
+        :raises: ValueError if the workload contains an unknown operation
+        """
+        self.url = url
+        self.credentials = list(credentials)
+        self.users = users
+        self.workload = dict(workload or self.DEFAULT_WORKLOAD)
+        for name in self.workload:
+            if not hasattr(_SimulatedUser, 'op_' + name):
+                raise ValueError('Unknown operation: %s' % name)
+        self.rate = rate
+        self.duration = duration
+        self.operations = operations
+        if duration is None and operations is None:
+            self.operations = 100
+        self.small_data = b'x' * small_size
+        self.chunked_size = chunked_size
+        self.chunk_size = chunk_size
+        self.prefix = prefix
+        self.cleanup = cleanup
+        self.seed = seed
+        self.client_options = client_options or {}
+        self.metrics = MetricsCollector()
+        self.chunked_file = None
+
+    def get_user_interval(self):
+        """Returns the interval between the operations of one user in
+        seconds, or 0 without target rate
+        """
+        if not self.rate:
+            return 0
+        return float(self.users) / self.rate
+
+    def run(self):
+        """Runs the simulated users and waits until they are done
+
+        :returns: report, see :meth:`get_report`
+        :raises: the exception of a user which failed to log in or to
+            prepare its working directory
+        """
+        self.metrics.reset()
+        sim_users = [
+            _SimulatedUser(self, index, *self.credentials[
+                index % len(self.credentials)
+            ])
+            for index in range(self.users)
+        ]
+        temp_dir = None
+        if self.workload.get('chunked_upload'):
+            temp_dir = tempfile.mkdtemp()
+            self.chunked_file = os.path.join(temp_dir, 'chunked.bin')
+            with open(self.chunked_file, 'wb') as f:
+                f.write(os.urandom(self.chunked_size))
+
+        operations = sorted(name for name, weight in self.workload.items()
+                            if weight > 0)
+        weights = [self.workload[name] for name in operations]
+        try:
+            self._run_threads(sim_users, lambda sim_user: sim_user.setup())
+            start = _clock()
+            stop_time = start + self.duration \
+                if self.duration is not None else None
+            max_operations = self.operations \
+                if self.duration is None else None
+            self._run_threads(sim_users, lambda sim_user: sim_user.run(
+                operations, weights, start, stop_time, max_operations
+            ))
+            elapsed = _clock() - start
+        finally:
+            self._run_threads(sim_users,
+                              lambda sim_user: sim_user.teardown(),
+                              raise_errors=False)
+            if temp_dir is not None:
+                shutil.rmtree(temp_dir)
+        return self.get_report(sim_users, elapsed)
+
+    @staticmethod
+    def _run_threads(sim_users, target, raise_errors=True):
+        errors = []
+
+        def run(sim_user):
+            try:
+                target(sim_user)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=run, args=(sim_user,),
+                             name='loadgen-user-%i' % sim_user.index)
+            for sim_user in sim_users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors and raise_errors:
+            raise errors[0]
+
+    def get_report(self, sim_users, elapsed):
+        """Returns the report of a run
+
+        :returns: dictionary with the duration, the number of users, the
+            target and achieved rate, the error rate, the statistics by
+            operation with their count, errors by exception type,
+            throughput and the mean, "p50", "p90", "p99" and maximum
+            latency in seconds, and the request statistics of
+            :meth:`owncloud.metrics.MetricsCollector.get_stats`
+        """
+        latencies = {}
+        errors = {}
+        for sim_user in sim_users:
+            for name, values in sim_user.latencies.items():
+                latencies.setdefault(name, []).extend(values)
+            for key, count in sim_user.errors.items():
+                errors[key] = errors.get(key, 0) + count
+
+        operations = {}
+        total = 0
+        total_errors = 0
+        for name, values in sorted(latencies.items()):
+            values.sort()
+            op_errors = dict((error, count)
+                             for (op, error), count in errors.items()
+                             if op == name)
+            error_count = sum(op_errors.values())
+            total += len(values)
+            total_errors += error_count
+            operations[name] = {
+                'count': len(values),
+                'errors': op_errors,
+                'error_rate': float(error_count) / len(values),
+                'throughput': len(values) / elapsed if elapsed else None,
+                'mean': sum(values) / len(values),
+                'p50': self._percentile(values, 0.5),
+                'p90': self._percentile(values, 0.9),
+                'p99': self._percentile(values, 0.99),
+                'max': values[-1]
+            }
+
+        return {
+            'duration': elapsed,
+            'users': self.users,
+            'target_rate': self.rate,
+            'operations_count': total,
+            'throughput': total / elapsed if elapsed else None,
+            'error_rate': float(total_errors) / total if total else 0.0,
+            'operations': operations,
+            'requests': self.metrics.get_stats()
+        }
+
+    @staticmethod
+    def _percentile(values, q):
+        """Returns the nearest-rank percentile of sorted values"""
+        index = max(0, int(round(q * len(values) + 0.5)) - 1)
+        return values[min(index, len(values) - 1)]
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(
+        description='Runs simulated users against an ownCloud server'
+    )
+    parser.add_argument('url', nargs='?', help='URL of the server')
+    parser.add_argument('--standin', action='store_true',
+                        help='run against an in-process stand-in server')
+    parser.add_argument('--login', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=None,
+                        help='target operations per second of all users')
+    parser.add_argument('--duration', type=float, default=None,
+                        help='duration in seconds')
+    parser.add_argument('--operations', type=int, default=None,
+                        help='operations per user, without duration')
+    parser.add_argument('--workload', default=None,
+                        help='weights like "list=4,put_small=1"')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', help='file to write the report to')
+    args = parser.parse_args()
+
+    workload = None
+    if args.workload:
+        workload = dict(
+            (name, float(weight)) for name, weight in
+            (item.split('=') for item in args.workload.split(','))
+        )
+
+    server = None
+    url = args.url
+    if args.standin:
+        from .test.server import StandInServer
+        server = StandInServer({args.login: args.password}).start()
+        url = server.url
+    elif url is None:
+        parser.error('the URL or --standin is required')
+
+    try:
+        report = LoadGenerator(
+            url, [(args.login, args.password)], users=args.users,
+            workload=workload, rate=args.rate, duration=args.duration,
+            operations=args.operations, seed=args.seed
+        ).run()
+    finally:
+        if server is not None:
+            server.stop()
+
+    print('%i operations in %.1f s: %.1f/s, %.2f%% errors' % (
+        report['operations_count'], report['duration'],
+        report['throughput'], report['error_rate'] * 100
+    ))
+    for name, stats in sorted(report['operations'].items()):
+        print('%-15s %7i %8.1f/s  p50 %7.1f ms  p90 %7.1f ms  '
+              'p99 %7.1f ms  errors %.2f%%' % (
+                  name, stats['count'], stats['throughput'],
+                  stats['p50'] * 1000, stats['p90'] * 1000,
+                  stats['p99'] * 1000, stats['error_rate'] * 100
+              ))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+#
+# vim: expandtab shiftwidth=4 softtabstop=4
+#
+"""Request metrics
+
+Aggregates the :class:`owncloud.RequestEvent` reports of a client into
+latency histograms per operation, and exports them in the Prometheus text
+format::
+
+    metrics = MetricsCollector()
+    oc = owncloud.Client(url, event_hooks=[metrics])
+    ...
+    print(metrics.to_prometheus())
+"""
+
+import threading
+
+from six.moves import BaseHTTPServer
+
+
+class _Histogram(object):
+    """Cumulative latency histogram and counters of one operation"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.connect_time = 0.0
+        self.ttfb_time = 0.0
+        self.status_codes = {}
+
+    def add(self, event):
+        duration = event.timings.get('total', 0.0)
+        self.count += 1
+        self.sum += duration
+        self.max = max(self.max, duration)
+        for index, bound in enumerate(self.buckets):
+            if duration <= bound:
+                self.bucket_counts[index] += 1
+        if event.error is not None:
+            self.errors += 1
+        else:
+            self.status_codes[event.status_code] = \
+                self.status_codes.get(event.status_code, 0) + 1
+        if event.retries:
+            self.retries += 1
+        self.bytes_sent += event.bytes_sent or 0
+        self.bytes_received += event.bytes_received or 0
+        self.connect_time += event.timings.get('connect', 0.0)
+        self.ttfb_time += event.timings.get('ttfb', 0.0)
+
+    def quantile(self, q):
+        """Estimates a quantile by linear interpolation within the bucket
+        containing it, like Prometheus' ``histogram_quantile()``
+
+        :param q: quantile between 0 and 1
+        :returns: estimated duration in seconds or None if empty
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        lower_bound = 0.0
+        lower_count = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            if count >= rank:
+                if count == lower_count:
+                    return bound
+                return lower_bound + (bound - lower_bound) * \
+                    (rank - lower_count) / (count - lower_count)
+            lower_bound = bound
+            lower_count = count
+        # above the highest bucket, the maximum is the best estimate
+        return self.max
+
+
+class MetricsCollector(object):
+    """Event hook keeping latency histograms and counters per operation
+
+    Operations are named after the HTTP method and the endpoint of the
+    requests, for example "PROPFIND dav" or
+    "GET ocs/apps/files_sharing/api/v1". Instances are thread safe and can
+    be shared by several clients.
+    """
+
+    # upper bounds of the histogram buckets in seconds
+    DEFAULT_BUCKETS = (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+    )
+
+    def __init__(self, buckets=None):
+        """Instantiates a collector
+
+        :param buckets: ascending upper bounds of the histogram buckets in
+            seconds, defaults to :attr:`DEFAULT_BUCKETS`
+        """
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def __call__(self, event):
+        """Records an event
+
+        :param event: :class:`owncloud.RequestEvent` instance
+        """
+        key = (event.method, event.endpoint)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = _Histogram(self.buckets)
+                self._histograms[key] = histogram
+            histogram.add(event)
+
+    def reset(self):
+        """Discards all recorded events"""
+        with self._lock:
+            self._histograms = {}
+
+    def get_stats(self):
+        """Returns the statistics of every operation
+
+        :returns: dictionary by operation name of dictionaries with the
+            number of requests, failed requests and retries, the requests
+            per status code, the bytes sent and received, the total, mean
+            and maximum duration, the mean connect time and time to first
+            byte, and the estimated "p50", "p90" and "p99" durations
+        """
+        stats = {}
+        with self._lock:
+            for (method, endpoint), histogram in self._histograms.items():
+                count = histogram.count
+                stats[method + ' ' + endpoint] = {
+                    'count': count,
+                    'errors': histogram.errors,
+                    'retries': histogram.retries,
+                    'status_codes': dict(histogram.status_codes),
+                    'bytes_sent': histogram.bytes_sent,
+                    'bytes_received': histogram.bytes_received,
+                    'total_time': histogram.sum,
+                    'mean_time': histogram.sum / count,
+                    'max_time': histogram.max,
+                    'mean_connect_time': histogram.connect_time / count,
+                    'mean_ttfb': histogram.ttfb_time / count,
+                    'p50': histogram.quantile(0.5),
+                    'p90': histogram.quantile(0.9),
+                    'p99': histogram.quantile(0.99)
+                }
+        return stats
+
+    def to_prometheus(self, prefix='owncloud'):
+        """Exports the metrics in the Prometheus text exposition format
+
+        :param prefix: prefix of the metric names
+        :returns: metrics as string
+        """
+        lines = []
+
+        def add_metric(name, metric_type, description, samples):
+            lines.append('# HELP %s_%s %s' % (prefix, name, description))
+            lines.append('# TYPE %s_%s %s' % (prefix, name, metric_type))
+            for suffix, labels, value in samples:
+                lines.append('%s_%s%s{%s} %s' % (
+                    prefix, name, suffix,
+                    ','.join('%s="%s"' % (key, self._escape(label))
+                             for key, label in labels),
+                    self._format_value(value)
+                ))
+
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            durations = []
+            requests = []
+            counters = {
+                'errors': [], 'retries': [], 'sent': [], 'received': [],
+                'connect': [], 'ttfb': []
+            }
+            for (method, endpoint), histogram in histograms:
+                labels = [('method', method), ('endpoint', endpoint)]
+                for bound, count in zip(histogram.buckets,
+                                        histogram.bucket_counts):
+                    durations.append(
+                        ('_bucket', labels + [('le', bound)], count)
+                    )
+                durations.append(
+                    ('_bucket', labels + [('le', '+Inf')], histogram.count)
+                )
+                durations.append(('_sum', labels, histogram.sum))
+                durations.append(('_count', labels, histogram.count))
+                for status, count in sorted(histogram.status_codes.items()):
+                    requests.append(
+                        ('', labels + [('status', status)], count)
+                    )
+                counters['errors'].append(('', labels, histogram.errors))
+                counters['retries'].append(('', labels, histogram.retries))
+                counters['sent'].append(('', labels, histogram.bytes_sent))
+                counters['received'].append(
+                    ('', labels, histogram.bytes_received)
+                )
+                counters['connect'].append(
+                    ('', labels, histogram.connect_time)
+                )
+                counters['ttfb'].append(('', labels, histogram.ttfb_time))
+
+        add_metric('request_duration_seconds', 'histogram',
+                   'Duration of the requests sent to the server.', durations)
+        add_metric('requests_total', 'counter',
+                   'Requests which received a response, by status code.',
+                   requests)
+        add_metric('request_errors_total', 'counter',
+                   'Requests which failed without response.',
+                   counters['errors'])
+        add_metric('request_retries_total', 'counter',
+                   'Requests sent again after a failed attempt.',
+                   counters['retries'])
+        add_metric('request_sent_bytes_total', 'counter',
+                   'Size of the request bodies.', counters['sent'])
+        add_metric('request_received_bytes_total', 'counter',
+                   'Size of the response bodies.', counters['received'])
+        add_metric('request_connect_seconds_total', 'counter',
+                   'Time spent opening connections.', counters['connect'])
+        add_metric('request_ttfb_seconds_total', 'counter',
+                   'Time spent waiting for the response headers.',
+                   counters['ttfb'])
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='', prefix='owncloud'):
+        """Serves the metrics over HTTP for Prometheus to scrape them,
+        from a daemon thread
+
+        :param port: port to listen on, 0 to pick a free one
+        :param host: address to listen on, defaults to all addresses
+        :param prefix: prefix of the metric names
+        :returns: the HTTP server, its ``server_address`` attribute holds the
+            address it listens on and ``shutdown()`` stops it
+        """
+        collector = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                body = collector.to_prometheus(prefix).encode('utf-8')
+                self.send_response(200)
+                self.send_header(
+                    'Content-Type', 'text/plain; version=0.0.4; charset=utf-8'
+                )
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = BaseHTTPServer.HTTPServer((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+            .replace('\n', '\\n')
+
+    @staticmethod
+    def _format_value(value):
+        if isinstance(value, float):
+            return repr(value)
+        return str(value)
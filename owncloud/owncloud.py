@@ -8,15 +8,81 @@ Makes it possible to access files on a remote ownCloud instance,
 share them or access application attributes.
 """
 
+import base64
+import contextlib
 import datetime
+import itertools
 import time
+import random
+import threading
+import email.utils
+import json
+import logging
 import requests
+import requests.adapters
+import urllib3
 import xml.etree.ElementTree as ET
 import os
+import sys
+import types
 import math
+import tempfile
 import six
+from multiprocessing.pool import ThreadPool
 from six.moves.urllib import parse
 
+try:
+    from lxml import etree as _lxml_etree
+except ImportError:
+    _lxml_etree = None
+
+try:
+    import httpx as _httpx
+except ImportError:
+    _httpx = None
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows
+    fcntl = None
+
+# serialized "d:prop" elements of WebDAV request bodies by requested
+# properties, see Client._get_dav_prop(). Callers can pass any list of
+# properties, so the cache is cleared when it reaches _MAX_DAV_PROPS entries.
+_DAV_PROPS = {}
+_MAX_DAV_PROPS = 100
+
+# namespace declarations of the root element of WebDAV request bodies
+_DAV_NAMESPACES = b' xmlns:d="DAV:" xmlns:nc="http://nextcloud.org/ns"' \
+    b' xmlns:oc="http://owncloud.org/ns"'
+
+# code objects of the public methods of client classes by class, see
+# RequestTracker._get_method_codes()
+_PUBLIC_METHOD_CODES = {}
+
+# loggers of the subsystems, the "owncloud" logger is their parent
+_dav_log = logging.getLogger('owncloud.dav')
+_ocs_log = logging.getLogger('owncloud.ocs')
+_transfer_log = logging.getLogger('owncloud.transfer')
+
+# keys of headers and form fields whose values are not logged
+_REDACTED_KEYS = frozenset(['authorization', 'cookie', 'set-cookie'])
+
+# clock used to time requests
+_clock = getattr(time, 'perf_counter', time.time)
+
+# time spent by the current thread opening connections, see
+# RequestsTransport.request()
+_connect_timer = threading.local()
+_connect_count_lock = threading.Lock()
+# serializes the reopening of connection pools after a fork
+_reopen_lock = threading.Lock()
+
+# time spent by the current thread waiting for a free connection of a
+# blocking pool, see RequestsTransport.request()
+_pool_wait_timer = threading.local()
+
 
 class ResponseError(Exception):
     def __init__(self, res, errorType):
@@ -220,6 +286,205 @@ class PublicShare(ShareInfo):
                (self.share_id, self.target_file, self.link, self.token)
 
 
+class XMLBackend(object):
+    """XML parser backend based on the standard library's ElementTree
+
+    Other backends can be plugged in by subclassing this class, as long as
+    the elements they return offer the ElementTree API.
+    """
+
+    name = 'etree'
+
+    def fromstring(self, data):
+        """Parses an XML document
+
+        :param data: XML document
+        :returns: root element
+        """
+        return ET.fromstring(data)
+
+    def tostring(self, element):
+        """Serializes an element
+
+        :param element: element to serialize
+        :returns: XML as bytes
+        """
+        return ET.tostring(element)
+
+    def iselement(self, element):
+        """Returns whether the given object is an element of this backend
+
+        :param element: object to check
+        :returns: True if it is an element, False otherwise
+        """
+        return ET.iselement(element)
+
+    def compile(self, path):
+        """Compiles a lookup of the first subelement matching a path
+
+        :param path: path relative to the element, e.g. "meta/statuscode"
+        :returns: function taking an element and returning the first
+            matching subelement or None
+        """
+        def find(element):
+            return element.find(path)
+        return find
+
+
+class LxmlBackend(XMLBackend):
+    """XML parser backend based on lxml, which needs to be installed"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        if _lxml_etree is None:
+            raise ImportError('lxml is not installed')
+        # a parser only parses one document at a time, threads which share
+        # it wait for each other
+        self._parsers = threading.local()
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self._parsers = threading.local()
+
+    def fromstring(self, data):
+        parser = getattr(self._parsers, 'parser', None)
+        if parser is None:
+            parser = _lxml_etree.XMLParser(
+                resolve_entities=False,
+                no_network=True,
+                huge_tree=True
+            )
+            self._parsers.parser = parser
+        return _lxml_etree.fromstring(data, parser)
+
+    def tostring(self, element):
+        return _lxml_etree.tostring(element)
+
+    def iselement(self, element):
+        return _lxml_etree.iselement(element)
+
+    def compile(self, path):
+        xpath = _lxml_etree.ETXPath(path)
+
+        def find(element):
+            result = xpath(element)
+            if result:
+                return result[0]
+            return None
+        return find
+
+
+def _json_text(value):
+    """Returns the text of the XML element ownCloud serializes a decoded
+    JSON value to
+
+    :param value: decoded JSON value
+    :returns: text, or None for objects, arrays, null, false and empty strings
+    """
+    if value is None or value is False or isinstance(value, (dict, list)):
+        return None
+    if value is True:
+        return '1'
+    if isinstance(value, six.text_type):
+        # like empty XML elements, empty strings have no text
+        return value or None
+    return six.text_type(value)
+
+
+def _json_to_dict(value):
+    """Builds from a decoded JSON object the dictionary that
+    :meth:`Client._xml_to_dict` returns for its XML serialization
+
+    :param value: decoded JSON object or array
+    :returns: dictionary
+    """
+    result = {}
+    for tag, child in JSONElement._items(value):
+        if isinstance(child, (dict, list)) and child:
+            result[tag] = _json_to_dict(child)
+        else:
+            result[tag] = _json_text(child)
+    return result
+
+
+class JSONElement(object):
+    """Read-only view of a decoded JSON value offering the subset of the
+    ElementTree API that the OCS methods use
+
+    The value is presented the way ownCloud serializes it to XML: the
+    keys of an object become child elements, the items of an array
+    become child elements named "element" and scalars become the text.
+    This lets the same code read XML and JSON OCS responses.
+    """
+
+    __slots__ = ('tag', '_value')
+
+    def __init__(self, tag, value):
+        self.tag = tag
+        self._value = value
+
+    @property
+    def text(self):
+        return _json_text(self._value)
+
+    @staticmethod
+    def _items(value):
+        """Returns the (tag, value) pairs of the children of a value"""
+        if isinstance(value, dict):
+            return value.items()
+        if isinstance(value, list):
+            return [('element', child) for child in value]
+        return ()
+
+    def __iter__(self):
+        for tag, child in self._items(self._value):
+            yield JSONElement(tag, child)
+
+    def __len__(self):
+        if isinstance(self._value, (dict, list)):
+            return len(self._value)
+        return 0
+
+    def find(self, path):
+        """Returns the first element matching the given path of tags,
+        or None
+        """
+        for element in self.findall(path):
+            return element
+        return None
+
+    def findall(self, path):
+        """Returns the list of elements matching the given path of tags"""
+        elements = [self]
+        for tag in path.split('/'):
+            elements = [
+                child for element in elements for child in element
+                if child.tag == tag
+            ]
+        return elements
+
+    def iter(self, tag=None):
+        """Iterates over this element and all its descendants with the
+        given tag, in document order
+        """
+        pending = [(self.tag, self._value)]
+        while pending:
+            element_tag, value = pending.pop()
+            if tag is None or element_tag == tag:
+                yield JSONElement(element_tag, value)
+            if isinstance(value, (dict, list)):
+                pending.extend(reversed(list(self._items(value))))
+
+    def to_dict(self):
+        """Returns the children of this element as dictionary, like
+        :meth:`Client._xml_to_dict` does for XML elements
+        """
+        return _json_to_dict(self._value)
+
+
 class FileInfo(object):
     """File information"""
 
@@ -303,289 +568,2218 @@ class FileInfo(object):
         return self.__str__()
 
 
-class Client(object):
-    """ownCloud client"""
+def _add_params(url, params):
+    """Returns a URL with the given query parameters appended, the way
+    requests appends the ``params`` argument of a request
+
+    :param url: URL
+    :param params: dictionary or list of tuples of parameters, or an
+        already encoded query string
+    :returns: URL
+    """
+    if not params:
+        return url
+    if not isinstance(params, six.string_types):
+        params = parse.urlencode(params, doseq=True)
+    return url + ('&' if parse.urlsplit(url).query else '?') + params
+
+
+def _redact(values):
+    """Returns a copy of a dictionary of headers or form fields without
+    credentials, for logging
+
+    :param values: dictionary or None
+    :returns: copy with the values of sensitive keys replaced
+    """
+    if not values:
+        return values
+    redacted = {}
+    for key, value in values.items():
+        name = str(key).lower()
+        if name in _REDACTED_KEYS or 'password' in name:
+            value = '<redacted>'
+        redacted[key] = value
+    return redacted
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Handler printing to the current ``sys.stdout``, which may have been
+    replaced since the handler was added
+    """
+
+    def __init__(self):
+        logging.StreamHandler.__init__(self)
+        self.setFormatter(logging.Formatter('%(name)s: %(message)s'))
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, stream):
+        pass
+
+
+def _enable_debug_output():
+    """Prints the debug messages of all loggers of the module to stdout,
+    for the debug argument of :class:`Client`
+
+    The level and handlers of loggers are global, so this enables the
+    output for every client of the process.
+    """
+    logger = logging.getLogger('owncloud')
+    logger.setLevel(logging.DEBUG)
+    for handler in logger.handlers:
+        if isinstance(handler, _StdoutHandler):
+            return
+    logger.addHandler(_StdoutHandler())
+
+
+class _NullSpan(object):
+    """Span doing nothing, used by :class:`Client` when tracing is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
 
-    OCS_BASEPATH = 'ocs/v1.php/'
-    OCS_SERVICE_SHARE = 'apps/files_sharing/api/v1'
-    OCS_SERVICE_PRIVATEDATA = 'privatedata'
-    OCS_SERVICE_CLOUD = 'cloud'
+    def set(self, **args):
+        pass
 
-    # constants from lib/public/constants.php
-    OCS_PERMISSION_READ = 1
-    OCS_PERMISSION_UPDATE = 2
-    OCS_PERMISSION_CREATE = 4
-    OCS_PERMISSION_DELETE = 8
-    OCS_PERMISSION_SHARE = 16
-    OCS_PERMISSION_ALL = 31
-    # constants from lib/public/share.php
-    OCS_SHARE_TYPE_USER = 0
-    OCS_SHARE_TYPE_GROUP = 1
-    OCS_SHARE_TYPE_LINK = 3
-    OCS_SHARE_TYPE_REMOTE = 6
 
-    def __init__(self, url, **kwargs):
-        """Instantiates a client
+_NULL_SPAN = _NullSpan()
 
-        :param url: URL of the target ownCloud instance
-        :param verify_certs: True (default) to verify SSL certificates, False otherwise
-        :param dav_endpoint_version: None (default) to force using a specific endpoint version
-        instead of relying on capabilities
-        :param debug: set to True to print debugging messages to stdout, defaults to False
-        """
-        if not url.endswith('/'):
-            url += '/'
 
-        self.url = url
-        self._session = None
-        self._debug = kwargs.get('debug', False)
-        self._verify_certs = kwargs.get('verify_certs', True)
-        self._dav_endpoint_version = kwargs.get('dav_endpoint_version', True)
+def _timed_connect(connect, connection):
+    """Opens a connection and adds the time it took to the connect timer
+    of the current thread
+    """
+    start = _clock()
+    try:
+        connect(connection)
+    finally:
+        _connect_timer.elapsed = getattr(_connect_timer, 'elapsed', 0.0) + \
+            _clock() - start
+    pool = getattr(connection, '_counting_pool', None)
+    if pool is not None:
+        with _connect_count_lock:
+            pool.num_connects += 1
 
-        self._capabilities = None
-        self._version = None
 
-    def login(self, user_id, password):
-        """Authenticate to ownCloud.
-        This will create a session on the server.
+def _timed_get_conn(get_conn, pool, timeout):
+    """Takes a connection from a pool and adds the time it took to the
+    pool wait timer of the current thread
+    """
+    start = _clock()
+    try:
+        return get_conn(pool, timeout)
+    finally:
+        _pool_wait_timer.elapsed = \
+            getattr(_pool_wait_timer, 'elapsed', 0.0) + _clock() - start
 
-        :param user_id: user id
-        :param password: password
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
 
-        self._session = requests.session()
-        self._session.verify = self._verify_certs
-        self._session.auth = (user_id, password)
+class _TimedHTTPConnection(urllib3.connection.HTTPConnection):
 
-        try:
-            self._update_capabilities()
+    def connect(self):
+        _timed_connect(urllib3.connection.HTTPConnection.connect, self)
 
-            url_components = parse.urlparse(self.url)
-            if self._dav_endpoint_version == 1:
-                self._davpath = url_components.path + 'remote.php/dav/files/' + parse.quote(user_id)
-                self._webdav_url = self.url + 'remote.php/dav/files/' + parse.quote(user_id)
-            else:
-                self._davpath = url_components.path + 'remote.php/webdav'
-                self._webdav_url = self.url + 'remote.php/webdav'
 
-        except HTTPResponseError as e:
-            self._session.close()
-            self._session = None
-            raise e
+class _TimedHTTPSConnection(urllib3.connection.HTTPSConnection):
 
-    def logout(self):
-        """Log out the authenticated user and close the session.
+    def connect(self):
+        _timed_connect(urllib3.connection.HTTPSConnection.connect, self)
 
-        :returns: True if the operation succeeded, False otherwise
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
-        # TODO actual logout ?
-        self._session.close()
-        return True
 
-    def anon_login(self, folder_token, folder_password=''):
-        self._session = requests.session()
-        self._session.verify = self._verify_certs
-        self._session.auth = (folder_token, folder_password)
+class _ConnectCountingPool(object):
+    """Counts the connections a pool opens, including the reconnections of
+    connection objects which urllib3 reuses after the server closed them
+    """
 
-        url_components = parse.urlparse(self.url)
-        self._davpath = url_components.path + 'public.php/webdav'
-        self._webdav_url = self.url + 'public.php/webdav'
-    
-    @classmethod
-    def from_public_link(cls, public_link, folder_password='', **kwargs):
-        public_link_components = parse.urlparse(public_link)
-        url = public_link_components.scheme + '://' + public_link_components.hostname
-        if public_link_components.port:
-            url += ":" + public_link_components.port
-        folder_token = public_link_components.path.split('/')[-1]
-        anon_session = cls(url, **kwargs)
-        anon_session.anon_login(folder_token, folder_password=folder_password)
-        return anon_session
+    num_connects = 0
 
-    def drop_file(self, file_name):
-        """ Convenience wrapper for put_file """
-        destination = '/' + os.path.basename(file_name)
-        return self.put_file(destination, file_name)
+    def _new_conn(self):
+        conn = super(_ConnectCountingPool, self)._new_conn()
+        conn._counting_pool = self
+        return conn
 
-    def file_info(self, path, properties=None):
-        """Returns the file info for the given remote file
 
-        :param path: path to the remote file
-        :param properties: a list of properties to request (optional)
-        :returns: file info
-        :rtype: :class:`FileInfo` object or `None` if file
-            was not found
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
-        if properties:
-            root = ET.Element('d:propfind',
-                              {
-                                  'xmlns:d': "DAV:",
-                                  'xmlns:nc': "http://nextcloud.org/ns",
-                                  'xmlns:oc': "http://owncloud.org/ns"
-                              })
-            prop = ET.SubElement(root, 'd:prop')
-            for p in properties:
-                ET.SubElement(prop, p)
-            data = ET.tostring(root)
-        else:
-            data = None
-        res = self._make_dav_request('PROPFIND', path, headers={'Depth': '0'}, data=data)
-        if res:
-            return res[0]
-        return None
+class _TimedHTTPConnectionPool(_ConnectCountingPool,
+                               urllib3.connectionpool.HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
 
-    def list(self, path, depth=1, properties=None):
-        """Returns the listing/contents of the given remote directory
+    def _get_conn(self, timeout=None):
+        return _timed_get_conn(
+            urllib3.connectionpool.HTTPConnectionPool._get_conn, self, timeout
+        )
 
-        :param path: path to the remote directory
-        :param depth: depth of the listing, integer or "infinity"
-        :param properties: a list of properties to request (optional)
-        :returns: directory listing
-        :rtype: array of :class:`FileInfo` objects
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
-        if not path.endswith('/'):
-            path += '/'
 
-        headers = {}
-        if isinstance(depth, int) or depth == "infinity":
-            headers['Depth'] = str(depth)
+class _TimedHTTPSConnectionPool(_ConnectCountingPool,
+                                urllib3.connectionpool.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
 
-        if properties:
-            root = ET.Element('d:propfind',
-                              {
-                                  'xmlns:d': "DAV:",
-                                  'xmlns:nc': "http://nextcloud.org/ns",
-                                  'xmlns:oc': "http://owncloud.org/ns"
-                              })
-            prop = ET.SubElement(root, 'd:prop')
-            for p in properties:
-                ET.SubElement(prop, p)
-            data = ET.tostring(root)
-        else:
-            data = None
+    def _get_conn(self, timeout=None):
+        return _timed_get_conn(
+            urllib3.connectionpool.HTTPSConnectionPool._get_conn, self, timeout
+        )
 
-        res = self._make_dav_request('PROPFIND', path, headers=headers, data=data)
-        # first one is always the root, remove it from listing
-        if res:
-            return res[1:]
-        return None
 
-    def get_file_contents(self, path):
-        """Returns the contents of a remote file
+class PoolingHTTPAdapter(requests.adapters.HTTPAdapter):
+    """HTTP adapter with configurable socket options, which reports
+    statistics about its connection pools
+    """
 
-        :param path: path to the remote file
-        :returns: file contents
-        :rtype: binary data
-        :raises: HTTPResponseError in case an HTTP error status was returned
+    def __init__(self, socket_options=None, **kwargs):
+        """Instantiates an adapter
+
+        :param socket_options: list of socket options to set on every new
+            connection, as (level, option, value) tuples. Defaults to
+            urllib3's default options, which enable TCP_NODELAY
+        :param \*\*kwargs: optional arguments that
+            ``requests.adapters.HTTPAdapter`` accepts
         """
-        path = self._normalize_path(path)
-        res = self._session.get(
-            self._webdav_url + parse.quote(self._encode_string(path))
+        self._socket_options = socket_options
+        requests.adapters.HTTPAdapter.__init__(self, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False,
+                         **pool_kwargs):
+        if self._socket_options is not None:
+            pool_kwargs['socket_options'] = self._socket_options
+        requests.adapters.HTTPAdapter.init_poolmanager(
+            self, connections, maxsize, block=block, **pool_kwargs
         )
-        if res.status_code == 200:
-            return res.content
-        elif res.status_code >= 400:
-            raise HTTPResponseError(res)
-        return False
+        # time the opening of connections and the waits for a free
+        # connection for RequestEvent.timings
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
 
-    def get_file(self, remote_path, local_file=None):
-        """Downloads a remote file
+    def get_pool_stats(self):
+        """Returns statistics about the connection pools of this adapter
 
-        :param remote_path: path to the remote file
-        :param local_file: optional path to the local file. If none specified,
-            the file will be downloaded into the current directory
-        :returns: True if the operation succeeded, False otherwise
-        :raises: HTTPResponseError in case an HTTP error status was returned
+        :returns: dictionary with the number of host pools, of requests
+            sent, of connections created and reused, and of idle connections
         """
-        remote_path = self._normalize_path(remote_path)
-        res = self._session.get(
-            self._webdav_url + parse.quote(self._encode_string(remote_path)),
-            stream=True
+        stats = {
+            'pools': 0,
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'idle_connections': 0
+        }
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats['pools'] += 1
+            stats['requests'] += pool.num_requests
+            stats['connections_created'] += getattr(
+                pool, 'num_connects', pool.num_connections
+            )
+            if pool.pool is not None:
+                stats['idle_connections'] += sum(
+                    1 for conn in list(pool.pool.queue) if conn is not None
+                )
+        stats['connections_reused'] = max(
+            0, stats['requests'] - stats['connections_created']
         )
-        if res.status_code == 200:
-            if local_file is None:
-                # use downloaded file name from Content-Disposition
-                # local_file = res.headers['content-disposition']
-                local_file = os.path.basename(remote_path)
+        return stats
 
-            file_handle = open(local_file, 'wb', 8192)
-            for chunk in res.iter_content(8192):
-                file_handle.write(chunk)
-            file_handle.close()
-            return True
-        elif res.status_code >= 400:
-            raise HTTPResponseError(res)
-        return False
 
-    def get_directory_as_zip(self, remote_path, local_file):
-        """Downloads a remote directory as zip
+class Transport(object):
+    """Base class of the HTTP transports :class:`Client` sends its
+    requests with
 
-        :param remote_path: path to the remote directory to download
-        :param local_file: path and name of the target local file
-        :returns: True if the operation succeeded, False otherwise
-        :raises: HTTPResponseError in case an HTTP error status was returned
+    Responses returned by :meth:`request` must offer the ``status_code``,
+    ``headers`` and ``content`` attributes and the ``iter_content()`` and
+    ``close()`` methods of :class:`requests.Response`. They may have a
+    ``timings`` dictionary with the "pool_wait", "connect" and "ttfb"
+    durations described in :class:`RequestEvent`, which is reported to the
+    event hooks of the client.
+    """
+
+    name = None
+
+    # exceptions raised by request() when the connection to the server
+    # failed, such requests are retried according to the retry policy
+    connection_errors = ()
+
+    def open(self):
+        """Opens a new session, closing the current one if any
+
+        Requests are authenticated by :class:`Client` through their headers,
+        the session must keep the cookies set by the server.
         """
-        remote_path = self._normalize_path(remote_path)
-        url = self.url + 'index.php/apps/files/ajax/download.php?dir=' \
-              + parse.quote(remote_path)
-        res = self._session.get(url, stream=True)
-        if res.status_code == 200:
-            if local_file is None:
-                # use downloaded file name from Content-Disposition
-                # targetFile = res.headers['content-disposition']
-                local_file = os.path.basename(remote_path)
+        raise NotImplementedError()
 
-            file_handle = open(local_file, 'wb', 8192)
-            for chunk in res.iter_content(8192):
-                file_handle.write(chunk)
-            file_handle.close()
-            return True
-        elif res.status_code >= 400:
-            raise HTTPResponseError(res)
-        return False
+    def close(self):
+        """Closes the session and its connections"""
+        raise NotImplementedError()
 
-    def put_file_contents(self, remote_path, data):
-        """Write data into a remote file
+    def has_cookies(self):
+        """Returns whether the server set cookies in the current session"""
+        raise NotImplementedError()
 
-        :param remote_path: path of the remote file
-        :param data: data to write into the remote file
-        :returns: True if the operation succeeded, False otherwise
-        :raises: HTTPResponseError in case an HTTP error status was returned
+    def clear_cookies(self):
+        """Discards the cookies of the current session"""
+        raise NotImplementedError()
+
+    def request(self, method, url, headers=None, data=None, stream=False,
+                **kwargs):
+        """Sends an HTTP request
+
+        :param method: HTTP method
+        :param url: quoted URL to send the request to
+        :param headers: dictionary of request headers
+        :param data: request body as string, bytes, file object, or
+            dictionary of form fields
+        :param stream: True to return before the response body was read,
+            which can then be consumed with ``iter_content()``
+        :param \*\*kwargs: optional arguments that
+            ``requests.Session.request`` accepts, like ``timeout`` or
+            ``params``. Transports raise TypeError for the arguments they
+            do not support
+        :returns: response
         """
-        return self._make_dav_request('PUT', remote_path, data=data)
+        raise NotImplementedError()
 
-    def put_file(self, remote_path, local_source_file, **kwargs):
-        """Upload a file
+    def _check_arguments(self, kwargs, supported):
+        """Checks that a transport supports the optional arguments of
+        a request
 
-        :param remote_path: path to the target file. A target directory can
-            also be specified instead by appending a "/"
-        :param local_source_file: path to the local file to upload
-        :param chunked: (optional) use file chunking (defaults to True)
-        :param chunk_size: (optional) chunk size in bytes, defaults to 10 MB
-        :param keep_mtime: (optional) also update the remote file to the same
-            mtime as the local one, defaults to True
-        :returns: True if the operation succeeded, False otherwise
-        :raises: HTTPResponseError in case an HTTP error status was returned
+        :param kwargs: dictionary of optional arguments
+        :param supported: names of the supported arguments
+        :raises: TypeError naming the first unsupported argument
         """
-        if kwargs.get('chunked', True):
-            return self._put_file_chunked(
+        for name in kwargs:
+            if name not in supported:
+                raise TypeError(
+                    '%s does not support the "%s" argument'
+                    % (type(self).__name__, name)
+                )
+
+    def get_pool_stats(self):
+        """Returns statistics about the connection pool
+
+        :returns: dictionary of statistics or None if not available
+        """
+        return None
+
+
+class RequestsTransport(Transport):
+    """Transport using a :class:`requests.Session`, speaks HTTP/1.1"""
+
+    name = 'requests'
+    connection_errors = (requests.exceptions.ConnectionError,)
+
+    def __init__(self, verify_certs=True,
+                 pool_connections=requests.adapters.DEFAULT_POOLSIZE,
+                 pool_maxsize=requests.adapters.DEFAULT_POOLSIZE,
+                 pool_block=False, keep_alive=True, socket_options=None):
+        """Instantiates a transport
+
+        See :class:`Client` for the meaning of the arguments.
+        """
+        self.adapter = None
+        self.cookies = None
+        self._sessions = None
+        # process which opened the connection pool
+        self._pid = None
+        self._verify_certs = verify_certs
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._keep_alive = keep_alive
+        self._socket_options = socket_options
+
+    def open(self):
+        self.close()
+        self._open_pool()
+        self.cookies = requests.cookies.RequestsCookieJar()
+
+    def _open_pool(self):
+        self.adapter = PoolingHTTPAdapter(
+            socket_options=self._socket_options,
+            pool_connections=self._pool_connections,
+            pool_maxsize=self._pool_maxsize,
+            pool_block=self._pool_block
+        )
+        self._sessions = threading.local()
+        self._pid = os.getpid()
+
+    def _check_process(self):
+        """Opens a new connection pool in a forked or unpickled transport,
+        the connections of the pool of the parent process are left alone
+        """
+        if self._pid is not None and self._pid != os.getpid():
+            with _reopen_lock:
+                if self._pid != os.getpid():
+                    self._open_pool()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['adapter'] = None
+        state['_sessions'] = None
+        if self._pid is not None:
+            # reopened on first use
+            state['_pid'] = 0
+        return state
+
+    @property
+    def session(self):
+        """Session of the current thread
+
+        requests.Session is not thread safe, so every thread gets its own
+        session. They share the connection pool and the cookies.
+        """
+        self._check_process()
+        if self.adapter is None:
+            return None
+        session = getattr(self._sessions, 'session', None)
+        if session is None:
+            session = requests.session()
+            session.verify = self._verify_certs
+            session.cookies = self.cookies
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+            if not self._keep_alive:
+                session.headers['Connection'] = 'close'
+            self._sessions.session = session
+        return session
+
+    def close(self):
+        if self.adapter is not None and self._pid == os.getpid():
+            self.adapter.close()
+        self.adapter = None
+        self.cookies = None
+        self._sessions = None
+        self._pid = None
+
+    def has_cookies(self):
+        # the cookie jar is only thread safe while holding its lock
+        with self.cookies._cookies_lock:
+            return len(self.cookies) > 0
+
+    def clear_cookies(self):
+        self.cookies.clear()
+
+    def request(self, method, url, headers=None, data=None, stream=False,
+                **kwargs):
+        _connect_timer.elapsed = 0.0
+        _pool_wait_timer.elapsed = 0.0
+        res = self.session.request(
+            method, url, headers=headers, data=data, stream=stream, **kwargs
+        )
+        # requests measures the time until the response headers arrived
+        res.timings = {
+            'pool_wait': _pool_wait_timer.elapsed,
+            'connect': _connect_timer.elapsed,
+            'ttfb': res.elapsed.total_seconds()
+        }
+        return res
+
+    def get_pool_stats(self):
+        """Returns statistics about the connection pools,
+        see :meth:`PoolingHTTPAdapter.get_pool_stats`
+        """
+        self._check_process()
+        if self.adapter is None:
+            return None
+        return self.adapter.get_pool_stats()
+
+
+class _HTTPXResponse(object):
+    """Wraps an httpx response into the interface of
+    :class:`requests.Response` used by :class:`Client`
+    """
+
+    def __init__(self, response, timings=None):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.timings = timings
+
+    @property
+    def content(self):
+        return self._response.read()
+
+    def iter_content(self, chunk_size=1):
+        return self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        self._response.close()
+
+
+class HTTP2Transport(Transport):
+    """Transport using an httpx client, which multiplexes concurrent
+    requests over a single HTTP/2 connection when the server supports it
+
+    Requires the httpx module with HTTP/2 support (``httpx[http2]``).
+    """
+
+    name = 'http2'
+
+    def __init__(self, verify_certs=True,
+                 pool_maxsize=requests.adapters.DEFAULT_POOLSIZE,
+                 keep_alive=True, http2=True):
+        """Instantiates a transport
+
+        :param verify_certs: True to verify SSL certificates
+        :param pool_maxsize: maximum number of connections, HTTP/2
+            connections carry many requests at once
+        :param keep_alive: False to close connections after each request
+        :param http2: False to only speak HTTP/1.1
+        :raises: ImportError if httpx is not installed
+        """
+        if _httpx is None:
+            raise ImportError('httpx is not installed')
+        self.client = None
+        self._verify_certs = verify_certs
+        self._pool_maxsize = pool_maxsize
+        self._keep_alive = keep_alive
+        self._http2 = http2
+        self._requests = 0
+        self._lock = threading.Lock()
+        # process which opened the client
+        self._pid = None
+        self.connection_errors = (
+            _httpx.NetworkError,
+            _httpx.ConnectTimeout,
+            _httpx.RemoteProtocolError
+        )
+
+    def open(self):
+        self.close()
+        self._requests = 0
+        self._pid = os.getpid()
+        self.client = _httpx.Client(
+            http2=self._http2,
+            verify=self._verify_certs,
+            # same as requests, which does not time out by default
+            timeout=None,
+            limits=_httpx.Limits(
+                max_connections=self._pool_maxsize,
+                max_keepalive_connections=(
+                    self._pool_maxsize if self._keep_alive else 0
+                )
+            )
+        )
+
+    def close(self):
+        if self.client is not None and self._pid == os.getpid():
+            self.client.close()
+        self.client = None
+        self._pid = None
+
+    def _check_process(self):
+        """Opens a new client in a forked or unpickled transport, the
+        session cookies are not kept
+        """
+        if self._pid is not None and self._pid != os.getpid():
+            with _reopen_lock:
+                if self._pid != os.getpid():
+                    self.client = None
+                    self.open()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['client'] = None
+        del state['_lock']
+        if self._pid is not None:
+            # reopened on first use
+            state['_pid'] = 0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def has_cookies(self):
+        self._check_process()
+        return len(self.client.cookies) > 0
+
+    def clear_cookies(self):
+        self._check_process()
+        self.client.cookies.clear()
+
+    # optional request arguments which httpx offers too
+    SUPPORTED_ARGUMENTS = ('params', 'timeout')
+
+    def request(self, method, url, headers=None, data=None, stream=False,
+                **kwargs):
+        self._check_arguments(kwargs, self.SUPPORTED_ARGUMENTS)
+        if isinstance(data, dict):
+            kwargs['data'] = data
+        elif hasattr(data, 'read'):
+            # send files in blocks, with a length to avoid chunked encoding
+            position = data.tell()
+            data.seek(0, os.SEEK_END)
+            headers = dict(headers or {})
+            headers['Content-Length'] = str(data.tell() - position)
+            data.seek(position)
+            kwargs['content'] = iter(lambda: data.read(65536), b'')
+        elif data is not None:
+            kwargs['content'] = data
+
+        self._check_process()
+        timings = {'connect': 0.0}
+        trace_starts = {}
+        start = _clock()
+
+        def trace(event_name, info):
+            # events are named like "connection.connect_tcp.started"
+            step, _, state = event_name.rpartition('.')
+            if state == 'started':
+                trace_starts[step] = _clock()
+            elif step.endswith('.receive_response_headers'):
+                timings['ttfb'] = _clock() - start
+            elif step in ('connection.connect_tcp',
+                          'connection.start_tls') and step in trace_starts:
+                timings['connect'] += _clock() - trace_starts[step]
+
+        request = self.client.build_request(
+            method, url, headers=headers, extensions={'trace': trace},
+            **kwargs
+        )
+        with self._lock:
+            self._requests += 1
+        return _HTTPXResponse(
+            self.client.send(request, stream=stream), timings
+        )
+
+    def get_pool_stats(self):
+        """Returns statistics about the connection pool
+
+        :returns: dictionary with the number of requests sent, of open
+            and idle connections, and of connections using HTTP/2
+        """
+        self._check_process()
+        if self.client is None:
+            return None
+        pool = getattr(self.client._transport, '_pool', None)
+        connections = list(getattr(pool, 'connections', []))
+        return {
+            'requests': self._requests,
+            'connections': len(connections),
+            'idle_connections': sum(
+                1 for conn in connections if conn.is_idle()
+            ),
+            'http2_connections': sum(
+                1 for conn in connections if 'HTTP/2' in conn.info()
+            )
+        }
+
+
+class RetryPolicy(object):
+    """Retry policy for requests failing with a temporary error
+
+    Requests are only retried if their method is idempotent. The delay
+    between two attempts grows exponentially and is randomized, unless the
+    server asked for a specific delay with a Retry-After header.
+
+    Retries are limited by a budget shared by all requests of the client:
+    every request adds ``budget_ratio`` tokens to it and every retry takes
+    one token away, so that retries cannot multiply the load of a server
+    which is already failing.
+    """
+
+    IDEMPOTENT_METHODS = frozenset([
+        'GET', 'HEAD', 'OPTIONS', 'PROPFIND', 'REPORT', 'PUT', 'DELETE'
+    ])
+    RETRY_STATUS_CODES = frozenset([423, 429, 502, 503, 504])
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30,
+                 jitter=True, budget_ratio=0.2, budget_size=10,
+                 methods=None, status_codes=None):
+        """Instantiates a retry policy
+
+        :param max_retries: maximum number of retries per request,
+            defaults to 3
+        :param backoff_factor: delay in seconds before the first retry,
+            doubled for every following retry, defaults to 0.5
+        :param max_backoff: maximum delay in seconds, longer Retry-After
+            values are shortened to it, defaults to 30
+        :param jitter: True (default) to pick a random delay between zero
+            and the computed backoff
+        :param budget_ratio: number of retry tokens earned per request,
+            defaults to 0.2 which allows one retry for every five requests
+        :param budget_size: maximum number of tokens in the retry budget,
+            which starts full, defaults to 10
+        :param methods: HTTP methods to retry, defaults to
+            :attr:`IDEMPOTENT_METHODS`
+        :param status_codes: HTTP status codes to retry, defaults to
+            :attr:`RETRY_STATUS_CODES`
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.budget_ratio = budget_ratio
+        self.budget_size = budget_size
+        self.methods = frozenset(methods or self.IDEMPOTENT_METHODS)
+        self.status_codes = frozenset(status_codes or self.RETRY_STATUS_CODES)
+
+        self._lock = threading.Lock()
+        self._budget = float(budget_size)
+        self._retries = {}
+        self._budget_exhausted = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def is_retryable(self, method):
+        """Returns whether requests with the given method may be retried
+
+        :param method: HTTP method
+        :returns: True if the method is retryable, False otherwise
+        """
+        return method.upper() in self.methods
+
+    def on_request(self):
+        """Adds the tokens earned by a new request to the retry budget"""
+        with self._lock:
+            self._budget = min(self._budget + self.budget_ratio,
+                               self.budget_size)
+
+    def get_retry_delay(self, attempt, response=None, error=None):
+        """Returns how long to wait before retrying a failed request
+
+        :param attempt: number of retries already done for the request
+        :param response: response received, if any
+        :param error: exception raised while sending the request, if any
+        :returns: delay in seconds or None if the request must not be
+            retried
+        """
+        if attempt >= self.max_retries:
+            return None
+        if response is not None:
+            if response.status_code not in self.status_codes:
+                return None
+        elif error is None:
+            return None
+
+        delay = self.backoff_factor * (2 ** attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        retry_after = None
+        if response is not None:
+            retry_after = self._parse_retry_after(
+                response.headers.get('Retry-After')
+            )
+        if retry_after is not None:
+            delay = retry_after
+        return min(delay, self.max_backoff)
+
+    def acquire(self, endpoint):
+        """Takes a token from the retry budget for a retry
+
+        :param endpoint: label of the endpoint the retried request targets
+        :returns: True if the retry may happen, False if the budget
+            is exhausted
+        """
+        with self._lock:
+            if self._budget < 1:
+                self._budget_exhausted += 1
+                return False
+            self._budget -= 1
+            self._retries[endpoint] = self._retries.get(endpoint, 0) + 1
+            return True
+
+    def get_stats(self):
+        """Returns retry statistics
+
+        :returns: dictionary with the number of retries per endpoint,
+            the number of retries refused because the budget was exhausted
+            and the current budget
+        """
+        with self._lock:
+            return {
+                'retries': dict(self._retries),
+                'budget_exhausted': self._budget_exhausted,
+                'budget': self._budget
+            }
+
+    @staticmethod
+    def _parse_retry_after(value):
+        """Parses a Retry-After header value
+
+        :param value: number of seconds or HTTP date
+        :returns: delay in seconds or None if the value is missing or
+            invalid
+        """
+        if not value:
+            return None
+        try:
+            return max(0, int(value))
+        except ValueError:
+            pass
+        date = email.utils.parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0, email.utils.mktime_tz(date) - time.time())
+
+
+def _replace_file(source, target):
+    """Moves a file to a path, replacing the file at that path if any,
+    like ``os.replace()`` of Python 3
+
+    :param source: path of the file to move
+    :param target: path to move it to
+    """
+    if hasattr(os, 'replace'):
+        os.replace(source, target)
+        return
+    try:
+        os.rename(source, target)
+    except OSError:
+        # Windows does not rename files over existing ones
+        os.remove(target)
+        os.rename(source, target)
+
+
+class CapabilitiesCache(object):
+    """On-disk cache of the capabilities and version of ownCloud servers
+
+    Lets short-lived processes log in without fetching the capabilities
+    from the server every time. Entries are stored per server URL in a
+    JSON file and expire after ``ttl`` seconds.
+
+    Updates of the file hold a lock on a ".lock" file next to it, so that
+    processes sharing the cache do not lose each other's entries. File
+    locks need the ``fcntl`` module, on Windows a cache file must not be
+    shared by processes which update it at the same time.
+    """
+
+    def __init__(self, path=None, ttl=3600):
+        """Instantiates a cache
+
+        :param path: path to the cache file, defaults to
+            "pyocclient/capabilities.json" in the user's cache directory
+        :param ttl: number of seconds after which an entry expires,
+            defaults to one hour
+        """
+        if path is None:
+            cache_dir = os.environ.get('XDG_CACHE_HOME') or \
+                os.path.join(os.path.expanduser('~'), '.cache')
+            path = os.path.join(cache_dir, 'pyocclient', 'capabilities.json')
+        self.path = path
+        self.ttl = ttl
+
+    def get(self, url):
+        """Returns the cached entry of a server
+
+        :param url: URL of the server
+        :returns: dictionary with the "capabilities" and "version" of the
+            server, or None if there is no valid entry
+        """
+        entry = self._read().get(url)
+        if entry is None or time.time() - entry.get('time', 0) > self.ttl:
+            return None
+        return entry
+
+    def set(self, url, capabilities, version):
+        """Stores the entry of a server
+
+        :param url: URL of the server
+        :param capabilities: capabilities dictionary
+        :param version: version string
+        """
+        with self._locked():
+            entries = self._read()
+            entries[url] = {
+                'time': time.time(),
+                'capabilities': capabilities,
+                'version': version
+            }
+            self._write(entries)
+
+    def invalidate(self, url):
+        """Removes the entry of a server
+
+        :param url: URL of the server
+        """
+        with self._locked():
+            entries = self._read()
+            if entries.pop(url, None) is not None:
+                self._write(entries)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Holds an exclusive lock on the cache while its entries are read,
+        changed and written back, if the platform supports file locks
+        """
+        if fcntl is None:
+            yield
+            return
+        self._make_dir()
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _make_dir(self):
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _write(self, entries):
+        self._make_dir()
+        # write to a temporary file first so that concurrent processes
+        # never read a partially written file
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.path) or '.'
+        )
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            _replace_file(temp_path, self.path)
+        except (IOError, OSError):
+            os.remove(temp_path)
+            raise
+
+
+class OCSResponse(object):
+    """Envelope of an OCS response, parsed once and used by all OCS
+    methods of :class:`Client`
+    """
+
+    def __init__(self, response, status_code, message, data, tree):
+        """Instantiates an OCS response
+
+        :param response: HTTP response
+        :param status_code: OCS status code or None if missing, the
+            success code 200 of OCS v2 is reported as 100 like in v1
+        :param message: OCS status message or None if missing
+        :param data: data element, a :class:`JSONElement` for JSON responses
+        :param tree: root element of the parsed response, or the decoded
+            "ocs" object for JSON responses
+        """
+        self.response = response
+        self.status_code = status_code
+        self.message = message
+        self.data = data
+        self.tree = tree
+
+
+class _OCSRequest(object):
+    """OCS API request built by :class:`Client` for itself and for
+    :class:`owncloud.aio.AsyncClient`, which only differ in how they send
+    it
+    """
+
+    def __init__(self, method, service, action, parse=None, raw=False,
+                 **kwargs):
+        """Instantiates an OCS request
+
+        :param method: HTTP method
+        :param service: service name
+        :param action: action path
+        :param parse: function returning the result of the request from
+            its :class:`OCSResponse`, the result is True if not given
+        :param raw: True to pass the HTTP response to ``parse`` instead,
+            without checking its status
+        :param \*\*kwargs: optional arguments that ``Client._ocs_request``
+            accepts
+        """
+        self.method = method
+        self.service = service
+        self.action = action
+        self.parse = parse or (lambda response: True)
+        self.raw = raw
+        self.kwargs = kwargs
+
+
+def _check_status_ok(res):
+    """Returns True if the response has the status 200
+
+    :raises: HTTPResponseError otherwise
+    """
+    if res.status_code == 200:
+        return True
+    raise HTTPResponseError(res)
+
+
+def _get_ok_response(res):
+    """Returns the response if it has the status 200
+
+    :raises: HTTPResponseError otherwise
+    """
+    if res.status_code == 200:
+        return res
+    raise HTTPResponseError(res)
+
+
+class RequestEvent(object):
+    """Report of an HTTP exchange with the server, passed to the event
+    hooks of :class:`Client` once the exchange completed or failed
+    """
+
+    def __init__(self, method, url, endpoint, retries=0):
+        """Instantiates an event
+
+        :param method: HTTP method
+        :param url: URL the request was sent to
+        :param endpoint: label of the targeted endpoint, "dav", "files" or
+            "ocs/" followed by the OCS service name
+        :param retries: number of times the request was retried before
+            this exchange
+        """
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint
+        # "dav", "ocs" or "files"
+        self.endpoint_class = endpoint.split('/', 1)[0]
+        self.retries = retries
+        # clock time the request was sent at, a time.perf_counter() value
+        self.start = None
+        # None if no response was received
+        self.status_code = None
+        # exception raised by the transport if the exchange failed
+        self.error = None
+        # size of the request body, None if unknown
+        self.bytes_sent = 0
+        # size of the response body, for streamed responses the announced
+        # Content-Length or None
+        self.bytes_received = None
+        # durations in seconds: "pool_wait" spent waiting for a free
+        # connection of a blocking pool, if the transport reports it;
+        # "connect" spent opening a new connection, including DNS
+        # resolution and TLS handshake, zero if a connection was reused;
+        # "ttfb" until the response headers arrived; "total"
+        # until the response body was read, or until the headers arrived
+        # for streamed responses
+        self.timings = {}
+
+    @property
+    def operation(self):
+        """Name of the operation, the method followed by the endpoint"""
+        return self.method + ' ' + self.endpoint
+
+
+class RequestTracker(object):
+    """Records the requests sent by a client, grouped by the public method
+    of the client which sent them, see :meth:`Client.track`
+
+    Requests are attributed to the outermost public method on the stack,
+    so that the requests of ``mkdir()`` calls made by ``put_directory()``
+    are counted for ``put_directory``. Requests sent outside of any public
+    method are counted for "<unknown>".
+
+    Functions nested in a public method, like callbacks handed to worker
+    threads, are credited to the enclosing method without counting an
+    invocation of it. This also holds for a nested function which is called
+    after the method returned, so such requests are counted for the method
+    which defined the function rather than the one which called it.
+    """
+
+    UNKNOWN = '<unknown>'
+
+    # numbers of the trackers, for the names of their invocation markers
+    _numbers = itertools.count()
+
+    def __init__(self, client):
+        """Instantiates a tracker, which records requests once entered
+
+        :param client: :class:`Client` instance to track
+        """
+        self._client = client
+        self._codes = self._get_method_codes(type(client))
+        self._lock = threading.Lock()
+        self._stats = {}
+        # name of the variable marking the method invocations counted by
+        # this tracker, it is not a valid identifier so that it cannot
+        # clash with the variables of the methods
+        self._marker = '.tracker%i' % next(self._numbers)
+
+    def __enter__(self):
+        self._client.add_event_hook(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._client.remove_event_hook(self)
+        return False
+
+    def __call__(self, event):
+        """Records an event
+
+        :param event: :class:`RequestEvent` instance
+        """
+        found = None
+        found_frame = None
+        frame = sys._getframe(1)
+        while frame is not None:
+            code = self._codes.get(frame.f_code)
+            if code is not None:
+                found = code
+                found_frame = frame
+            frame = frame.f_back
+
+        name = self.UNKNOWN
+        method_frame = None
+        if found is not None:
+            name, is_method = found
+            # nested functions may run in other threads or after the
+            # method invocation, so they never start a new invocation
+            if is_method:
+                method_frame = found_frame
+
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = {
+                    'calls': 0,
+                    'requests': 0,
+                    'errors': 0,
+                    'bytes_sent': 0,
+                    'bytes_received': 0,
+                    'time': 0.0,
+                    'operations': {}
+                }
+                self._stats[name] = stats
+            if method_frame is not None:
+                # the marker lives and dies with the frame of the
+                # invocation, holding the frame instead would keep its
+                # variables alive after the method returned, and its
+                # identity can be reused by the next invocation
+                method_locals = method_frame.f_locals
+                if self._marker not in method_locals:
+                    method_locals[self._marker] = True
+                    stats['calls'] += 1
+            stats['requests'] += 1
+            if event.error is not None:
+                stats['errors'] += 1
+            stats['bytes_sent'] += event.bytes_sent or 0
+            stats['bytes_received'] += event.bytes_received or 0
+            stats['time'] += event.timings.get('total', 0.0)
+            operations = stats['operations']
+            operations[event.operation] = \
+                operations.get(event.operation, 0) + 1
+
+    @property
+    def requests(self):
+        """Total number of recorded requests"""
+        with self._lock:
+            return sum(stats['requests'] for stats in self._stats.values())
+
+    def get_stats(self):
+        """Returns the recorded requests by client method
+
+        :returns: dictionary by method name of dictionaries with the number
+            of invocations of the method which sent requests ("calls"), the
+            number of requests and of failed requests, the bytes sent and
+            received, the total time of the requests in seconds, and the
+            number of requests by operation, for example "PROPFIND dav".
+            Invocations are only counted in the thread calling the method,
+            requests sent by functions nested in a method, for example in
+            worker threads, are counted for that method.
+        """
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                result[name] = dict(stats)
+                result[name]['operations'] = dict(stats['operations'])
+            return result
+
+    @staticmethod
+    def _get_method_codes(cls):
+        """Returns the code objects of the public methods of a class
+
+        :param cls: client class
+        :returns: dictionary by code object of (method name, is_method)
+            tuples, is_method is False for functions nested in the methods
+        """
+        codes = _PUBLIC_METHOD_CODES.get(cls)
+        if codes is not None:
+            return codes
+
+        codes = {}
+        for name in dir(cls):
+            if name.startswith('_'):
+                continue
+            method = getattr(cls, name, None)
+            code = getattr(getattr(method, '__func__', method), '__code__',
+                           None)
+            if code is None:
+                continue
+            codes[code] = (name, True)
+            pending = [code]
+            while pending:
+                for const in pending.pop().co_consts:
+                    if isinstance(const, types.CodeType):
+                        codes[const] = (name, False)
+                        pending.append(const)
+        _PUBLIC_METHOD_CODES[cls] = codes
+        return codes
+
+
+class BatchOperation(object):
+    """Operation queued in a :class:`Batch` and its outcome"""
+
+    PENDING = 'pending'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+
+    def __init__(self, index, name, args):
+        """Instantiates an operation
+
+        :param index: position of the operation in the batch
+        :param name: name of the client method, "mkdir", "delete", "move"
+            or "copy"
+        :param args: tuple of the arguments of the client method
+        """
+        self.index = index
+        self.name = name
+        self.args = args
+        self.status = self.PENDING
+        # return value of the client method
+        self.result = None
+        # exception raised by the client method
+        self.error = None
+        # failed or skipped operation this operation depended on, which
+        # caused it to be skipped
+        self.dependency = None
+        # duration of the client method call in seconds
+        self.duration = None
+        self._dependents = []
+        self._pending = 0
+
+    def __repr__(self):
+        return '<BatchOperation %i %s%r %s>' % (
+            self.index, self.name, self.args, self.status
+        )
+
+
+class BatchReport(object):
+    """Outcome of the operations of a :class:`Batch`"""
+
+    def __init__(self, operations, duration):
+        """Instantiates a report
+
+        :param operations: list of :class:`BatchOperation` in the order
+            they were queued
+        :param duration: duration of the execution in seconds
+        """
+        self.operations = operations
+        self.duration = duration
+
+    def get_succeeded(self):
+        """Returns the operations which succeeded
+
+        :returns: list of :class:`BatchOperation`
+        """
+        return self._get_by_status(BatchOperation.SUCCEEDED)
+
+    def get_failed(self):
+        """Returns the operations which failed, with their error
+
+        :returns: list of :class:`BatchOperation`
+        """
+        return self._get_by_status(BatchOperation.FAILED)
+
+    def get_skipped(self):
+        """Returns the operations which were not run because an operation
+        they depended on did not succeed, or because the batch stopped on
+        an error
+
+        :returns: list of :class:`BatchOperation`
+        """
+        return self._get_by_status(BatchOperation.SKIPPED)
+
+    def is_successful(self):
+        """Returns whether all operations succeeded"""
+        return all(operation.status == BatchOperation.SUCCEEDED
+                   for operation in self.operations)
+
+    def _get_by_status(self, status):
+        return [operation for operation in self.operations
+                if operation.status == status]
+
+
+class Batch(object):
+    """Queue of WebDAV operations executed concurrently, see
+    :meth:`Client.batch`
+
+    Operations run in parallel unless they conflict: two operations
+    conflict when one of them modifies a path which the other one uses,
+    or which contains or is contained in a path the other one uses.
+    Conflicting operations run in the order they were queued, so
+    directories must be queued before their content. Copies from the same
+    source do not conflict. Operations depending on a failed operation are
+    skipped.
+    """
+
+    # operations and whether they modify their source path
+    OPERATIONS = {
+        'mkdir': True,
+        'delete': True,
+        'move': True,
+        'copy': False
+    }
+
+    def __init__(self, client, max_workers=8, stop_on_error=False):
+        """Instantiates a batch
+
+        :param client: :class:`Client` instance to run the operations with
+        :param max_workers: maximum number of concurrent requests
+        :param stop_on_error: True to skip the operations which did not
+            start yet once an operation failed
+        """
+        self._client = client
+        self._max_workers = max_workers
+        self._stop_on_error = stop_on_error
+        self._stopped = False
+        self._operations = []
+        # operations by path, and by path of the directories above theirs
+        self._by_path = {}
+        self._below_path = {}
+        self.report = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.report = self.execute()
+        return False
+
+    def __len__(self):
+        return len(self._operations)
+
+    def mkdir(self, path):
+        """Queues the creation of a remote directory
+
+        :param path: path to the remote directory to create
+        :returns: :class:`BatchOperation` instance
+        """
+        return self._add('mkdir', (path,), path, None)
+
+    def delete(self, path):
+        """Queues the deletion of a remote file or directory
+
+        :param path: path to the file or directory to delete
+        :returns: :class:`BatchOperation` instance
+        """
+        return self._add('delete', (path,), path, None)
+
+    def move(self, remote_path_source, remote_path_target):
+        """Queues the move of a remote file or directory
+
+        :param remote_path_source: source file or folder to move
+        :param remote_path_target: target file to which to move
+            the source file, or target directory ending with a "/"
+        :returns: :class:`BatchOperation` instance
+        """
+        return self._add('move', (remote_path_source, remote_path_target),
+                         remote_path_source, remote_path_target)
+
+    def copy(self, remote_path_source, remote_path_target):
+        """Queues the copy of a remote file or directory
+
+        :param remote_path_source: source file or folder to copy
+        :param remote_path_target: target file to which to copy
+        :returns: :class:`BatchOperation` instance
+        """
+        return self._add('copy', (remote_path_source, remote_path_target),
+                         remote_path_source, remote_path_target)
+
+    def execute(self):
+        """Runs the queued operations and empties the queue
+
+        :returns: :class:`BatchReport` instance
+        """
+        operations = self._operations
+        self._operations = []
+        self._by_path = {}
+        self._below_path = {}
+        self._stopped = False
+        start = _clock()
+
+        if self._max_workers > 1 and len(operations) > 1:
+            self._execute_concurrently(operations)
+        else:
+            # the queue order satisfies all dependencies
+            for operation in operations:
+                if operation.status == BatchOperation.PENDING:
+                    self._run(operation)
+                    self._finish(operation)
+
+        return BatchReport(operations, _clock() - start)
+
+    def _execute_concurrently(self, operations):
+        lock = threading.Lock()
+        done = threading.Event()
+        remaining = [len(operations)]
+        pool = ThreadPool(min(self._max_workers, len(operations)))
+
+        def finished(operation):
+            # called by the result thread of the pool
+            with lock:
+                ready, count = self._finish(operation)
+                remaining[0] -= count
+                if remaining[0] == 0:
+                    done.set()
+            for ready_operation in ready:
+                pool.apply_async(self._run, (ready_operation,),
+                                 callback=finished)
+
+        try:
+            for operation in operations:
+                if operation._pending == 0:
+                    pool.apply_async(self._run, (operation,),
+                                     callback=finished)
+            done.wait()
+        finally:
+            pool.close()
+            pool.join()
+
+    def _run(self, operation):
+        """Runs an operation, storing its outcome in it
+
+        :param operation: :class:`BatchOperation` to run
+        :returns: the operation
+        """
+        if self._stopped:
+            operation.status = BatchOperation.SKIPPED
+            return operation
+        start = _clock()
+        try:
+            operation.result = getattr(self._client, operation.name)(
+                *operation.args
+            )
+            operation.status = BatchOperation.SUCCEEDED
+        except Exception as e:
+            operation.error = e
+            operation.status = BatchOperation.FAILED
+            if self._stop_on_error:
+                self._stopped = True
+        operation.duration = _clock() - start
+        return operation
+
+    def _finish(self, operation):
+        """Releases the operations depending on a finished operation, and
+        skips them if it did not succeed
+
+        :param operation: finished :class:`BatchOperation`
+        :returns: tuple of the list of operations ready to run and of the
+            number of finished operations, including the skipped ones
+        """
+        ready = []
+        count = 0
+        finished = [operation]
+        while finished:
+            current = finished.pop()
+            count += 1
+            for dependent in current._dependents:
+                if current.status != BatchOperation.SUCCEEDED and \
+                        dependent.dependency is None:
+                    dependent.dependency = current
+                dependent._pending -= 1
+                if dependent._pending > 0:
+                    continue
+                if dependent.dependency is not None or self._stopped:
+                    dependent.status = BatchOperation.SKIPPED
+                    finished.append(dependent)
+                else:
+                    ready.append(dependent)
+        return ready, count
+
+    def _add(self, name, args, source, target):
+        """Queues an operation after the queued operations it conflicts
+        with
+
+        :param name: name of the client method
+        :param args: arguments of the client method
+        :param source: path used by the operation
+        :param target: path the operation writes to, or None
+        :returns: :class:`BatchOperation` instance
+        """
+        operation = BatchOperation(len(self._operations), name, args)
+        paths = [(self._get_path_key(source), self.OPERATIONS[name])]
+        if target is not None:
+            paths.append((self._get_path_key(target), True))
+
+        dependencies = set()
+        for key, writes in paths:
+            candidates = list(self._below_path.get(key, []))
+            for length in range(len(key) + 1):
+                candidates.extend(self._by_path.get(key[:length], []))
+            for other, other_writes in candidates:
+                if writes or other_writes:
+                    dependencies.add(other)
+
+        for other in sorted(dependencies, key=lambda op: op.index):
+            other._dependents.append(operation)
+        operation._pending = len(dependencies)
+
+        for key, writes in paths:
+            self._by_path.setdefault(key, []).append((operation, writes))
+            for length in range(len(key)):
+                self._below_path.setdefault(key[:length], []).append(
+                    (operation, writes)
+                )
+        self._operations.append(operation)
+        return operation
+
+    @staticmethod
+    def _get_path_key(path):
+        """Returns the components of a remote path, the root has none"""
+        if isinstance(path, FileInfo):
+            path = path.path
+        if six.PY2 and isinstance(path, str):
+            path = path.decode('utf-8')
+        return tuple(part for part in path.split('/') if part)
+
+
+class Client(object):
+    """ownCloud client
+
+    Once logged in, a client can be shared by threads: its methods can be
+    called concurrently. The requests share one connection pool, and with
+    the "requests" transport every thread uses its own session which shares
+    the cookies of the others. :meth:`login`, :meth:`anon_login` and
+    :meth:`logout` must not be called while other threads use the client.
+
+    Clients can be pickled, for example to pass them to the workers of a
+    ``multiprocessing`` pool. The unpickled client keeps the credentials,
+    session cookies, capabilities and WebDAV URL, so it does not log in
+    again, but not the event hooks, tracer and recording. A client opens
+    new connections when it is first used in a forked process, the
+    connections of the parent process are never shared.
+    """
+
+    OCS_BASEPATH = 'ocs/v1.php/'
+    OCS_V2_BASEPATH = 'ocs/v2.php/'
+    OCS_SERVICE_SHARE = 'apps/files_sharing/api/v1'
+    OCS_SERVICE_PRIVATEDATA = 'privatedata'
+    OCS_SERVICE_CLOUD = 'cloud'
+
+    # constants from lib/public/constants.php
+    OCS_PERMISSION_READ = 1
+    OCS_PERMISSION_UPDATE = 2
+    OCS_PERMISSION_CREATE = 4
+    OCS_PERMISSION_DELETE = 8
+    OCS_PERMISSION_SHARE = 16
+    OCS_PERMISSION_ALL = 31
+    # constants from lib/public/share.php
+    OCS_SHARE_TYPE_USER = 0
+    OCS_SHARE_TYPE_GROUP = 1
+    OCS_SHARE_TYPE_LINK = 3
+    OCS_SHARE_TYPE_REMOTE = 6
+
+    # named property sets for file_info() and list(), "full" lets the
+    # server return all of its default properties
+    PROPFIND_PROFILES = {
+        'names': ['d:resourcetype'],
+        'sync': ['d:getetag', 'd:getcontentlength', 'd:getlastmodified'],
+        'full': None
+    }
+
+    # number of directories whose size file_info_many() remembers
+    MAX_LISTING_SIZES = 1000
+
+    # properties requested by REPORT queries when none were given
+    REPORT_DEFAULT_PROPERTIES = [
+        'd:getlastmodified',
+        'd:getcontentlength',
+        'd:resourcetype',
+        'd:getetag',
+        'd:getcontenttype',
+        'oc:fileid',
+        'oc:favorite'
+    ]
+
+    def __init__(self, url, **kwargs):
+        """Instantiates a client
+
+        :param url: URL of the target ownCloud instance
+        :param verify_certs: True (default) to verify SSL certificates, False otherwise
+        :param dav_endpoint_version: None (default) to force using a specific endpoint version
+        instead of relying on capabilities
+        :param debug: set to True to print debugging messages to stdout,
+            defaults to False. Messages are logged with the "owncloud.dav",
+            "owncloud.ocs" and "owncloud.transfer" loggers of the
+            ``logging`` module, this enables them with a handler printing
+            to stdout. As logging is configured per process, the messages
+            of all clients are printed from then on, including those
+            created with debug set to False. Credentials are never logged.
+        :param pool_connections: number of hosts to keep connection pools
+            for, defaults to 10
+        :param pool_maxsize: maximum number of connections kept open per
+            host, defaults to 10
+        :param pool_block: True to wait for a free connection when all
+            connections of a host are in use instead of opening a new one
+            which is discarded afterwards, defaults to False
+        :param keep_alive: False to close connections after each request,
+            defaults to True
+        :param socket_options: list of (level, option, value) socket options
+            to set on new connections, defaults to urllib3's defaults which
+            enable TCP_NODELAY
+        :param retry_policy: :class:`RetryPolicy` instance to retry requests
+            failing with a temporary error, defaults to None which disables
+            retries
+        :param xml_backend: "etree" (default), "lxml", "auto" which uses
+            lxml when it is installed, or an :class:`XMLBackend` instance to
+            use for parsing responses
+        :param transport: "requests" (default), "http2" for the HTTP/2
+            capable :class:`HTTP2Transport` or a :class:`Transport` instance
+            to send requests with
+        :param reuse_session: True to authenticate requests with the session
+            cookies set by the server instead of the credentials, which
+            saves the server from verifying them on each request. The
+            credentials are sent again when the session expired. Defaults
+            to False
+        :param capabilities_cache: :class:`CapabilitiesCache` instance to
+            read the capabilities from when logging in, defaults to None.
+            Logging in with cached capabilities does not send any request,
+            invalid credentials are then reported by the first request
+        :param lazy_login: True to defer fetching the capabilities until
+            they or the WebDAV URL are needed, defaults to False
+        :param ocs_format: "xml" (default) or "json" to request OCS
+            responses as JSON, which is faster to parse
+        :param ocs_version: 1 (default) or 2 to use the OCS v2 endpoint, which
+            reports OCS errors with an HTTP error status. These raise
+            HTTPResponseError instead of OCSResponseError
+        :param event_hooks: list of callables called with a
+            :class:`RequestEvent` after every HTTP exchange with the server,
+            for example a :class:`owncloud.metrics.MetricsCollector`.
+            Hooks are called in the thread which sent the request and
+            should return quickly, defaults to no hooks
+        :param tracer: :class:`owncloud.tracing.Tracer` instance recording
+            the requests and the internal stages of the client as spans,
+            defaults to None which disables tracing
+        :param recording: :class:`owncloud.replay.Recording` instance to
+            record the requests and responses into, for replaying them
+            with :class:`owncloud.replay.ReplayTransport`, defaults to None
+        :raises: ValueError if the OCS format or version is unknown
+        """
+        if not url.endswith('/'):
+            url += '/'
+
+        self.url = url
+        self._debug = kwargs.get('debug', False)
+        if self._debug:
+            _enable_debug_output()
+        self._verify_certs = kwargs.get('verify_certs', True)
+        self._dav_endpoint_version = kwargs.get('dav_endpoint_version', True)
+        self._requested_dav_endpoint_version = self._dav_endpoint_version
+        self._pool_connections = kwargs.get(
+            'pool_connections', requests.adapters.DEFAULT_POOLSIZE
+        )
+        self._pool_maxsize = kwargs.get(
+            'pool_maxsize', requests.adapters.DEFAULT_POOLSIZE
+        )
+        self._pool_block = kwargs.get('pool_block', False)
+        self._keep_alive = kwargs.get('keep_alive', True)
+        self._socket_options = kwargs.get('socket_options', None)
+        self._transport = self._get_transport(kwargs.get('transport', 'requests'))
+        if kwargs.get('recording') is not None:
+            from .replay import RecordingTransport
+            self._transport = RecordingTransport(self._transport,
+                                                 kwargs['recording'])
+        self._retry_policy = kwargs.get('retry_policy', None)
+        self._reuse_session = kwargs.get('reuse_session', False)
+        self._auth_header = None
+        self._session_established = False
+        # guards the lazy initialization of the capabilities and DAV URLs
+        self._lock = threading.RLock()
+        self._event_hooks = list(kwargs.get('event_hooks', []))
+        self._tracer = kwargs.get('tracer', None)
+        if self._tracer is not None:
+            self._event_hooks.append(self._tracer)
+
+        self._ocs_format = kwargs.get('ocs_format', 'xml')
+        if self._ocs_format not in ('xml', 'json'):
+            raise ValueError('Unknown OCS format: %s' % self._ocs_format)
+        self._ocs_version = kwargs.get('ocs_version', 1)
+        if self._ocs_version not in (1, 2):
+            raise ValueError('Unknown OCS version: %s' % self._ocs_version)
+        self._capabilities_cache = kwargs.get('capabilities_cache', None)
+        self._lazy_login = kwargs.get('lazy_login', False)
+        self._user_id = None
+        self._davpath = None
+        self._webdav_url = None
+
+        self._capabilities = None
+        self._version = None
+        # number of entries of recently listed directories, by path
+        self._listing_sizes = {}
+
+        self._xml = self._get_xml_backend(kwargs.get('xml_backend', 'etree'))
+        self._xml_lookups = {}
+
+    def __getstate__(self):
+        """Returns the configuration and authentication state of the
+        client, without its connections and instrumentation
+        """
+        state = self.__dict__.copy()
+        for name in ('_lock', '_xml_lookups'):
+            del state[name]
+        # event hooks, tracer and recording belong to the original client
+        state['_event_hooks'] = []
+        state['_tracer'] = None
+        from .replay import RecordingTransport
+        if isinstance(self._transport, RecordingTransport):
+            state['_transport'] = self._transport.transport
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._xml_lookups = {}
+        if self._debug:
+            _enable_debug_output()
+
+    def login(self, user_id, password):
+        """Authenticate to ownCloud.
+        This will create a session on the server.
+
+        :param user_id: user id
+        :param password: password or app password
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        self._open_session(self._get_basic_auth_header(user_id, password))
+        self._login(user_id)
+
+    def login_with_token(self, user_id, access_token):
+        """Authenticate to ownCloud with an OAuth2 access token,
+        which is sent as bearer token.
+
+        :param user_id: user id the token was issued for
+        :param access_token: access token
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        self._open_session('Bearer ' + access_token)
+        self._login(user_id)
+
+    def _login(self, user_id):
+        self._user_id = user_id
+        self._davpath = None
+        self._webdav_url = None
+        if self._load_cached_capabilities():
+            self._set_dav_urls(user_id)
+            return
+        if self._lazy_login:
+            return
+
+        try:
+            self._update_capabilities()
+            self._set_dav_urls(user_id)
+        except HTTPResponseError as e:
+            self._transport.close()
+            raise e
+
+    def logout(self):
+        """Log out the authenticated user and close the session.
+
+        :returns: True if the operation succeeded, False otherwise
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        # TODO actual logout ?
+        self._transport.close()
+        self._auth_header = None
+        self._session_established = False
+        return True
+
+    def anon_login(self, folder_token, folder_password=''):
+        self._open_session(
+            self._get_basic_auth_header(folder_token, folder_password)
+        )
+
+        url_components = parse.urlparse(self.url)
+        self._davpath = url_components.path + 'public.php/webdav'
+        self._webdav_url = self.url + 'public.php/webdav'
+    
+    def _open_session(self, auth_header):
+        """Opens a new session of the transport
+
+        :param auth_header: value of the Authorization header
+        """
+        self._transport.open()
+        self._auth_header = auth_header
+        self._session_established = False
+
+    @staticmethod
+    def _get_basic_auth_header(user_id, password):
+        credentials = user_id + ':' + password
+        if isinstance(credentials, six.text_type):
+            credentials = credentials.encode('utf-8')
+        return 'Basic ' + base64.b64encode(credentials).decode('ascii')
+
+    def get_pool_stats(self):
+        """Returns statistics about the connection pool of the transport,
+        see :meth:`PoolingHTTPAdapter.get_pool_stats` for the default one
+
+        :returns: dictionary of statistics or None if not logged in
+        """
+        return self._transport.get_pool_stats()
+
+    def get_retry_stats(self):
+        """Returns statistics about retried requests,
+        see :meth:`RetryPolicy.get_stats`
+
+        :returns: dictionary of statistics or None if retries are disabled
+        """
+        if self._retry_policy is None:
+            return None
+        return self._retry_policy.get_stats()
+
+    def add_event_hook(self, hook):
+        """Adds a hook called with a :class:`RequestEvent` after every
+        HTTP exchange with the server
+
+        :param hook: callable taking the event as only argument
+        """
+        self._event_hooks.append(hook)
+
+    def remove_event_hook(self, hook):
+        """Removes a hook added with :meth:`add_event_hook` or passed
+        to the constructor
+
+        :param hook: hook to remove
+        :raises: ValueError if the hook was not added
+        """
+        self._event_hooks.remove(hook)
+
+    def set_tracer(self, tracer):
+        """Sets the tracer recording the requests and the internal stages
+        of the client as spans
+
+        :param tracer: :class:`owncloud.tracing.Tracer` instance or None to
+            disable tracing
+        """
+        if self._tracer is not None:
+            self.remove_event_hook(self._tracer)
+        self._tracer = tracer
+        if tracer is not None:
+            self.add_event_hook(tracer)
+
+    def _span(self, name, category, **kwargs):
+        """Returns a context manager recording a span with the tracer
+
+        :param name: name of the span
+        :param category: category of the span
+        :param \*\*kwargs: arguments shown with the span
+        :returns: span, which does nothing when tracing is disabled
+        """
+        if self._tracer is None:
+            return _NULL_SPAN
+        return self._tracer.span(name, category, kwargs)
+
+    def track(self):
+        """Returns a context manager recording the requests sent while it
+        is active, grouped by the public method which sent them::
+
+            with client.track() as tracker:
+                client.put_directory('/', 'photos')
+            print(tracker.get_stats()['put_directory']['requests'])
+
+        Requests sent by other threads using this client are recorded too.
+
+        :returns: :class:`RequestTracker` instance
+        """
+        return RequestTracker(self)
+
+    def batch(self, **kwargs):
+        """Returns a batch to queue many mkdir, delete, move and copy
+        operations and run them concurrently::
+
+            with client.batch(max_workers=16) as batch:
+                batch.mkdir('/archive')
+                for name in names:
+                    batch.move('/inbox/' + name, '/archive/' + name)
+            for operation in batch.report.get_failed():
+                print(operation.name, operation.args, operation.error)
+
+        The operations are run when leaving the block, or by calling
+        :meth:`Batch.execute`. Errors do not interrupt the batch, they are
+        reported per operation.
+
+        :param max_workers: (optional) maximum number of concurrent
+            requests, defaults to 8
+        :param stop_on_error: (optional) True to skip the operations which
+            did not start yet once an operation failed, defaults to False
+        :returns: :class:`Batch` instance
+        """
+        return Batch(
+            self,
+            max_workers=kwargs.get('max_workers', 8),
+            stop_on_error=kwargs.get('stop_on_error', False)
+        )
+
+    @classmethod
+    def from_public_link(cls, public_link, folder_password='', **kwargs):
+        public_link_components = parse.urlparse(public_link)
+        url = public_link_components.scheme + '://' + public_link_components.hostname
+        if public_link_components.port:
+            url += ":" + str(public_link_components.port)
+        folder_token = public_link_components.path.split('/')[-1]
+        anon_session = cls(url, **kwargs)
+        anon_session.anon_login(folder_token, folder_password=folder_password)
+        return anon_session
+
+    def drop_file(self, file_name):
+        """ Convenience wrapper for put_file """
+        destination = '/' + os.path.basename(file_name)
+        return self.put_file(destination, file_name)
+
+    def file_info(self, path, properties=None):
+        """Returns the file info for the given remote file
+
+        :param path: path to the remote file
+        :param properties: a list of properties to request or the name of
+            one of the :attr:`PROPFIND_PROFILES` (optional)
+        :returns: file info
+        :rtype: :class:`FileInfo` object or `None` if file
+            was not found
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        data = self._get_propfind_body(properties)
+        res = self._make_dav_request('PROPFIND', path, headers={'Depth': '0'}, data=data)
+        if res:
+            return res[0]
+        return None
+
+    def file_info_many(self, paths, properties=None, **kwargs):
+        """Returns the file info for many remote files at once
+
+        When at least ``sibling_threshold`` of the given paths are in the
+        same directory, that directory is listed with a single request.
+        Directories this client listed before are only listed again when
+        the paths are at least ``sibling_ratio`` of their entries, so that
+        a few files are not looked up by listing a large directory. The file
+        info of the remaining paths is requested concurrently.
+
+        :param paths: list of paths to remote files
+        :param properties: a list of properties to request or the name of
+            one of the :attr:`PROPFIND_PROFILES` (optional)
+        :param sibling_threshold: (optional) minimum number of paths in
+            the same directory for listing it, defaults to 3
+        :param sibling_ratio: (optional) minimum ratio of the paths in a
+            directory to its number of entries for listing it, defaults
+            to 0.1
+        :param max_workers: (optional) maximum number of concurrent
+            requests, defaults to 8
+        :returns: dictionary mapping each path to its :class:`FileInfo`
+            object or to `None` if it was not found
+        :raises: HTTPResponseError in case an HTTP error status other
+            than 404 was returned
+        """
+        max_workers = kwargs.get('max_workers', 8)
+        tasks = self._get_file_info_tasks(
+            paths, kwargs.get('sibling_threshold', 3),
+            kwargs.get('sibling_ratio', 0.1)
+        )
+
+        if len(tasks) > 1 and max_workers > 1:
+            pool = ThreadPool(min(max_workers, len(tasks)))
+            try:
+                task_results = pool.map(
+                    lambda task: self._file_info_task(task, properties),
+                    tasks
+                )
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            task_results = [
+                self._file_info_task(task, properties) for task in tasks
+            ]
+
+        results = {}
+        for task_result in task_results:
+            results.update(task_result)
+        return results
+
+    def _get_file_info_tasks(self, paths, sibling_threshold, sibling_ratio):
+        """Groups the paths given to file_info_many() into requests
+
+        :param paths: list of paths to remote files
+        :param sibling_threshold: minimum number of paths in the same
+            directory for listing it
+        :param sibling_ratio: minimum ratio of the paths in a directory to
+            its known number of entries for listing it
+        :returns: list of tasks, as tuples of the directory to list or None,
+            and a list of tuples of requested path and normalized path
+        """
+        by_parent = {}
+        for path in paths:
+            key = self._normalize_path(path).rstrip('/')
+            if six.PY2 and isinstance(key, str):
+                key = key.decode('utf-8')
+            if key == '':
+                parent = None
+            else:
+                parent = key[0:key.rindex('/') + 1]
+            by_parent.setdefault(parent, []).append((path, key))
+
+        tasks = []
+        for parent, entries in by_parent.items():
+            listed = parent is not None and len(entries) >= sibling_threshold
+            if listed:
+                size = self._listing_sizes.get(parent)
+                listed = size is None or len(entries) >= size * sibling_ratio
+            if listed:
+                tasks.append((parent, entries))
+            else:
+                for entry in entries:
+                    tasks.append((None, [entry]))
+        return tasks
+
+    def _file_info_task(self, task, properties):
+        """Fetches the file info of a group of paths for file_info_many()
+
+        :param task: task as returned by _get_file_info_tasks()
+        :param properties: properties to request
+        :returns: dictionary mapping the requested paths to their file info
+        """
+        parent, entries = task
+        try:
+            if parent is None:
+                path, key = entries[0]
+                return {path: self.file_info(key or '/', properties)}
+            listing = self.list(parent, properties=properties)
+        except HTTPResponseError as e:
+            if e.status_code != 404:
+                raise e
+            listing = []
+        return self._match_listing(entries, listing)
+
+    @staticmethod
+    def _match_listing(entries, listing):
+        """Finds the requested entries of a file_info_many() task in the
+        listing of their directory
+
+        :param entries: list of tuples of requested path and normalized path
+        :param listing: array of :class:`FileInfo` of the directory
+        :returns: dictionary mapping the requested paths to their file info
+        """
+        found = {}
+        for file_info in listing or []:
+            found[file_info.path.rstrip('/')] = file_info
+        results = {}
+        for path, key in entries:
+            results[path] = found.get(key)
+        return results
+
+    def list(self, path, depth=1, properties=None):
+        """Returns the listing/contents of the given remote directory
+
+        :param path: path to the remote directory
+        :param depth: depth of the listing, integer or "infinity"
+        :param properties: a list of properties to request or the name of
+            one of the :attr:`PROPFIND_PROFILES` (optional)
+        :returns: directory listing
+        :rtype: array of :class:`FileInfo` objects
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        if not path.endswith('/'):
+            path += '/'
+
+        headers = {}
+        if isinstance(depth, int) or depth == "infinity":
+            headers['Depth'] = str(depth)
+
+        data = self._get_propfind_body(properties)
+        res = self._make_dav_request('PROPFIND', path, headers=headers, data=data)
+        # first one is always the root, remove it from listing
+        if res:
+            if depth == 1:
+                self._record_listing_size(path, len(res) - 1)
+            return res[1:]
+        return None
+
+    def _record_listing_size(self, path, size):
+        """Remembers the number of entries of a listed directory for
+        file_info_many()
+
+        :param path: path of the directory, with a trailing slash
+        :param size: number of entries
+        """
+        key = self._normalize_path(path)
+        if six.PY2 and isinstance(key, str):
+            key = key.decode('utf-8')
+        if len(self._listing_sizes) >= self.MAX_LISTING_SIZES:
+            self._listing_sizes.clear()
+        self._listing_sizes[key] = size
+
+    def filter_files(self, path='', favorite=None, systemtag=None,
+                     properties=None):
+        """Returns the files matching the given filter rules. The filtering
+        is done by the server with a WebDAV REPORT request.
+
+        :param path: path to the remote directory in which to search,
+            defaults to the root
+        :param favorite: True to only return files marked as favorite, the
+            server cannot filter files which are not favorites
+        :param systemtag: id or list of ids of system tags the returned
+            files must be tagged with
+        :param properties: a list of properties to request (optional)
+        :returns: matching files
+        :rtype: array of :class:`FileInfo` objects
+        :raises: ValueError if favorite is neither None nor True, or if
+            neither favorite nor systemtag is given
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        data = self._get_filter_files_body(favorite, systemtag, properties)
+        if not path.endswith('/'):
+            path += '/'
+        res = self._make_dav_request('REPORT', path, data=data)
+        if res is True:
+            return []
+        return res
+
+    def search_files(self, pattern, limit=None, properties=None):
+        """Searches files by name on the server side with a WebDAV REPORT
+        request
+
+        :param pattern: pattern the file names must contain
+        :param limit: maximum number of results (optional)
+        :param properties: a list of properties to request (optional)
+        :returns: matching files
+        :rtype: array of :class:`FileInfo` objects
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        data = self._get_search_files_body(pattern, limit, properties)
+        res = self._make_dav_request('REPORT', '/', data=data)
+        if res is True:
+            return []
+        return res
+
+    def get_file_contents(self, path):
+        """Returns the contents of a remote file
+
+        :param path: path to the remote file
+        :returns: file contents
+        :rtype: binary data
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        path = self._normalize_path(path)
+        res = self._request(
+            'GET',
+            self._get_webdav_url() + parse.quote(self._encode_string(path)),
+            'dav'
+        )
+        if res.status_code == 200:
+            return res.content
+        elif res.status_code >= 400:
+            raise HTTPResponseError(res)
+        return False
+
+    def get_file(self, remote_path, local_file=None):
+        """Downloads a remote file
+
+        :param remote_path: path to the remote file
+        :param local_file: optional path to the local file. If none specified,
+            the file will be downloaded into the current directory
+        :returns: True if the operation succeeded, False otherwise
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        remote_path = self._normalize_path(remote_path)
+        res = self._request(
+            'GET',
+            self._get_webdav_url() + parse.quote(self._encode_string(remote_path)),
+            'dav',
+            stream=True
+        )
+        if res.status_code == 200:
+            if local_file is None:
+                # use downloaded file name from Content-Disposition
+                # local_file = res.headers['content-disposition']
+                local_file = os.path.basename(remote_path)
+
+            _transfer_log.debug('downloading %s to %s', remote_path,
+                                local_file)
+            file_handle = open(local_file, 'wb', 8192)
+            for chunk in res.iter_content(8192):
+                file_handle.write(chunk)
+            file_handle.close()
+            return True
+        elif res.status_code >= 400:
+            raise HTTPResponseError(res)
+        return False
+
+    def get_directory_as_zip(self, remote_path, local_file):
+        """Downloads a remote directory as zip
+
+        :param remote_path: path to the remote directory to download
+        :param local_file: path and name of the target local file
+        :returns: True if the operation succeeded, False otherwise
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        remote_path = self._normalize_path(remote_path)
+        url = self.url + 'index.php/apps/files/ajax/download.php?dir=' \
+              + parse.quote(remote_path)
+        res = self._request('GET', url, 'files', stream=True)
+        if res.status_code == 200:
+            if local_file is None:
+                # use downloaded file name from Content-Disposition
+                # targetFile = res.headers['content-disposition']
+                local_file = os.path.basename(remote_path)
+
+            _transfer_log.debug('downloading %s to %s', remote_path,
+                                local_file)
+            file_handle = open(local_file, 'wb', 8192)
+            for chunk in res.iter_content(8192):
+                file_handle.write(chunk)
+            file_handle.close()
+            return True
+        elif res.status_code >= 400:
+            raise HTTPResponseError(res)
+        return False
+
+    def put_file_contents(self, remote_path, data):
+        """Write data into a remote file
+
+        :param remote_path: path of the remote file
+        :param data: data to write into the remote file
+        :returns: True if the operation succeeded, False otherwise
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        return self._make_dav_request('PUT', remote_path, data=data)
+
+    def put_file(self, remote_path, local_source_file, **kwargs):
+        """Upload a file
+
+        :param remote_path: path to the target file. A target directory can
+            also be specified instead by appending a "/"
+        :param local_source_file: path to the local file to upload
+        :param chunked: (optional) use file chunking (defaults to True)
+        :param chunk_size: (optional) chunk size in bytes, defaults to 10 MB
+        :param keep_mtime: (optional) also update the remote file to the same
+            mtime as the local one, defaults to True
+        :returns: True if the operation succeeded, False otherwise
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        if kwargs.get('chunked', True):
+            return self._put_file_chunked(
                 remote_path,
                 local_source_file,
                 **kwargs
             )
 
-        stat_result = os.stat(local_source_file)
-
-        headers = {}
-        if kwargs.get('keep_mtime', True):
-            headers['X-OC-MTIME'] = str(int(stat_result.st_mtime))
-
-        if remote_path[-1] == '/':
-            remote_path += os.path.basename(local_source_file)
+        remote_path, headers = self._get_upload_request(
+            remote_path, local_source_file, **kwargs
+        )
+        _transfer_log.debug('uploading %s to %s', local_source_file,
+                            remote_path)
         file_handle = open(local_source_file, 'rb', 8192)
         res = self._make_dav_request(
             'PUT',
@@ -639,53 +2833,30 @@ class Client(object):
         :returns: True if the operation succeeded, False otherwise
         :raises: HTTPResponseError in case an HTTP error status was returned
         """
-        chunk_size = kwargs.get('chunk_size', 10 * 1024 * 1024)
+        remote_path, headers, chunk_size, chunk_paths = \
+            self._get_chunked_upload_request(remote_path, local_source_file,
+                                             **kwargs)
+        chunk_count = len(chunk_paths)
         result = True
-        transfer_id = int(time.time())
-
-        remote_path = self._normalize_path(remote_path)
-        if remote_path.endswith('/'):
-            remote_path += os.path.basename(local_source_file)
-
-        stat_result = os.stat(local_source_file)
+        _transfer_log.debug('uploading %s to %s in %i chunks',
+                            local_source_file, remote_path, chunk_count)
 
         file_handle = open(local_source_file, 'rb', 8192)
-        file_handle.seek(0, os.SEEK_END)
-        size = file_handle.tell()
-        file_handle.seek(0)
-
-        headers = {}
-        if kwargs.get('keep_mtime', True):
-            headers['X-OC-MTIME'] = str(int(stat_result.st_mtime))
-
-        if size == 0:
-            return self._make_dav_request(
-                'PUT',
-                remote_path,
-                data='',
-                headers=headers
-            )
-
-        chunk_count = int(math.ceil(float(size) / float(chunk_size)))
-
-        if chunk_count > 1:
-            headers['OC-CHUNKED'] = '1'
-
-        for chunk_index in range(0, int(chunk_count)):
-            data = file_handle.read(chunk_size)
-            if chunk_count > 1:
-                chunk_name = '%s-chunking-%s-%i-%i' % \
-                             (remote_path, transfer_id, chunk_count,
-                              chunk_index)
-            else:
-                chunk_name = remote_path
+        for chunk_index, chunk_path in enumerate(chunk_paths):
+            with self._span('read chunk', 'io', index=chunk_index):
+                data = file_handle.read(chunk_size)
 
-            if not self._make_dav_request(
+            with self._span('upload chunk', 'dav', index=chunk_index,
+                            size=len(data)):
+                uploaded = self._make_dav_request(
                     'PUT',
-                    chunk_name,
+                    chunk_path,
                     data=data,
                     headers=headers
-            ):
+                )
+            if not uploaded:
+                _transfer_log.debug('upload of chunk %i/%i of %s failed',
+                                    chunk_index + 1, chunk_count, remote_path)
                 result = False
                 break
 
@@ -719,24 +2890,20 @@ class Client(object):
         :raises: HTTPResponseError in case an HTTP error status was returned
         """
 
-        res = self._make_ocs_request(
+        ocs = self._ocs_request(
             'GET',
             self.OCS_SERVICE_SHARE,
             'remote_shares/pending'
         )
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
-            shares = []
-            for element in tree.find('data').iter('element'):
-                share_attr = {}
-                for child in element:
-                    key = child.tag
-                    value = child.text
-                    share_attr[key] = value
-                shares.append(share_attr)
-            return shares
-        raise HTTPResponseError(res)
+        shares = []
+        for element in ocs.data.iter('element'):
+            share_attr = {}
+            for child in element:
+                key = child.tag
+                value = child.text
+                share_attr[key] = value
+            shares.append(share_attr)
+        return shares
 
     def accept_remote_share(self, share_id):
         """Accepts a remote share
@@ -783,17 +2950,10 @@ class Client(object):
         :returns: True if the operation succeeded, False otherwise
         :raises: HTTPResponseError in case an HTTP error status was returned
         """
-        if not isinstance(share_id, int):
+        request = self._get_delete_share_request(share_id)
+        if request is None:
             return False
-
-        res = self._make_ocs_request(
-            'DELETE',
-            self.OCS_SERVICE_SHARE,
-            'shares/' + str(share_id)
-        )
-        if res.status_code == 200:
-            return res
-        raise HTTPResponseError(res)
+        return self._run_ocs_request(request)
 
     def update_share(self, share_id, **kwargs):
         """Updates a given share
@@ -805,34 +2965,10 @@ class Client(object):
         :returns: True if the operation succeeded, False otherwise
         :raises: HTTPResponseError in case an HTTP error status was returned
         """
-
-        perms = kwargs.get('perms', None)
-        password = kwargs.get('password', None)
-        public_upload = kwargs.get('public_upload', None)
-        if (isinstance(perms, int)) and (perms > self.OCS_PERMISSION_ALL):
-            perms = None
-        if not (perms or password or (public_upload is not None)):
-            return False
-        if not isinstance(share_id, int):
+        request = self._get_update_share_request(share_id, **kwargs)
+        if request is None:
             return False
-
-        data = {}
-        if perms:
-            data['permissions'] = perms
-        if isinstance(password, six.string_types):
-            data['password'] = password
-        if (public_upload is not None) and (isinstance(public_upload, bool)):
-            data['publicUpload'] = str(public_upload).lower()
-
-        res = self._make_ocs_request(
-            'PUT',
-            self.OCS_SERVICE_SHARE,
-            'shares/' + str(share_id),
-            data=data
-        )
-        if res.status_code == 200:
-            return True
-        raise HTTPResponseError(res)
+        return self._run_ocs_request(request)
 
     def move(self, remote_path_source, remote_path_target):
         """Moves a remote file or directory
@@ -860,59 +2996,23 @@ class Client(object):
         return self._webdav_move_copy(remote_path_source, remote_path_target,
                                        "COPY")
 
-    def share_file_with_link(self, path, **kwargs):
-        """Shares a remote file with link
-
-        :param path: path to the remote file to share
-        :param perms (optional): permission of the shared object
-        defaults to read only (1)
-        :param public_upload (optional): allows users to upload files or folders
-        :param password (optional): sets a password
-        https://doc.owncloud.com/server/next/admin_manual/configuration/files/file_sharing_configuration.html
-        :param name (optional): display name for the link
-        :returns: instance of :class:`ShareInfo` with the share info
-            or False if the operation failed
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
-        perms = kwargs.get('perms', None)
-        public_upload = kwargs.get('public_upload', 'false')
-        password = kwargs.get('password', None)
-        name = kwargs.get('name', None)
-
-        path = self._normalize_path(path)
-        post_data = {
-            'shareType': self.OCS_SHARE_TYPE_LINK,
-            'path': self._encode_string(path),
-        }
-        if (public_upload is not None) and (isinstance(public_upload, bool)):
-            post_data['publicUpload'] = str(public_upload).lower()
-        if isinstance(password, six.string_types):
-            post_data['password'] = password
-        if name is not None:
-            post_data['name'] = self._encode_string(name)
-        if perms:
-            post_data['permissions'] = perms
+    def share_file_with_link(self, path, **kwargs):
+        """Shares a remote file with link
 
-        res = self._make_ocs_request(
-            'POST',
-            self.OCS_SERVICE_SHARE,
-            'shares',
-            data=post_data
+        :param path: path to the remote file to share
+        :param perms (optional): permission of the shared object
+        defaults to read only (1)
+        :param public_upload (optional): allows users to upload files or folders
+        :param password (optional): sets a password
+        https://doc.owncloud.com/server/next/admin_manual/configuration/files/file_sharing_configuration.html
+        :param name (optional): display name for the link
+        :returns: instance of :class:`ShareInfo` with the share info
+            or False if the operation failed
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        return self._run_ocs_request(
+            self._get_share_file_with_link_request(path, **kwargs)
         )
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
-            data_el = tree.find('data')
-            return ShareInfo(
-                                {
-                                    'id': data_el.find('id').text,
-                                    'path': path,
-                                    'url': data_el.find('url').text,
-                                    'token': data_el.find('token').text,
-                                    'name': data_el.find('name').text
-                                }
-            )
-        raise HTTPResponseError(res)
 
     def is_shared(self, path):
         """Checks whether a path is already shared
@@ -927,7 +3027,8 @@ class Client(object):
             result = self.get_shares(path)
             if result:
                 return len(result) > 0
-        except OCSResponseError as e:
+        except ResponseError as e:
+            # OCS v2 reports a missing share with an HTTP error status
             if e.status_code != 404:
                 raise e
             return False
@@ -940,19 +3041,10 @@ class Client(object):
         :returns: instance of ShareInfo class
         :raises: ResponseError in case an HTTP error status was returned
         """
-        if (share_id is None) or not (isinstance(share_id, int)):
+        request = self._get_share_request(share_id)
+        if request is None:
             return None
-
-        res = self._make_ocs_request(
-                'GET',
-                self.OCS_SERVICE_SHARE,
-                'shares/' + str(share_id)
-                )
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
-            return self._get_shareinfo(tree.find('data').find('element'))
-        raise HTTPResponseError(res)
+        return self._run_ocs_request(request)
 
     def get_shares(self, path='', **kwargs):
         """Returns array of shares
@@ -967,48 +3059,10 @@ class Client(object):
         :returns: array of shares ShareInfo instances or empty array if the operation failed
         :raises: HTTPResponseError in case an HTTP error status was returned
         """
-        if not (isinstance(path, six.string_types)):
+        request = self._get_shares_request(path, **kwargs)
+        if request is None:
             return None
-
-        data = 'shares'
-        if path != '':
-            data += '?'
-            path = self._encode_string(self._normalize_path(path))
-            args = {'path': path}
-            reshares = kwargs.get('reshares', False)
-            if isinstance(reshares, bool) and reshares:
-                args['reshares'] = reshares
-            subfiles = kwargs.get('subfiles', False)
-            if isinstance(subfiles, bool) and subfiles:
-                args['subfiles'] = str(subfiles).lower()
-
-            shared_with_me = kwargs.get('shared_with_me', False)
-            if isinstance(shared_with_me, bool) and shared_with_me:
-                args['shared_with_me'] = "true"
-                del args['path']
-
-            data += parse.urlencode(args)
-
-        res = self._make_ocs_request(
-            'GET',
-            self.OCS_SERVICE_SHARE,
-            data
-        )
-
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
-            shares = []
-            for element in tree.find('data').iter('element'):
-                '''share_attr = {}
-                for child in element:
-                    key = child.tag
-                    value = child.text
-                    share_attr[key] = value
-                shares.append(share_attr)'''
-                shares.append(self._get_shareinfo(element))
-            return shares
-        raise HTTPResponseError(res)
+        return self._run_ocs_request(request)
 
     def create_user(self, user_name, initial_password):
         """Create a new user with an initial password via provisioning API.
@@ -1021,20 +3075,10 @@ class Client(object):
         :raises: HTTPResponseError in case an HTTP error status was returned
 
         """
-        res = self._make_ocs_request(
-            'POST',
-            self.OCS_SERVICE_CLOUD,
-            'users',
-            data={'password': initial_password, 'userid': user_name}
-        )
-
         # We get 200 when the user was just created.
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree, [100])
-            return True
-
-        raise HTTPResponseError(res)
+        return self._run_ocs_request(
+            self._get_create_user_request(user_name, initial_password)
+        )
 
     def delete_user(self, user_name):
         """Deletes a user via provisioning API.
@@ -1045,274 +3089,589 @@ class Client(object):
         :raises: HTTPResponseError in case an HTTP error status was returned
 
         """
-        res = self._make_ocs_request(
-            'DELETE',
+        # We get 200 when the user was deleted.
+        return self._run_ocs_request(self._get_delete_user_request(user_name))
+
+    def user_exists(self, user_name):
+        """Checks a user via provisioning API.
+        If you get back an error 999, then the provisioning API is not enabled.
+
+        :param user_name:  name of user to be checked
+        :returns: True if user found
+
+        """
+        users = self.search_users(user_name)
+
+        return user_name in users
+
+    def search_users(self, user_name):
+        """Searches for users via provisioning API.
+        If you get back an error 999, then the provisioning API is not enabled.
+
+        :param user_name:  name of user to be searched for
+        :returns: list of usernames that contain user_name as substring
+        :raises: HTTPResponseError in case an HTTP error status was returned
+
+        """
+        return self._run_ocs_request(
+            self._get_search_users_request(user_name)
+        )
+
+    def get_users(self):
+        """Get users via provisioning API.
+        If you get back an error 999, then the provisioning API is not enabled.
+
+        :returns: list of usernames
+        :raises: HTTPResponseError in case an HTTP error status was returned
+
+        """
+        return self.search_users('')
+
+    def set_user_attribute(self, user_name, key, value):
+        """Sets a user attribute
+
+        :param user_name: name of user to modify
+        :param key: key of the attribute to set
+        :param value: value to set
+        :returns: True if the operation succeeded, False otherwise
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        return self._run_ocs_request(
+            self._get_set_user_attribute_request(user_name, key, value)
+        )
+
+    def add_user_to_group(self, user_name, group_name):
+        """Adds a user to a group.
+
+        :param user_name:  name of user to be added
+        :param group_name:  name of group user is to be added to
+        :returns: True if user added
+        :raises: HTTPResponseError in case an HTTP error status was returned
+
+        """
+        return self._run_ocs_request(
+            self._get_add_user_to_group_request(user_name, group_name)
+        )
+
+    def get_user_groups(self, user_name):
+        """Get a list of groups associated to a user.
+
+        :param user_name:  name of user to list groups
+        :returns: list of groups
+        :raises: HTTPResponseError in case an HTTP error status was returned
+
+        """
+        return self._run_ocs_request(
+            self._get_user_groups_request(user_name)
+        )
+
+    def user_is_in_group(self, user_name, group_name):
+        """Checks if a user is in a group
+
+        :param user_name:  name of user
+        :param group_name:  name of group
+        :returns: True if user is in group
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        return group_name in self.get_user_groups(user_name)
+
+    def get_user(self, user_name):
+        """Retrieves information about a user
+
+        :param user_name:  name of user to query
+
+        :returns: Dictionary of information about user
+        :raises: ResponseError in case an HTTP error status was returned
+        """
+        return self._run_ocs_request(self._get_user_request(user_name))
+
+    def remove_user_from_group(self, user_name, group_name):
+        """Removes a user from a group.
+
+        :param user_name:  name of user to be removed
+        :param group_name:  name of group user is to be removed from
+        :returns: True if user removed
+        :raises: HTTPResponseError in case an HTTP error status was returned
+
+        """
+        return self._run_ocs_request(
+            self._get_remove_user_from_group_request(user_name, group_name)
+        )
+
+    def add_user_to_subadmin_group(self, user_name, group_name):
+        """Adds a user to a subadmin group.
+
+        :param user_name:  name of user to be added to subadmin group
+        :param group_name:  name of subadmin group
+        :returns: True if user added
+        :raises: HTTPResponseError in case an HTTP error status was returned
+
+        """
+
+        self._ocs_request(
+            'POST',
             self.OCS_SERVICE_CLOUD,
-            'users/' + user_name
+            'users/' + user_name + '/subadmins',
+            data={'groupid': group_name},
+            accepted_codes=[100, 103]
         )
+        return True
 
-        # We get 200 when the user was deleted.
-        if res.status_code == 200:
-            return True
+    def get_user_subadmin_groups(self, user_name):
+        """Get a list of subadmin groups associated to a user.
 
-        raise HTTPResponseError(res)
+        :param user_name:  name of user
+        :returns: list of subadmin groups
+        :raises: HTTPResponseError in case an HTTP error status was returned
 
-    def user_exists(self, user_name):
-        """Checks a user via provisioning API.
+        """
+
+        ocs = self._ocs_request(
+            'GET',
+            self.OCS_SERVICE_CLOUD,
+            'users/' + user_name + '/subadmins'
+        )
+
+        groups = ocs.data
+
+        return groups
+
+    def user_is_in_subadmin_group(self, user_name, group_name):
+        """Checks if a user is in a subadmin group
+
+        :param user_name:  name of user
+        :param group_name:  name of subadmin group
+        :returns: True if user is in subadmin group
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        return group_name in self.get_user_subadmin_groups(user_name)
+
+    def share_file_with_user(self, path, user, **kwargs):
+        """Shares a remote file with specified user
+
+        :param path: path to the remote file to share
+        :param user: name of the user whom we want to share a file/folder
+        :param perms (optional): permissions of the shared object
+            defaults to read only (1)
+            https://doc.owncloud.com/server/next/admin_manual/configuration/files/file_sharing_configuration.html
+        :param remote_user (optional): True if it is a federated users
+            defaults to False if it is a local user
+        :returns: instance of :class:`ShareInfo` with the share info
+            or False if the operation failed
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        request = self._get_share_file_with_user_request(path, user, **kwargs)
+        if request is None:
+            return False
+        return self._run_ocs_request(request)
+
+    def create_group(self, group_name):
+        """Create a new group via provisioning API.
+        If you get back an error 999, then the provisioning API is not enabled.
+
+        :param group_name:  name of group to be created
+        :returns: True if group created
+        :raises: HTTPResponseError in case an HTTP error status was returned
+
+        """
+        # We get 200 when the group was just created.
+        return self._run_ocs_request(
+            self._get_create_group_request(group_name)
+        )
+
+    def delete_group(self, group_name):
+        """Delete a group via provisioning API.
+        If you get back an error 999, then the provisioning API is not enabled.
+
+        :param group_name:  name of group to be deleted
+        :returns: True if group deleted
+        :raises: HTTPResponseError in case an HTTP error status was returned
+
+        """
+        # We get 200 when the group was just deleted.
+        return self._run_ocs_request(
+            self._get_delete_group_request(group_name)
+        )
+
+    def get_groups(self):
+        """Get groups via provisioning API.
+        If you get back an error 999, then the provisioning API is not enabled.
+
+        :returns: list of groups
+        :raises: HTTPResponseError in case an HTTP error status was returned
+
+        """
+        return self._run_ocs_request(self._get_groups_request())
+
+    def get_group_members(self, group_name):
+        """Get group members via provisioning API.
         If you get back an error 999, then the provisioning API is not enabled.
 
-        :param user_name:  name of user to be checked
-        :returns: True if user found
+        :param group_name:  name of group to list members
+        :returns: list of group members
+        :raises: HTTPResponseError in case an HTTP error status was returned
 
         """
-        users = self.search_users(user_name)
-
-        return user_name in users
+        return self._run_ocs_request(
+            self._get_group_members_request(group_name)
+        )
 
-    def search_users(self, user_name):
-        """Searches for users via provisioning API.
+    def group_exists(self, group_name):
+        """Checks a group via provisioning API.
         If you get back an error 999, then the provisioning API is not enabled.
 
-        :param user_name:  name of user to be searched for
-        :returns: list of usernames that contain user_name as substring
+        :param group_name:  name of group to be checked
+        :returns: True if group exists
         :raises: HTTPResponseError in case an HTTP error status was returned
 
         """
-        action_path = 'users'
-        if user_name:
-            action_path += '?search={}'.format(user_name)
-
-        res = self._make_ocs_request(
-            'GET',
-            self.OCS_SERVICE_CLOUD,
-            action_path
+        return self._run_ocs_request(
+            self._get_group_exists_request(group_name)
         )
 
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            users = [x.text for x in tree.findall('data/users/element')]
+    def share_file_with_group(self, path, group, **kwargs):
+        """Shares a remote file with specified group
 
-            return users
+        :param path: path to the remote file to share
+        :param group: name of the group with which we want to share a file/folder
+        :param perms (optional): permissions of the shared object
+            defaults to read only (1)
+            https://doc.owncloud.com/server/next/admin_manual/configuration/files/file_sharing_configuration.html
+        :returns: instance of :class:`ShareInfo` with the share info
+            or False if the operation failed
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        request = self._get_share_file_with_group_request(path, group,
+                                                          **kwargs)
+        if request is None:
+            return False
+        return self._run_ocs_request(request)
 
-        raise HTTPResponseError(res)
+    def get_config(self):
+        """Returns ownCloud config information
+        :returns: array of tuples (key, value) for each information
+            e.g. [('version', '1.7'), ('website', 'ownCloud'), ('host', 'cloud.example.com'),
+            ('contact', ''), ('ssl', 'false')]
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        path = 'config'
+        ocs = self._ocs_request(
+            'GET',
+            '',
+            path
+        )
+        values = []
+
+        element = ocs.data
+        if element is not None:
+            keys = ['version', 'website', 'host', 'contact', 'ssl']
+            for key in keys:
+                text = element.find(key).text or ''
+                values.append(text)
+            return zip(keys, values)
+        else:
+            return None
 
-    def get_users(self):
-        """Get users via provisioning API.
-        If you get back an error 999, then the provisioning API is not enabled.
+    def get_attribute(self, app=None, key=None):
+        """Returns an application attribute
 
-        :returns: list of usernames
+        :param app: application id
+        :param key: attribute key or None to retrieve all values for the
+            given application
+        :returns: attribute value if key was specified, or an array of tuples
+            (key, value) for each attribute
         :raises: HTTPResponseError in case an HTTP error status was returned
-
         """
-        return self.search_users('')
+        return self._run_ocs_request(self._get_attribute_request(app, key))
 
-    def set_user_attribute(self, user_name, key, value):
-        """Sets a user attribute
+    def set_attribute(self, app, key, value):
+        """Sets an application attribute
 
-        :param user_name: name of user to modify
+        :param app: application id
         :param key: key of the attribute to set
         :param value: value to set
         :returns: True if the operation succeeded, False otherwise
         :raises: HTTPResponseError in case an HTTP error status was returned
         """
-
-        res = self._make_ocs_request(
-            'PUT',
-            self.OCS_SERVICE_CLOUD,
-            'users/' + parse.quote(user_name),
-            data={'key': self._encode_string(key),
-                  'value': self._encode_string(value)}
+        return self._run_ocs_request(
+            self._get_set_attribute_request(app, key, value)
         )
 
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree, [100])
-            return True
-        raise HTTPResponseError(res)
-
-    def add_user_to_group(self, user_name, group_name):
-        """Adds a user to a group.
+    def delete_attribute(self, app, key):
+        """Deletes an application attribute
 
-        :param user_name:  name of user to be added
-        :param group_name:  name of group user is to be added to
-        :returns: True if user added
+        :param app: application id
+        :param key: key of the attribute to delete
+        :returns: True if the operation succeeded, False otherwise
         :raises: HTTPResponseError in case an HTTP error status was returned
-
         """
-
-        res = self._make_ocs_request(
-            'POST',
-            self.OCS_SERVICE_CLOUD,
-            'users/' + user_name + '/groups',
-            data={'groupid': group_name}
+        return self._run_ocs_request(
+            self._get_delete_attribute_request(app, key)
         )
 
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree, [100])
-            return True
-
-        raise HTTPResponseError(res)
-
-    def get_user_groups(self, user_name):
-        """Get a list of groups associated to a user.
+    def get_apps(self):
+        """ List all enabled apps through the provisioning api.
 
-        :param user_name:  name of user to list groups
-        :returns: list of groups
+        :returns: a dict of apps, with values True/False, representing the enabled state.
         :raises: HTTPResponseError in case an HTTP error status was returned
-
         """
-
-        res = self._make_ocs_request(
-            'GET',
-            self.OCS_SERVICE_CLOUD,
-            'users/' + user_name + '/groups',
+        # <data><apps><element>files</element><element>activity</element> ...
+        ena_apps = dict.fromkeys(
+            self._run_ocs_request(self._get_apps_request()), False
         )
+        ena_apps.update(dict.fromkeys(
+            self._run_ocs_request(self._get_apps_request(enabled=True)), True
+        ))
+        return ena_apps
 
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree, [100])
-            return [group.text for group in tree.find('data/groups')]
+    def get_version(self):
+        """Gets the ownCloud version of the connected server
 
-        raise HTTPResponseError(res)
+        :returns: ownCloud version as string
+        """
+        if self._version is None:
+            with self._lock:
+                if self._version is None:
+                    self._update_capabilities()
+        return self._version
 
-    def user_is_in_group(self, user_name, group_name):
-        """Checks if a user is in a group
+    def get_capabilities(self):
+        """Gets the ownCloud app capabilities
 
-        :param user_name:  name of user
-        :param group_name:  name of group
-        :returns: True if user is in group
-        :raises: HTTPResponseError in case an HTTP error status was returned
+        :returns: capabilities dictionary that maps from
+        app name to another dictionary containing the capabilities
         """
-        return group_name in self.get_user_groups(user_name)
+        if self._capabilities is None:
+            with self._lock:
+                if self._capabilities is None:
+                    self._update_capabilities()
+        return self._capabilities
 
-    def get_user(self, user_name):
-        """Retrieves information about a user
+    def enable_app(self, appname):
+        """Enable an app through provisioning_api
 
-        :param user_name:  name of user to query
+        :param appname:  Name of app to be enabled
+        :returns: True if the operation succeeded, False otherwise
+        :raises: HTTPResponseError in case an HTTP error status was returned
 
-        :returns: Dictionary of information about user
-        :raises: ResponseError in case an HTTP error status was returned
         """
-        res = self._make_ocs_request(
-            'GET',
-            self.OCS_SERVICE_CLOUD,
-            'users/' + parse.quote(user_name),
-            data={}
-        )
-
-        tree = ET.fromstring(res.content)
-        self._check_ocs_status(tree)
-        # <ocs><meta><statuscode>100</statuscode><status>ok</status></meta>
-        # <data>
-        # <email>frank@example.org</email><quota>0</quota><enabled>true</enabled>
-        # </data>
-        # </ocs>
-
-        data_element = tree.find('data')
-        return self._xml_to_dict(data_element)
+        return self._run_ocs_request(self._get_enable_app_request(appname))
 
-    def remove_user_from_group(self, user_name, group_name):
-        """Removes a user from a group.
+    def disable_app(self, appname):
+        """Disable an app through provisioning_api
 
-        :param user_name:  name of user to be removed
-        :param group_name:  name of group user is to be removed from
-        :returns: True if user removed
+        :param appname:  Name of app to be disabled
+        :returns: True if the operation succeeded, False otherwise
         :raises: HTTPResponseError in case an HTTP error status was returned
 
         """
-        res = self._make_ocs_request(
-            'DELETE',
-            self.OCS_SERVICE_CLOUD,
-            'users/' + user_name + '/groups',
-            data={'groupid': group_name}
-        )
+        return self._run_ocs_request(self._get_disable_app_request(appname))
 
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree, [100])
-            return True
+    def _get_propfind_body(self, properties):
+        """Returns the PROPFIND request body for the given properties
 
-        raise HTTPResponseError(res)
+        :param properties: list of properties, name of a property profile
+            or None
+        :returns: request body or None if all default properties
+            should be returned
+        :raises: ValueError if the profile name is unknown
+        """
+        if isinstance(properties, six.string_types):
+            if properties not in self.PROPFIND_PROFILES:
+                raise ValueError('Unknown property profile: %s' % properties)
+            properties = self.PROPFIND_PROFILES[properties]
+        if not properties:
+            return None
+        return b'<d:propfind' + _DAV_NAMESPACES + b'>' + \
+            self._get_dav_prop(properties) + b'</d:propfind>'
 
-    def add_user_to_subadmin_group(self, user_name, group_name):
-        """Adds a user to a subadmin group.
+    @staticmethod
+    def _get_dav_prop(properties):
+        """Returns the serialized "d:prop" element of a PROPFIND or REPORT
+        request body. It is only built once for every list of properties.
 
-        :param user_name:  name of user to be added to subadmin group
-        :param group_name:  name of subadmin group
-        :returns: True if user added
-        :raises: HTTPResponseError in case an HTTP error status was returned
+        :param properties: list of properties
+        :returns: serialized element
+        """
+        key = tuple(properties)
+        data = _DAV_PROPS.get(key)
+        if data is None:
+            prop = ET.Element('d:prop')
+            for p in properties:
+                ET.SubElement(prop, p)
+            data = ET.tostring(prop)
+            if len(_DAV_PROPS) >= _MAX_DAV_PROPS:
+                _DAV_PROPS.clear()
+            _DAV_PROPS[key] = data
+        return data
+
+    def _get_filter_files_body(self, favorite, systemtag, properties):
+        """Returns the body of a filter-files REPORT request, see
+        :meth:`filter_files`
+
+        :raises: ValueError if there is no filter rule, which the server
+            rejects
+        """
+        if favorite not in (None, True):
+            raise ValueError('favorite only accepts True or None')
+        if systemtag is not None and not isinstance(systemtag, (list, tuple)):
+            systemtag = [systemtag]
+        if not favorite and not systemtag:
+            raise ValueError('filter_files() needs favorite or systemtag')
+        rules = ET.Element('oc:filter-rules')
+        if favorite:
+            ET.SubElement(rules, 'oc:favorite').text = '1'
+        for tag_id in systemtag or ():
+            ET.SubElement(rules, 'oc:systemtag').text = str(tag_id)
+        return b'<oc:filter-files' + _DAV_NAMESPACES + b'>' + \
+            self._get_dav_prop(properties or self.REPORT_DEFAULT_PROPERTIES) + \
+            ET.tostring(rules) + b'</oc:filter-files>'
+
+    def _get_search_files_body(self, pattern, limit, properties):
+        """Returns the body of a search-files REPORT request, see
+        :meth:`search_files`
+        """
+        search = ET.Element('oc:search')
+        ET.SubElement(search, 'oc:pattern').text = pattern
+        if limit is not None:
+            ET.SubElement(search, 'oc:limit').text = str(int(limit))
+        return b'<oc:search-files' + _DAV_NAMESPACES + b'>' + \
+            self._get_dav_prop(properties or self.REPORT_DEFAULT_PROPERTIES) + \
+            ET.tostring(search) + b'</oc:search-files>'
 
+    @staticmethod
+    def _get_upload_headers(stat_result, **kwargs):
+        """Returns the headers of the requests uploading a file
+
+        :param stat_result: result of ``os.stat()`` on the local file
+        :param \*\*kwargs: optional arguments that ``put_file`` accepts
+        :returns: headers
         """
+        headers = {}
+        if kwargs.get('keep_mtime', True):
+            headers['X-OC-MTIME'] = str(int(stat_result.st_mtime))
+        return headers
 
-        res = self._make_ocs_request(
-            'POST',
-            self.OCS_SERVICE_CLOUD,
-            'users/' + user_name + '/subadmins',
-            data={'groupid': group_name}
+    def _get_upload_request(self, remote_path, local_source_file, **kwargs):
+        """Builds the request of a :meth:`put_file` call without chunking
+
+        :returns: tuple of the remote path of the file and the headers
+        """
+        if remote_path[-1] == '/':
+            remote_path += os.path.basename(local_source_file)
+        return remote_path, self._get_upload_headers(
+            os.stat(local_source_file), **kwargs
         )
 
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree, [100, 103])
-            return True
+    def _get_chunked_upload_request(self, remote_path, local_source_file,
+                                    **kwargs):
+        """Builds the requests of a chunked :meth:`put_file` call
 
-        raise HTTPResponseError(res)
+        :returns: tuple of the remote path of the file, the headers, the
+            chunk size and the remote paths to upload the chunks to in
+            order, a file fitting in one chunk is uploaded to its remote
+            path directly
+        """
+        chunk_size = kwargs.get('chunk_size', 10 * 1024 * 1024)
+        transfer_id = int(time.time())
 
-    def get_user_subadmin_groups(self, user_name):
-        """Get a list of subadmin groups associated to a user.
+        remote_path = self._normalize_path(remote_path)
+        if remote_path.endswith('/'):
+            remote_path += os.path.basename(local_source_file)
 
-        :param user_name:  name of user
-        :returns: list of subadmin groups
-        :raises: HTTPResponseError in case an HTTP error status was returned
+        stat_result = os.stat(local_source_file)
+        headers = self._get_upload_headers(stat_result, **kwargs)
+
+        chunk_count = int(math.ceil(float(stat_result.st_size) /
+                                    float(chunk_size)))
+        if chunk_count <= 1:
+            return remote_path, headers, chunk_size, [remote_path]
+
+        headers['OC-CHUNKED'] = '1'
+        chunk_paths = [
+            '%s-chunking-%s-%i-%i' % (remote_path, transfer_id, chunk_count,
+                                      chunk_index)
+            for chunk_index in range(chunk_count)
+        ]
+        return remote_path, headers, chunk_size, chunk_paths
 
+    def _get_move_copy_headers(self, remote_path_source, remote_path_target):
+        """Returns the headers of a MOVE or COPY request
+
+        :param remote_path_source: source file or folder to copy / move
+        :param remote_path_target: target file to which to copy / move
+        :returns: headers
         """
+        if remote_path_target[-1] == '/':
+            remote_path_target += os.path.basename(remote_path_source)
 
-        res = self._make_ocs_request(
-            'GET',
-            self.OCS_SERVICE_CLOUD,
-            'users/' + user_name + '/subadmins',
-        )
+        if not (remote_path_target[0] == '/'):
+            remote_path_target = '/' + remote_path_target
 
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree, [100])
+        return {
+            'Destination': self._get_webdav_url() + parse.quote(
+                self._encode_string(remote_path_target))
+        }
 
-            groups = tree.find('data')
+    def _run_ocs_request(self, request):
+        """Sends an OCS API request built by one of the ``_get_*_request``
+        methods
 
-            return groups
+        :param request: :class:`_OCSRequest` instance
+        :returns: result of the request
+        :raises: HTTPResponseError in case an HTTP error status was returned,
+            OCSResponseError if the OCS status is not accepted
+        """
+        if request.raw:
+            res = self._make_ocs_request(request.method, request.service,
+                                         request.action, **request.kwargs)
+        else:
+            res = self._ocs_request(request.method, request.service,
+                                    request.action, **request.kwargs)
+        return request.parse(res)
 
-        raise HTTPResponseError(res)
+    def _get_share_file_with_link_request(self, path, **kwargs):
+        """Builds the request of :meth:`share_file_with_link`"""
+        perms = kwargs.get('perms', None)
+        public_upload = kwargs.get('public_upload', 'false')
+        password = kwargs.get('password', None)
+        name = kwargs.get('name', None)
 
-    def user_is_in_subadmin_group(self, user_name, group_name):
-        """Checks if a user is in a subadmin group
+        path = self._normalize_path(path)
+        post_data = {
+            'shareType': self.OCS_SHARE_TYPE_LINK,
+            'path': self._encode_string(path),
+        }
+        if (public_upload is not None) and (isinstance(public_upload, bool)):
+            post_data['publicUpload'] = str(public_upload).lower()
+        if isinstance(password, six.string_types):
+            post_data['password'] = password
+        if name is not None:
+            post_data['name'] = self._encode_string(name)
+        if perms:
+            post_data['permissions'] = perms
 
-        :param user_name:  name of user
-        :param group_name:  name of subadmin group
-        :returns: True if user is in subadmin group
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
-        return group_name in self.get_user_subadmin_groups(user_name)
+        return _OCSRequest(
+            'POST',
+            self.OCS_SERVICE_SHARE,
+            'shares',
+            data=post_data,
+            parse=lambda ocs: self._parse_new_share(
+                ocs, {'path': path}, ['url', 'token', 'name']
+            )
+        )
 
-    def share_file_with_user(self, path, user, **kwargs):
-        """Shares a remote file with specified user
+    def _get_share_file_with_user_request(self, path, user, **kwargs):
+        """Builds the request of :meth:`share_file_with_user`
 
-        :param path: path to the remote file to share
-        :param user: name of the user whom we want to share a file/folder
-        :param perms (optional): permissions of the shared object
-            defaults to read only (1)
-            https://doc.owncloud.com/server/next/admin_manual/configuration/files/file_sharing_configuration.html
-        :param remote_user (optional): True if it is a federated users
-            defaults to False if it is a local user
-        :returns: instance of :class:`ShareInfo` with the share info
-            or False if the operation failed
-        :raises: HTTPResponseError in case an HTTP error status was returned
+        :returns: :class:`_OCSRequest` instance, or None if the arguments
+            are invalid
         """
         remote_user = kwargs.get('remote_user', False)
         perms = kwargs.get('perms', self.OCS_PERMISSION_READ)
         if (((not isinstance(perms, int)) or (perms > self.OCS_PERMISSION_ALL))
                 or ((not isinstance(user, six.string_types)) or (user == ''))):
-            return False
+            return None
 
         if remote_user and (not user.endswith('/')):
             user = user + '/'
@@ -1325,240 +3684,311 @@ class Client(object):
             'permissions': perms
         }
 
-        res = self._make_ocs_request(
+        def parse_new_share(ocs):
+            _ocs_log.debug(
+                'share_file request for file %s with permissions %i '
+                'returned: %i', path, perms, ocs.response.status_code
+            )
+            return self._parse_new_share(
+                ocs, {'path': path, 'permissions': perms}
+            )
+
+        return _OCSRequest(
             'POST',
             self.OCS_SERVICE_SHARE,
             'shares',
-            data=post_data
+            data=post_data,
+            parse=parse_new_share
         )
 
-        if self._debug:
-            print('OCS share_file request for file %s with permissions %i '
-                  'returned: %i' % (path, perms, res.status_code))
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
-            data_el = tree.find('data')
-            return ShareInfo(
-                                {
-                                    'id': data_el.find('id').text,
-                                    'path': path,
-                                    'permissions': perms
-                                }
-            )
-        raise HTTPResponseError(res)
+    def _get_share_file_with_group_request(self, path, group, **kwargs):
+        """Builds the request of :meth:`share_file_with_group`
 
-    def create_group(self, group_name):
-        """Create a new group via provisioning API.
-        If you get back an error 999, then the provisioning API is not enabled.
+        :returns: :class:`_OCSRequest` instance, or None if the arguments
+            are invalid
+        """
+        perms = kwargs.get('perms', self.OCS_PERMISSION_READ)
+        if (((not isinstance(perms, int)) or (perms > self.OCS_PERMISSION_ALL))
+                or ((not isinstance(group, six.string_types)) or (group == ''))):
+            return None
 
-        :param group_name:  name of group to be created
-        :returns: True if group created
-        :raises: HTTPResponseError in case an HTTP error status was returned
+        path = self._normalize_path(path)
+        post_data = {'shareType': self.OCS_SHARE_TYPE_GROUP,
+                     'shareWith': group,
+                     'path': path,
+                     'permissions': perms}
 
-        """
-        res = self._make_ocs_request(
+        return _OCSRequest(
             'POST',
-            self.OCS_SERVICE_CLOUD,
-            'groups',
-            data={'groupid': group_name}
+            self.OCS_SERVICE_SHARE,
+            'shares',
+            data=post_data,
+            parse=lambda ocs: self._parse_new_share(
+                ocs, {'path': path, 'permissions': perms}
+            )
         )
 
-        # We get 200 when the group was just created.
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree, [100])
-            return True
-
-        raise HTTPResponseError(res)
+    def _get_share_request(self, share_id):
+        """Builds the request of :meth:`get_share`
 
-    def delete_group(self, group_name):
-        """Delete a group via provisioning API.
-        If you get back an error 999, then the provisioning API is not enabled.
+        :returns: :class:`_OCSRequest` instance, or None if the arguments
+            are invalid
+        """
+        if (share_id is None) or not (isinstance(share_id, int)):
+            return None
 
-        :param group_name:  name of group to be deleted
-        :returns: True if group deleted
-        :raises: HTTPResponseError in case an HTTP error status was returned
+        def parse_share(ocs):
+            shares = self._parse_shares(ocs)
+            if shares:
+                return shares[0]
+            return None
 
-        """
-        res = self._make_ocs_request(
-            'DELETE',
-            self.OCS_SERVICE_CLOUD,
-            'groups/' + group_name
+        return _OCSRequest(
+            'GET',
+            self.OCS_SERVICE_SHARE,
+            'shares/' + str(share_id),
+            parse=parse_share
         )
 
-        # We get 200 when the group was just deleted.
-        if res.status_code == 200:
-            return True
+    def _get_shares_request(self, path='', **kwargs):
+        """Builds the request of :meth:`get_shares`
 
-        raise HTTPResponseError(res)
+        :returns: :class:`_OCSRequest` instance, or None if the arguments
+            are invalid
+        """
+        if not (isinstance(path, six.string_types)):
+            return None
 
-    def get_groups(self):
-        """Get groups via provisioning API.
-        If you get back an error 999, then the provisioning API is not enabled.
+        data = 'shares'
+        if path != '':
+            data += '?'
+            path = self._encode_string(self._normalize_path(path))
+            args = {'path': path}
+            reshares = kwargs.get('reshares', False)
+            if isinstance(reshares, bool) and reshares:
+                args['reshares'] = reshares
+            subfiles = kwargs.get('subfiles', False)
+            if isinstance(subfiles, bool) and subfiles:
+                args['subfiles'] = str(subfiles).lower()
 
-        :returns: list of groups
-        :raises: HTTPResponseError in case an HTTP error status was returned
+            shared_with_me = kwargs.get('shared_with_me', False)
+            if isinstance(shared_with_me, bool) and shared_with_me:
+                args['shared_with_me'] = "true"
+                del args['path']
 
-        """
-        res = self._make_ocs_request(
+            data += parse.urlencode(args)
+
+        return _OCSRequest(
             'GET',
-            self.OCS_SERVICE_CLOUD,
-            'groups'
+            self.OCS_SERVICE_SHARE,
+            data,
+            parse=self._parse_shares
         )
 
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            groups = [x.text for x in tree.findall('data/groups/element')]
+    def _get_update_share_request(self, share_id, **kwargs):
+        """Builds the request of :meth:`update_share`
 
-            return groups
+        :returns: :class:`_OCSRequest` instance, or None if the arguments
+            are invalid
+        """
+        perms = kwargs.get('perms', None)
+        password = kwargs.get('password', None)
+        public_upload = kwargs.get('public_upload', None)
+        if (isinstance(perms, int)) and (perms > self.OCS_PERMISSION_ALL):
+            perms = None
+        if not (perms or password or (public_upload is not None)):
+            return None
+        if not isinstance(share_id, int):
+            return None
 
-        raise HTTPResponseError(res)
+        data = {}
+        if perms:
+            data['permissions'] = perms
+        if isinstance(password, six.string_types):
+            data['password'] = password
+        if (public_upload is not None) and (isinstance(public_upload, bool)):
+            data['publicUpload'] = str(public_upload).lower()
 
-    def get_group_members(self, group_name):
-        """Get group members via provisioning API.
-        If you get back an error 999, then the provisioning API is not enabled.
+        return _OCSRequest(
+            'PUT',
+            self.OCS_SERVICE_SHARE,
+            'shares/' + str(share_id),
+            data=data,
+            parse=_check_status_ok,
+            raw=True
+        )
 
-        :param group_name:  name of group to list members
-        :returns: list of group members
-        :raises: HTTPResponseError in case an HTTP error status was returned
+    def _get_delete_share_request(self, share_id):
+        """Builds the request of :meth:`delete_share`
 
+        :returns: :class:`_OCSRequest` instance, or None if the arguments
+            are invalid
         """
-        res = self._make_ocs_request(
-            'GET',
-            self.OCS_SERVICE_CLOUD,
-            'groups/' + group_name
-        )
+        if not isinstance(share_id, int):
+            return None
 
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree, [100])
-            return [group.text for group in tree.find('data/users')]
+        return _OCSRequest(
+            'DELETE',
+            self.OCS_SERVICE_SHARE,
+            'shares/' + str(share_id),
+            parse=_get_ok_response,
+            raw=True
+        )
 
-        raise HTTPResponseError(res)
+    def _get_create_user_request(self, user_name, initial_password):
+        """Builds the request of :meth:`create_user`"""
+        return _OCSRequest(
+            'POST',
+            self.OCS_SERVICE_CLOUD,
+            'users',
+            data={'password': initial_password, 'userid': user_name}
+        )
 
-    def group_exists(self, group_name):
-        """Checks a group via provisioning API.
-        If you get back an error 999, then the provisioning API is not enabled.
+    def _get_delete_user_request(self, user_name):
+        """Builds the request of :meth:`delete_user`"""
+        return _OCSRequest(
+            'DELETE',
+            self.OCS_SERVICE_CLOUD,
+            'users/' + user_name,
+            parse=_check_status_ok,
+            raw=True
+        )
 
-        :param group_name:  name of group to be checked
-        :returns: True if group exists
-        :raises: HTTPResponseError in case an HTTP error status was returned
+    def _get_search_users_request(self, user_name):
+        """Builds the request of :meth:`search_users`"""
+        action_path = 'users'
+        if user_name:
+            action_path += '?search={}'.format(user_name)
 
-        """
-        res = self._make_ocs_request(
+        return _OCSRequest(
             'GET',
             self.OCS_SERVICE_CLOUD,
-            'groups?search=' + group_name
+            action_path,
+            accepted_codes=None,
+            parse=lambda ocs: [
+                x.text for x in ocs.data.findall('users/element')
+            ]
         )
 
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-
-            for code_el in tree.findall('data/groups/element'):
-                if code_el is not None and code_el.text == group_name:
-                    return True
-
-            return False
+    def _get_user_request(self, user_name):
+        """Builds the request of :meth:`get_user`"""
+        # <ocs><meta><statuscode>100</statuscode><status>ok</status></meta>
+        # <data>
+        # <email>frank@example.org</email><quota>0</quota><enabled>true</enabled>
+        # </data>
+        # </ocs>
+        return _OCSRequest(
+            'GET',
+            self.OCS_SERVICE_CLOUD,
+            'users/' + parse.quote(user_name),
+            data={},
+            parse=lambda ocs: self._xml_to_dict(ocs.data)
+        )
 
-        raise HTTPResponseError(res)
+    def _get_set_user_attribute_request(self, user_name, key, value):
+        """Builds the request of :meth:`set_user_attribute`"""
+        return _OCSRequest(
+            'PUT',
+            self.OCS_SERVICE_CLOUD,
+            'users/' + parse.quote(user_name),
+            data={'key': self._encode_string(key),
+                  'value': self._encode_string(value)}
+        )
 
-    def share_file_with_group(self, path, group, **kwargs):
-        """Shares a remote file with specified group
+    def _get_add_user_to_group_request(self, user_name, group_name):
+        """Builds the request of :meth:`add_user_to_group`"""
+        return _OCSRequest(
+            'POST',
+            self.OCS_SERVICE_CLOUD,
+            'users/' + user_name + '/groups',
+            data={'groupid': group_name}
+        )
 
-        :param path: path to the remote file to share
-        :param group: name of the group with which we want to share a file/folder
-        :param perms (optional): permissions of the shared object
-            defaults to read only (1)
-            https://doc.owncloud.com/server/next/admin_manual/configuration/files/file_sharing_configuration.html
-        :returns: instance of :class:`ShareInfo` with the share info
-            or False if the operation failed
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
-        perms = kwargs.get('perms', self.OCS_PERMISSION_READ)
-        if (((not isinstance(perms, int)) or (perms > self.OCS_PERMISSION_ALL))
-                or ((not isinstance(group, six.string_types)) or (group == ''))):
-            return False
+    def _get_remove_user_from_group_request(self, user_name, group_name):
+        """Builds the request of :meth:`remove_user_from_group`"""
+        return _OCSRequest(
+            'DELETE',
+            self.OCS_SERVICE_CLOUD,
+            'users/' + user_name + '/groups',
+            data={'groupid': group_name}
+        )
 
-        path = self._normalize_path(path)
-        post_data = {'shareType': self.OCS_SHARE_TYPE_GROUP,
-                     'shareWith': group,
-                     'path': path,
-                     'permissions': perms}
+    def _get_user_groups_request(self, user_name):
+        """Builds the request of :meth:`get_user_groups`"""
+        return _OCSRequest(
+            'GET',
+            self.OCS_SERVICE_CLOUD,
+            'users/' + user_name + '/groups',
+            parse=lambda ocs: [group.text for group in ocs.data.find('groups')]
+        )
 
-        res = self._make_ocs_request(
+    def _get_create_group_request(self, group_name):
+        """Builds the request of :meth:`create_group`"""
+        return _OCSRequest(
             'POST',
-            self.OCS_SERVICE_SHARE,
-            'shares',
-            data=post_data
+            self.OCS_SERVICE_CLOUD,
+            'groups',
+            data={'groupid': group_name}
         )
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
-            data_el = tree.find('data')
-            return ShareInfo(
-                                {
-                                    'id': data_el.find('id').text,
-                                    'path': path,
-                                    'permissions': perms
-                                }
-            )
-        raise HTTPResponseError(res)
 
-    def get_config(self):
-        """Returns ownCloud config information
-        :returns: array of tuples (key, value) for each information
-            e.g. [('version', '1.7'), ('website', 'ownCloud'), ('host', 'cloud.example.com'),
-            ('contact', ''), ('ssl', 'false')]
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
-        path = 'config'
-        res = self._make_ocs_request(
+    def _get_delete_group_request(self, group_name):
+        """Builds the request of :meth:`delete_group`"""
+        return _OCSRequest(
+            'DELETE',
+            self.OCS_SERVICE_CLOUD,
+            'groups/' + group_name,
+            parse=_check_status_ok,
+            raw=True
+        )
+
+    def _get_groups_request(self):
+        """Builds the request of :meth:`get_groups`"""
+        return _OCSRequest(
             'GET',
-            '',
-            path
+            self.OCS_SERVICE_CLOUD,
+            'groups',
+            accepted_codes=None,
+            parse=lambda ocs: [
+                x.text for x in ocs.data.findall('groups/element')
+            ]
         )
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
-            values = []
 
-            element = tree.find('data')
-            if element is not None:
-                keys = ['version', 'website', 'host', 'contact', 'ssl']
-                for key in keys:
-                    text = element.find(key).text or ''
-                    values.append(text)
-                return zip(keys, values)
-            else:
-                return None
-        raise HTTPResponseError(res)
+    def _get_group_members_request(self, group_name):
+        """Builds the request of :meth:`get_group_members`"""
+        return _OCSRequest(
+            'GET',
+            self.OCS_SERVICE_CLOUD,
+            'groups/' + group_name,
+            parse=lambda ocs: [group.text for group in ocs.data.find('users')]
+        )
 
-    def get_attribute(self, app=None, key=None):
-        """Returns an application attribute
+    def _get_group_exists_request(self, group_name):
+        """Builds the request of :meth:`group_exists`"""
+        def parse_exists(ocs):
+            for code_el in ocs.data.findall('groups/element'):
+                if code_el is not None and code_el.text == group_name:
+                    return True
+            return False
 
-        :param app: application id
-        :param key: attribute key or None to retrieve all values for the
-            given application
-        :returns: attribute value if key was specified, or an array of tuples
-            (key, value) for each attribute
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
+        return _OCSRequest(
+            'GET',
+            self.OCS_SERVICE_CLOUD,
+            'groups?search=' + group_name,
+            accepted_codes=None,
+            parse=parse_exists
+        )
+
+    def _get_attribute_request(self, app=None, key=None):
+        """Builds the request of :meth:`get_attribute`"""
         path = 'getattribute'
         if app is not None:
             path += '/' + parse.quote(app, '')
             if key is not None:
                 path += '/' + parse.quote(self._encode_string(key), '')
-        res = self._make_ocs_request(
-            'GET',
-            self.OCS_SERVICE_PRIVATEDATA,
-            path
-        )
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
+
+        def parse_values(ocs):
             values = []
-            for element in tree.find('data').iter('element'):
+            for element in ocs.data.iter('element'):
                 app_text = element.find('app').text
                 key_text = element.find('key').text
                 value_text = element.find('value').text or ''
@@ -1573,128 +4003,79 @@ class Client(object):
             if len(values) == 0 and key is not None:
                 return None
             return values
-        raise HTTPResponseError(res)
 
-    def set_attribute(self, app, key, value):
-        """Sets an application attribute
+        return _OCSRequest(
+            'GET',
+            self.OCS_SERVICE_PRIVATEDATA,
+            path,
+            parse=parse_values
+        )
 
-        :param app: application id
-        :param key: key of the attribute to set
-        :param value: value to set
-        :returns: True if the operation succeeded, False otherwise
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
+    def _get_set_attribute_request(self, app, key, value):
+        """Builds the request of :meth:`set_attribute`"""
         path = 'setattribute/' + parse.quote(app, '') + '/' + parse.quote(
             self._encode_string(key), '')
-        res = self._make_ocs_request(
+        return _OCSRequest(
             'POST',
             self.OCS_SERVICE_PRIVATEDATA,
             path,
             data={'value': self._encode_string(value)}
         )
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
-            return True
-        raise HTTPResponseError(res)
-
-    def delete_attribute(self, app, key):
-        """Deletes an application attribute
 
-        :param app: application id
-        :param key: key of the attribute to delete
-        :returns: True if the operation succeeded, False otherwise
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
+    def _get_delete_attribute_request(self, app, key):
+        """Builds the request of :meth:`delete_attribute`"""
         path = 'deleteattribute/' + parse.quote(app, '') + '/' + parse.quote(
             self._encode_string(key), '')
-        res = self._make_ocs_request(
+        return _OCSRequest(
             'POST',
             self.OCS_SERVICE_PRIVATEDATA,
             path
         )
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
-            return True
-        raise HTTPResponseError(res)
-
-    def get_apps(self):
-        """ List all enabled apps through the provisioning api.
-
-        :returns: a dict of apps, with values True/False, representing the enabled state.
-        :raises: HTTPResponseError in case an HTTP error status was returned
-        """
-        ena_apps = {}
-
-        res = self._make_ocs_request('GET', self.OCS_SERVICE_CLOUD, 'apps')
-        if res.status_code != 200:
-            raise HTTPResponseError(res)
-        tree = ET.fromstring(res.content)
-        self._check_ocs_status(tree)
-        # <data><apps><element>files</element><element>activity</element> ...
-        for el in tree.findall('data/apps/element'):
-            ena_apps[el.text] = False
-
-        res = self._make_ocs_request('GET', self.OCS_SERVICE_CLOUD,
-                                     'apps?filter=enabled')
-        if res.status_code != 200:
-            raise HTTPResponseError(res)
-        tree = ET.fromstring(res.content)
-        self._check_ocs_status(tree)
-        for el in tree.findall('data/apps/element'):
-            ena_apps[el.text] = True
-
-        return ena_apps
-
-    def get_version(self):
-        """Gets the ownCloud version of the connected server
-
-        :returns: ownCloud version as string
-        """
-        if self._version is None:
-            self._update_capabilities()
-        return self._version
-
-    def get_capabilities(self):
-        """Gets the ownCloud app capabilities
-
-        :returns: capabilities dictionary that maps from
-        app name to another dictionary containing the capabilities
-        """
-        if self._capabilities is None:
-            self._update_capabilities()
-        return self._capabilities
-
-    def enable_app(self, appname):
-        """Enable an app through provisioning_api
 
-        :param appname:  Name of app to be enabled
-        :returns: True if the operation succeeded, False otherwise
-        :raises: HTTPResponseError in case an HTTP error status was returned
+    def _get_apps_request(self, enabled=False):
+        """Builds a request listing the apps, used by :meth:`get_apps`
 
+        :param enabled: True to only list the enabled apps
+        :returns: :class:`_OCSRequest` instance whose result is the list of
+            app names
         """
-        res = self._make_ocs_request('POST', self.OCS_SERVICE_CLOUD,
-                                     'apps/' + appname)
-        if res.status_code == 200:
-            return True
-
-        raise HTTPResponseError(res)
-
-    def disable_app(self, appname):
-        """Disable an app through provisioning_api
+        return _OCSRequest(
+            'GET',
+            self.OCS_SERVICE_CLOUD,
+            'apps?filter=enabled' if enabled else 'apps',
+            parse=lambda ocs: [
+                el.text for el in ocs.data.findall('apps/element')
+            ]
+        )
 
-        :param appname:  Name of app to be disabled
-        :returns: True if the operation succeeded, False otherwise
-        :raises: HTTPResponseError in case an HTTP error status was returned
+    def _get_enable_app_request(self, appname):
+        """Builds the request of :meth:`enable_app`"""
+        return _OCSRequest(
+            'POST',
+            self.OCS_SERVICE_CLOUD,
+            'apps/' + appname,
+            parse=_check_status_ok,
+            raw=True
+        )
 
-        """
-        res = self._make_ocs_request('DELETE', self.OCS_SERVICE_CLOUD,
-                                     'apps/' + appname)
-        if res.status_code == 200:
-            return True
+    def _get_disable_app_request(self, appname):
+        """Builds the request of :meth:`disable_app`"""
+        return _OCSRequest(
+            'DELETE',
+            self.OCS_SERVICE_CLOUD,
+            'apps/' + appname,
+            parse=_check_status_ok,
+            raw=True
+        )
 
-        raise HTTPResponseError(res)
+    def _get_capabilities_request(self):
+        """Builds the request updating the capabilities"""
+        return _OCSRequest(
+            'GET',
+            self.OCS_SERVICE_CLOUD,
+            'capabilities',
+            parse=self._parse_capabilities
+        )
 
     @staticmethod
     def _normalize_path(path):
@@ -1720,25 +4101,120 @@ class Client(object):
             return s.encode('utf-8')
         return s
 
+    def _get_transport(self, transport):
+        """Returns the transport to send requests with
+
+        :param transport: "requests", "http2" or a :class:`Transport` instance
+        :returns: :class:`Transport` instance
+        :raises: ValueError if the transport name is unknown
+        """
+        if isinstance(transport, Transport):
+            return transport
+        if transport == RequestsTransport.name:
+            return RequestsTransport(
+                verify_certs=self._verify_certs,
+                pool_connections=self._pool_connections,
+                pool_maxsize=self._pool_maxsize,
+                pool_block=self._pool_block,
+                keep_alive=self._keep_alive,
+                socket_options=self._socket_options
+            )
+        if transport == HTTP2Transport.name:
+            return HTTP2Transport(
+                verify_certs=self._verify_certs,
+                pool_maxsize=self._pool_maxsize,
+                keep_alive=self._keep_alive
+            )
+        raise ValueError('Unknown transport: %s' % transport)
+
     @staticmethod
-    def _check_ocs_status(tree, accepted_codes=[100]):
+    def _get_xml_backend(backend):
+        """Returns the XML backend to use for parsing responses
+
+        :param backend: "auto", "lxml", "etree" or an :class:`XMLBackend`
+            instance
+        :returns: :class:`XMLBackend` instance
+        :raises: ValueError if the backend name is unknown
+        """
+        if isinstance(backend, XMLBackend):
+            return backend
+        if backend == 'auto':
+            if _lxml_etree is not None:
+                return LxmlBackend()
+            return XMLBackend()
+        if backend == 'lxml':
+            return LxmlBackend()
+        if backend == 'etree':
+            return XMLBackend()
+        raise ValueError('Unknown XML backend: %s' % backend)
+
+    def _xml_find(self, element, path):
+        """Returns the first subelement matching a path, with a lookup
+        compiled by the XML backend once per path
+
+        :param element: element of the XML backend or :class:`JSONElement`
+        :param path: path relative to the element, e.g. "meta/statuscode"
+        :returns: first matching subelement or None
+        """
+        if isinstance(element, JSONElement):
+            return element.find(path)
+        find = self._xml_lookups.get(path)
+        if find is None:
+            find = self._xml.compile(path)
+            self._xml_lookups[path] = find
+        return find(element)
+
+    def _check_ocs_status(self, ocs, accepted_codes=[100]):
         """Checks the status code of an OCS request
 
-        :param tree: response parsed with elementtree
+        :param ocs: parsed response, see :meth:`_parse_ocs_response`
         :param accepted_codes: list of statuscodes we consider good. E.g. [100,102] can be used to accept a POST
                returning an 'already exists' condition
-        :raises: HTTPResponseError if the http status is not 200, or OCSResponseError if the OCS status is not one of the accepted_codes.
+        :raises: OCSResponseError if the OCS status is not one of the accepted_codes.
         """
-        code_el = tree.find('meta/statuscode')
-        if code_el is not None and int(code_el.text) not in accepted_codes:
+        if ocs.status_code is not None and ocs.status_code not in accepted_codes:
             r = requests.Response()
-            msg_el = tree.find('meta/message')
-            if msg_el is None:
-                msg_el = tree  # fallback to the entire ocs response, if we find no message.
-            r._content = ET.tostring(msg_el)
-            r.status_code = int(code_el.text)
+            if isinstance(ocs.data, JSONElement):
+                r._content = json.dumps(ocs.tree.get('meta')).encode('utf-8')
+            else:
+                msg_el = self._xml_find(ocs.tree, 'meta/message')
+                if msg_el is None:
+                    msg_el = ocs.tree  # fallback to the entire ocs response, if we find no message.
+                r._content = self._xml.tostring(msg_el)
+            r.status_code = ocs.status_code
             raise OCSResponseError(r)
 
+    def _parse_ocs_response(self, res):
+        """Parses the envelope of an OCS response
+
+        :param res: response
+        :returns: :class:`OCSResponse` instance
+        """
+        with self._span('parse OCS', 'parse', format=self._ocs_format,
+                        size=len(res.content)):
+            if self._ocs_format == 'json':
+                content = res.content
+                if isinstance(content, bytes):
+                    content = content.decode('utf-8')
+                tree = json.loads(content)['ocs']
+                meta = tree.get('meta', {})
+                status_code = meta.get('statuscode')
+                message = meta.get('message')
+                data = JSONElement('data', tree.get('data'))
+            else:
+                tree = self._xml.fromstring(res.content)
+                code_el = self._xml_find(tree, 'meta/statuscode')
+                msg_el = self._xml_find(tree, 'meta/message')
+                status_code = code_el.text if code_el is not None else None
+                message = msg_el.text if msg_el is not None else None
+                data = self._xml_find(tree, 'data')
+
+            if status_code is not None:
+                status_code = int(status_code)
+                if self._ocs_version == 2 and status_code == 200:
+                    status_code = 100
+            return OCSResponse(res, status_code, message, data, tree)
+
     def make_ocs_request(self, method, service, action, **kwargs):
         """Makes a OCS API request and analyses the response
 
@@ -1746,32 +4222,71 @@ class Client(object):
         :param service: service name
         :param action: action path
         :param \*\*kwargs: optional arguments that ``requests.Request.request`` accepts
-        :returns :class:`requests.Response` instance
+        :returns :class:`requests.Response` instance, with the parsed
+            response as :class:`OCSResponse` in its ``ocs`` attribute
         """
 
         accepted_codes = kwargs.pop('accepted_codes', [100])
 
         res = self._make_ocs_request(method, service, action, **kwargs)
         if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree, accepted_codes=accepted_codes)
+            res.ocs = self._parse_ocs_response(res)
+            self._check_ocs_status(res.ocs, accepted_codes=accepted_codes)
             return res
 
         raise OCSResponseError(res)
 
-    def _make_ocs_request(self, method, service, action, **kwargs):
-        """Makes a OCS API request
+    def _ocs_request(self, method, service, action, **kwargs):
+        """Makes a OCS API request and parses the response
 
         :param method: HTTP method
         :param service: service name
         :param action: action path
+        :param accepted_codes: list of accepted OCS status codes, defaults
+            to [100], None to accept any status
         :param \*\*kwargs: optional arguments that ``requests.Request.request`` accepts
-        :returns :class:`requests.Response` instance
+        :returns: :class:`OCSResponse` instance
+        :raises: HTTPResponseError in case an HTTP error status was returned,
+            OCSResponseError if the OCS status is not accepted
+        """
+        accepted_codes = kwargs.pop('accepted_codes', [100])
+
+        res = self._make_ocs_request(method, service, action, **kwargs)
+        if res.status_code != 200:
+            raise HTTPResponseError(res)
+        ocs = self._parse_ocs_response(res)
+        if accepted_codes is not None:
+            self._check_ocs_status(ocs, accepted_codes)
+        return ocs
+
+    def _get_ocs_path(self, service, action):
+        """Returns the path of an OCS API call relative to the server URL
+
+        :param service: service name
+        :param action: action path
+        :returns: path
         """
         slash = ''
         if service:
             slash = '/'
-        path = self.OCS_BASEPATH + service + slash + action
+        if self._ocs_version == 2:
+            path = self.OCS_V2_BASEPATH + service + slash + action
+        else:
+            path = self.OCS_BASEPATH + service + slash + action
+        if self._ocs_format == 'json':
+            path += ('&' if '?' in action else '?') + 'format=json'
+        return path
+
+    def _make_ocs_request(self, method, service, action, **kwargs):
+        """Makes a OCS API request
+
+        :param method: HTTP method
+        :param service: service name
+        :param action: action path
+        :param \*\*kwargs: optional arguments that ``requests.Request.request`` accepts
+        :returns :class:`requests.Response` instance
+        """
+        path = self._get_ocs_path(service, action)
 
         attributes = kwargs.copy()
 
@@ -1780,13 +4295,188 @@ class Client(object):
 
         attributes['headers']['OCS-APIREQUEST'] = 'true'
 
-        if self._debug:
-            print('OCS request: %s %s %s' % (method, self.url + path,
-                                             attributes))
+        if _ocs_log.isEnabledFor(logging.DEBUG):
+            logged = dict(attributes)
+            logged['headers'] = _redact(attributes['headers'])
+            if isinstance(attributes.get('data'), dict):
+                logged['data'] = _redact(attributes['data'])
+            _ocs_log.debug('request: %s %s %s', method, self.url + path,
+                           logged)
+
+        with self._span('OCS ' + method, 'ocs', service=service,
+                        action=action):
+            res = self._request(method, self.url + path, 'ocs/' + service,
+                                **attributes)
+        return res
+
+    def _request(self, method, url, endpoint, **kwargs):
+        """Sends an HTTP request, retrying it according to the retry policy
 
-        res = self._session.request(method, self.url + path, **attributes)
+        :param method: HTTP method
+        :param url: URL to send the request to
+        :param endpoint: label of the targeted endpoint, used for statistics
+        :param \*\*kwargs: optional arguments that :meth:`Transport.request`
+            accepts
+        :returns: response of the transport, a :class:`requests.Response`
+            instance by default
+        """
+        policy = self._retry_policy
+        if policy is None:
+            return self._send(method, url, endpoint, **kwargs)
+
+        policy.on_request()
+        if not policy.is_retryable(method):
+            return self._send(method, url, endpoint, **kwargs)
+
+        # file handles must be rewound before sending them again
+        data = kwargs.get('data')
+        position = None
+        if hasattr(data, 'seek') and hasattr(data, 'tell'):
+            position = data.tell()
+
+        attempt = 0
+        while True:
+            res = None
+            error = None
+            try:
+                res = self._send(method, url, endpoint, attempt, **kwargs)
+            except self._transport.connection_errors as e:
+                error = e
+
+            delay = policy.get_retry_delay(attempt, res, error)
+            if delay is None or not policy.acquire(method + ' ' + endpoint):
+                if error is not None:
+                    raise error
+                return res
+
+            if res is not None:
+                res.close()
+            if position is not None:
+                data.seek(position)
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, method, url, endpoint, retries=0, headers=None,
+              data=None, **kwargs):
+        """Sends a request through the transport, authenticated with the
+        session cookies when the session is reused, else with the
+        credentials
+
+        :param method: HTTP method
+        :param url: URL to send the request to
+        :param endpoint: label of the targeted endpoint
+        :param retries: number of times the request was already retried
+        :param headers: dictionary of request headers
+        :param data: request body
+        :param \*\*kwargs: optional arguments that :meth:`Transport.request`
+            accepts
+        :returns: response of the transport
+        """
+        headers = dict(headers or {})
+        if self._session_established:
+            # the header exempts cookie authenticated requests from the
+            # CSRF check of the server
+            headers['OCS-APIREQUEST'] = 'true'
+            position = None
+            if hasattr(data, 'seek') and hasattr(data, 'tell'):
+                position = data.tell()
+
+            res = self._exchange(
+                method, url, endpoint, retries, headers, data, **kwargs
+            )
+            if res.status_code != 401:
+                return res
+
+            # the session expired, authenticate with the credentials again
+            res.close()
+            self._transport.clear_cookies()
+            self._session_established = False
+            if position is not None:
+                data.seek(position)
+
+        if self._auth_header is not None:
+            headers['Authorization'] = self._auth_header
+        res = self._exchange(
+            method, url, endpoint, retries, headers, data, **kwargs
+        )
+        if (self._reuse_session and res.status_code < 400
+                and self._transport.has_cookies()):
+            self._session_established = True
+        return res
+
+    def _exchange(self, method, url, endpoint, retries, headers, data,
+                  **kwargs):
+        """Sends a request through the transport and reports the exchange
+        to the event hooks
+
+        :param method: HTTP method
+        :param url: URL to send the request to
+        :param endpoint: label of the targeted endpoint
+        :param retries: number of times the request was already retried
+        :param headers: dictionary of request headers
+        :param data: request body
+        :param \*\*kwargs: optional arguments that :meth:`Transport.request`
+            accepts
+        :returns: response of the transport
+        """
+        if not self._event_hooks:
+            return self._transport.request(
+                method, url, headers=headers, data=data, **kwargs
+            )
+
+        event = RequestEvent(method, url, endpoint, retries)
+        event.bytes_sent = self._get_body_size(data)
+        start = _clock()
+        event.start = start
+        try:
+            res = self._transport.request(
+                method, url, headers=headers, data=data, **kwargs
+            )
+        except Exception as e:
+            event.timings['total'] = _clock() - start
+            event.error = e
+            self._emit_event(event)
+            raise
+
+        if kwargs.get('stream'):
+            length = res.headers.get('Content-Length')
+            if length is not None:
+                event.bytes_received = int(length)
+        else:
+            event.bytes_received = len(res.content)
+        event.timings['total'] = _clock() - start
+        event.timings.update(getattr(res, 'timings', None) or {})
+        event.status_code = res.status_code
+        self._emit_event(event)
         return res
 
+    def _emit_event(self, event):
+        for hook in list(self._event_hooks):
+            hook(event)
+
+    @staticmethod
+    def _get_body_size(data):
+        """Returns the size of a request body
+
+        :param data: request body
+        :returns: size in bytes or None if unknown
+        """
+        if data is None:
+            return 0
+        if isinstance(data, dict):
+            return len(parse.urlencode(data))
+        if isinstance(data, six.text_type):
+            return len(data.encode('utf-8'))
+        if isinstance(data, six.binary_type):
+            return len(data)
+        if hasattr(data, 'seek') and hasattr(data, 'tell'):
+            position = data.tell()
+            data.seek(0, os.SEEK_END)
+            size = data.tell() - position
+            data.seek(position)
+            return size
+        return None
+
     def _make_dav_request(self, method, path, **kwargs):
         """Makes a WebDAV request
 
@@ -1797,19 +4487,33 @@ class Client(object):
         contains it, or True if the operation succeeded, False
         if it didn't
         """
-        if self._debug:
-            print('DAV request: %s %s' % (method, path))
+        debug = _dav_log.isEnabledFor(logging.DEBUG)
+        if debug:
+            _dav_log.debug('request: %s %s', method, path)
             if kwargs.get('headers'):
-                print('Headers: ', kwargs.get('headers'))
+                _dav_log.debug('headers: %s', _redact(kwargs['headers']))
 
         path = self._normalize_path(path)
-        res = self._session.request(
-            method,
-            self._webdav_url + parse.quote(self._encode_string(path)),
-            **kwargs
-        )
-        if self._debug:
-            print('DAV status: %i' % res.status_code)
+        with self._span('DAV ' + method, 'dav', path=path):
+            res = self._request(
+                method,
+                self._get_webdav_url() + parse.quote(self._encode_string(path)),
+                'dav',
+                **kwargs
+            )
+            if debug:
+                _dav_log.debug('status: %i', res.status_code)
+            return self._handle_dav_response(res)
+
+    def _handle_dav_response(self, res):
+        """Analyses the response of a WebDAV request
+
+        :param res: response
+        :returns array of :class:`FileInfo` if the response
+        contains it, or True if the operation succeeded, False
+        if it didn't
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
         if res.status_code in [200, 207]:
             return self._parse_dav_response(res)
         if res.status_code in [204, 201]:
@@ -1824,10 +4528,13 @@ class Client(object):
         the operation did not succeed
         """
         if res.status_code == 207:
-            tree = ET.fromstring(res.content)
-            items = []
-            for child in tree:
-                items.append(self._parse_dav_element(child))
+            with self._span('parse XML', 'parse', size=len(res.content)):
+                tree = self._xml.fromstring(res.content)
+            with self._span('build FileInfo', 'parse') as span:
+                items = []
+                for child in tree:
+                    items.append(self._parse_dav_element(child))
+                span.set(count=len(items))
             return items
         return False
 
@@ -1837,9 +4544,19 @@ class Client(object):
         :param dav_response: DAV response
         :returns :class:`FileInfo`
         """
-        href = parse.unquote(
-            self._strip_dav_path(dav_response.find('{DAV:}href').text)
-        )
+        href = None
+        attrs = None
+        # a single pass over the children is cheaper than separate lookups
+        for child in dav_response:
+            if child.tag == '{DAV:}href':
+                href = child.text
+            elif child.tag == '{DAV:}propstat' and attrs is None:
+                for propstat_child in child:
+                    if propstat_child.tag == '{DAV:}prop':
+                        attrs = propstat_child
+                        break
+
+        href = parse.unquote(self._strip_dav_path(href))
 
         if six.PY2:
             href = href.decode('utf-8')
@@ -1849,10 +4566,9 @@ class Client(object):
             file_type = 'dir'
 
         file_attrs = {}
-        attrs = dav_response.find('{DAV:}propstat')
-        attrs = attrs.find('{DAV:}prop')
-        for attr in attrs:
-            file_attrs[attr.tag] = attr.text
+        if attrs is not None:
+            for attr in attrs:
+                file_attrs[attr.tag] = attr.text
 
         return FileInfo(href, file_type, file_attrs)
 
@@ -1881,31 +4597,25 @@ class Client(object):
         if operation != "MOVE" and operation != "COPY":
             return False
 
-        if remote_path_target[-1] == '/':
-            remote_path_target += os.path.basename(remote_path_source)
-
-        if not (remote_path_target[0] == '/'):
-            remote_path_target = '/' + remote_path_target
-
-        remote_path_source = self._normalize_path(remote_path_source)
-        headers = {
-            'Destination': self._webdav_url + parse.quote(
-                self._encode_string(remote_path_target))
-        }
-
         return self._make_dav_request(
             operation,
-            remote_path_source,
-            headers=headers
+            self._normalize_path(remote_path_source),
+            headers=self._get_move_copy_headers(remote_path_source,
+                                                remote_path_target)
         )
 
     def _xml_to_dict(self, element):
         """
         Take an XML element, iterate over it and build a dict
 
-        :param element: An xml.etree.ElementTree.Element, or a list of the same
+        :param element: An element of the XML backend, or a list of the same,
+            or a decoded JSON object
         :returns: A dictionary
         """
+        if isinstance(element, dict):
+            return _json_to_dict(element)
+        if isinstance(element, JSONElement):
+            return element.to_dict()
         return_dict = {}
         for el in element:
             return_dict[el.tag] = None
@@ -1916,51 +4626,157 @@ class Client(object):
                 return_dict[el.tag] = el.text
         return return_dict
 
+    def _parse_shares(self, ocs):
+        """Parses the response of a request listing shares
+
+        :param ocs: parsed response
+        :returns: array of :class:`ShareInfo` instances
+        """
+        if isinstance(ocs.data, JSONElement):
+            # the decoded list of shares, no element view needed
+            data = ocs.tree.get('data')
+            if not isinstance(data, list):
+                return []
+            return [self._get_shareinfo(share) for share in data]
+        shares = []
+        for element in ocs.data.iter('element'):
+            shares.append(self._get_shareinfo(element))
+        return shares
+
+    def _parse_new_share(self, ocs, share_info, keys=()):
+        """Parses the response of a share creation request
+
+        :param ocs: parsed response
+        :param share_info: dictionary of share attributes known by the
+            caller, the id of the share is added to it
+        :param keys: additional attributes to read from the response
+        :returns: instance of :class:`ShareInfo`
+        """
+        if isinstance(ocs.data, JSONElement):
+            data = ocs.tree.get('data')
+            share_info['id'] = _json_text(data.get('id'))
+            for key in keys:
+                share_info[key] = _json_text(data.get(key))
+            return ShareInfo(share_info)
+        data_el = ocs.data
+        share_info['id'] = self._xml_find(data_el, 'id').text
+        for key in keys:
+            share_info[key] = self._xml_find(data_el, key).text
+        return ShareInfo(share_info)
+
     def _get_shareinfo(self, data_el):
         """Simple helper which returns instance of ShareInfo class
 
-        :param data_el: 'data' element extracted from _make_ocs_request
+        :param data_el: 'data' element extracted from _make_ocs_request,
+            or the decoded JSON object of a share
         :returns: instance of ShareInfo class
         """
-        if (data_el is None) or not (isinstance(data_el, ET.Element)):
+        if (data_el is None) or not (isinstance(data_el, (dict, JSONElement))
+                                     or self._xml.iselement(data_el)):
             return None
         return ShareInfo(self._xml_to_dict(data_el))
 
+    def _set_dav_urls(self, user_id):
+        """Sets the WebDAV URL of the given user according to the DAV
+        endpoint version
+
+        :param user_id: user id
+        """
+        url_components = parse.urlparse(self.url)
+        if self._dav_endpoint_version == 1:
+            self._davpath = url_components.path + 'remote.php/dav/files/' + parse.quote(user_id)
+            self._webdav_url = self.url + 'remote.php/dav/files/' + parse.quote(user_id)
+        else:
+            self._davpath = url_components.path + 'remote.php/webdav'
+            self._webdav_url = self.url + 'remote.php/webdav'
+
+    def _get_webdav_url(self):
+        """Returns the WebDAV URL, fetching the capabilities first when
+        they were not fetched at login
+
+        :returns: WebDAV URL
+        :raises: HTTPResponseError in case an HTTP error status was returned
+        """
+        if self._webdav_url is None:
+            # threads which need the URL at the same time wait for the
+            # first one to fetch it
+            with self._lock:
+                if self._webdav_url is None:
+                    self._update_capabilities()
+                    self._set_dav_urls(self._user_id)
+        return self._webdav_url
+
+    def _load_cached_capabilities(self):
+        """Loads the capabilities of the server from the capabilities
+        cache
+
+        :returns: True if the cache had a valid entry, False otherwise
+        """
+        if self._capabilities_cache is None:
+            return False
+        entry = self._capabilities_cache.get(self.url)
+        if entry is None:
+            return False
+        self._apply_capabilities(entry['capabilities'], entry['version'])
+        return True
+
     def _update_capabilities(self):
-        res = self._make_ocs_request(
-                'GET',
-                self.OCS_SERVICE_CLOUD,
-                'capabilities'
-                )
-        if res.status_code == 200:
-            tree = ET.fromstring(res.content)
-            self._check_ocs_status(tree)
+        return self._run_ocs_request(self._get_capabilities_request())
+
+    def _parse_capabilities(self, ocs):
+        """Parses the response of a capabilities request and updates the
+        capabilities, version and DAV endpoint version of the client
 
-            data_el = tree.find('data')
+        :param ocs: parsed response
+        :returns: capabilities dictionary
+        """
+        if isinstance(ocs.data, JSONElement):
+            data = ocs.tree.get('data')
+            apps = {}
+            # PHP encodes empty objects as empty arrays
+            for app, caps in JSONElement._items(data['capabilities']):
+                apps[app] = dict(
+                    (key, _json_text(value))
+                    for key, value in JSONElement._items(caps)
+                )
+            version = _json_text(data['version']['string'])
+            edition = _json_text(data['version'].get('edition'))
+        else:
+            data_el = ocs.data
             apps = {}
-            for app_el in data_el.find('capabilities'):
+            for app_el in self._xml_find(data_el, 'capabilities'):
                 app_caps = {}
                 for cap_el in app_el:
                     app_caps[cap_el.tag] = cap_el.text
                 apps[app_el.tag] = app_caps
 
-            self._capabilities = apps
+            version = self._xml_find(data_el, 'version/string').text
+            edition = self._xml_find(data_el, 'version/edition').text
+        if edition is not None:
+            version += '-' + edition
 
-            version_el = data_el.find('version/string')
-            edition_el = data_el.find('version/edition')
-            self._version = version_el.text
-            if edition_el.text is not None:
-                self._version += '-' + edition_el.text
+        self._apply_capabilities(apps, version)
+        if self._capabilities_cache is not None:
+            self._capabilities_cache.set(self.url, apps, version)
+        return self._capabilities
 
-            if 'dav' in apps and 'chunking' in apps['dav']:
-                chunking_version = float(apps['dav']['chunking'])
-                if self._dav_endpoint_version > chunking_version:
-                    self._dav_endpoint_version = None
+    def _apply_capabilities(self, apps, version):
+        """Sets the capabilities and version of the client, and resolves
+        the DAV endpoint version from them
 
-                if self._dav_endpoint_version is None and chunking_version >= 1.0:
-                    self._dav_endpoint_version = 1
-                else:
-                    self._dav_endpoint_version = 0
+        :param apps: capabilities dictionary
+        :param version: version string
+        """
+        self._capabilities = apps
+        self._version = version
 
-            return self._capabilities
-        raise HTTPResponseError(res)
+        if 'dav' in apps and 'chunking' in apps['dav']:
+            chunking_version = float(apps['dav']['chunking'])
+            dav_endpoint_version = self._requested_dav_endpoint_version
+            if dav_endpoint_version > chunking_version:
+                dav_endpoint_version = None
+
+            if dav_endpoint_version is None and chunking_version >= 1.0:
+                self._dav_endpoint_version = 1
+            else:
+                self._dav_endpoint_version = 0
@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+#
+# vim: expandtab shiftwidth=4 softtabstop=4
+#
+"""Recording and replay of HTTP exchanges
+
+Records the requests of a client and the responses of the server into a
+compact file, with the credentials removed, and serves them back without
+server, so that the client side cost of real world responses can be
+profiled offline::
+
+    recording = Recording()
+    oc = owncloud.Client(url, recording=recording)
+    oc.login('user', 'password')
+    oc.list('/', depth='infinity')
+    recording.save('listing.ocrec')
+
+    replayed = owncloud.Client(url, transport=ReplayTransport(
+        Recording.load('listing.ocrec')
+    ))
+    replayed.login('user', 'password')
+    replayed.list('/', depth='infinity')
+
+Requests are matched with the recorded ones by method, path, query and,
+except for uploads, body. The transfer ids of chunked uploads are ignored
+when matching.
+"""
+
+import base64
+import gzip
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+
+import requests
+import six
+from six.moves.urllib import parse
+
+from .owncloud import Transport, _add_params, _clock, _redact
+
+FORMAT = 'owncloud-recording'
+VERSION = 1
+
+# chunked uploads name their chunks with a random transfer id
+_CHUNKING_ID = re.compile(r'-chunking-\d+-')
+
+
+def _scrub_form(fields):
+    """Returns a copy of form fields without credentials"""
+    fields = _redact(fields)
+    # set_user_attribute() sends the password as value of the key field
+    if fields and 'password' in str(fields.get('key', '')).lower():
+        fields['value'] = '<redacted>'
+    return fields
+
+
+def _get_body_key(method, data):
+    """Returns the digest of a request body used to match requests, or
+    None if the body is not compared
+    """
+    if data is None or method == 'PUT':
+        return None
+    if isinstance(data, dict):
+        data = parse.urlencode(sorted(_scrub_form(data).items()))
+    if hasattr(data, 'read'):
+        return None
+    if isinstance(data, six.text_type):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+def _get_request_key(method, url, body_key):
+    parts = parse.urlsplit(url)
+    target = _CHUNKING_ID.sub('-chunking-*-', parts.path)
+    if parts.query:
+        target += '?' + parts.query
+    return method, target, body_key
+
+
+class Exchange(object):
+    """Recorded request and response"""
+
+    def __init__(self, method, url, request_headers, body_key, status_code,
+                 response_headers, content, timings, start=0.0):
+        """Instantiates an exchange
+
+        :param method: HTTP method
+        :param url: path and query of the request
+        :param request_headers: dictionary of request headers without
+            credentials
+        :param body_key: digest of the request body, None if not compared
+        :param status_code: HTTP status of the response
+        :param response_headers: dictionary of response headers without
+            cookies
+        :param content: response body as bytes
+        :param timings: dictionary with the "ttfb" and "total" durations
+            of the exchange in seconds
+        :param start: time of the request since the start of the
+            recording in seconds
+        """
+        self.method = method
+        self.url = url
+        self.request_headers = request_headers
+        self.body_key = body_key
+        self.status_code = status_code
+        self.response_headers = response_headers
+        self.content = content
+        self.timings = timings
+        self.start = start
+
+    def get_key(self):
+        return _get_request_key(self.method, self.url, self.body_key)
+
+    def to_dict(self):
+        try:
+            body = {'text': self.content.decode('utf-8')}
+        except UnicodeDecodeError:
+            body = {'base64': base64.b64encode(self.content).decode('ascii')}
+        return {
+            'method': self.method,
+            'url': self.url,
+            'request_headers': self.request_headers,
+            'body_key': self.body_key,
+            'status': self.status_code,
+            'response_headers': self.response_headers,
+            'body': body,
+            'timings': self.timings,
+            'start': self.start
+        }
+
+    @classmethod
+    def from_dict(cls, values):
+        body = values['body']
+        if 'text' in body:
+            content = body['text'].encode('utf-8')
+        else:
+            content = base64.b64decode(body['base64'])
+        return cls(
+            values['method'], values['url'], values['request_headers'],
+            values['body_key'], values['status'],
+            values['response_headers'], content, values['timings'],
+            values.get('start', 0.0)
+        )
+
+
+class Recording(object):
+    """Recorded exchanges, saved as gzip compressed JSON lines
+
+    Instances are thread safe.
+    """
+
+    def __init__(self, exchanges=None):
+        """Instantiates a recording
+
+        :param exchanges: list of :class:`Exchange`, defaults to none
+        """
+        self.exchanges = list(exchanges or [])
+        self._lock = threading.Lock()
+        self._origin = _clock()
+
+    def __len__(self):
+        return len(self.exchanges)
+
+    def add(self, exchange):
+        """Adds an exchange
+
+        :param exchange: :class:`Exchange` instance
+        """
+        with self._lock:
+            self.exchanges.append(exchange)
+
+    def get_offset(self, timestamp):
+        """Returns the time of a ``_clock()`` timestamp since the creation
+        of the recording in seconds
+        """
+        return timestamp - self._origin
+
+    def save(self, path):
+        """Writes the recording to a file
+
+        :param path: path of the file to write
+        """
+        with self._lock:
+            exchanges = list(self.exchanges)
+        with gzip.open(path, 'wb') as f:
+            lines = [{'format': FORMAT, 'version': VERSION}] + \
+                [exchange.to_dict() for exchange in exchanges]
+            for line in lines:
+                f.write(json.dumps(line, sort_keys=True).encode('utf-8'))
+                f.write(b'\n')
+
+    @classmethod
+    def load(cls, path):
+        """Reads a recording from a file
+
+        :param path: path of the file written by :meth:`save`
+        :returns: :class:`Recording` instance
+        :raises: ValueError if the file is not a recording
+        """
+        with gzip.open(path, 'rb') as f:
+            lines = f.read().decode('utf-8').splitlines()
+        header = json.loads(lines[0]) if lines else {}
+        if header.get('format') != FORMAT:
+            raise ValueError('Not a recording: %s' % path)
+        if header.get('version') != VERSION:
+            raise ValueError('Unsupported recording version: %s' %
+                             header.get('version'))
+        return cls([Exchange.from_dict(json.loads(line))
+                    for line in lines[1:]])
+
+
+class _RecordedResponse(object):
+    """Response served from memory, with the interface of
+    :class:`requests.Response` used by :class:`owncloud.Client`
+    """
+
+    def __init__(self, status_code, headers, content, timings=None):
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.content = content
+        self.timings = timings
+
+    def iter_content(self, chunk_size=1):
+        stream = io.BytesIO(self.content)
+        return iter(lambda: stream.read(chunk_size), b'')
+
+    def close(self):
+        pass
+
+
+class RecordingTransport(Transport):
+    """Transport sending requests through another transport and recording
+    the exchanges
+
+    Streamed response bodies are read completely before being returned.
+    The Authorization and Cookie request headers, the Set-Cookie response
+    headers and password form fields are replaced by "<redacted>".
+    """
+
+    name = 'recording'
+
+    def __init__(self, transport, recording=None):
+        """Instantiates a transport
+
+        :param transport: :class:`owncloud.Transport` to send the requests
+            with
+        :param recording: :class:`Recording` to add the exchanges to,
+            defaults to a new one
+        """
+        self.transport = transport
+        self.recording = recording if recording is not None else Recording()
+        self.connection_errors = transport.connection_errors
+
+    def open(self):
+        self.transport.open()
+
+    def close(self):
+        self.transport.close()
+
+    def has_cookies(self):
+        return self.transport.has_cookies()
+
+    def clear_cookies(self):
+        self.transport.clear_cookies()
+
+    def get_pool_stats(self):
+        return self.transport.get_pool_stats()
+
+    def request(self, method, url, headers=None, data=None, stream=False,
+                **kwargs):
+        body_key = _get_body_key(method, data)
+        start = _clock()
+        res = self.transport.request(method, url, headers=headers, data=data,
+                                     stream=stream, **kwargs)
+        url = _add_params(url, kwargs.get('params'))
+        content = res.content
+        timings = dict(getattr(res, 'timings', None) or {})
+        timings['total'] = _clock() - start
+        response_headers = _redact(dict(res.headers))
+
+        parts = parse.urlsplit(url)
+        self.recording.add(Exchange(
+            method,
+            parts.path + ('?' + parts.query if parts.query else ''),
+            _redact(dict(headers or {})),
+            body_key,
+            res.status_code,
+            response_headers,
+            content,
+            timings,
+            self.recording.get_offset(start)
+        ))
+        if stream:
+            res.close()
+        return _RecordedResponse(res.status_code, res.headers, content,
+                                 getattr(res, 'timings', None))
+
+
+class ReplayTransport(Transport):
+    """Transport serving the responses of a recording
+
+    Identical requests are answered with their recorded responses in
+    order, the last one is repeated when they are exhausted.
+    """
+
+    name = 'replay'
+
+    def __init__(self, recording, speed=None):
+        """Instantiates a transport
+
+        :param recording: :class:`Recording` to serve
+        :param speed: None (default) to answer immediately, or factor by
+            which the recorded durations are divided to delay the
+            responses, 1.0 for the recorded timings
+        """
+        self.recording = recording
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._responses = {}
+        self._served = {}
+        self._cookies = False
+        for exchange in recording.exchanges:
+            self._responses.setdefault(exchange.get_key(), []).append(
+                exchange
+            )
+
+    def open(self):
+        self._cookies = False
+
+    def close(self):
+        pass
+
+    def has_cookies(self):
+        return self._cookies
+
+    def clear_cookies(self):
+        self._cookies = False
+
+    # optional request arguments, the timeout has no effect
+    SUPPORTED_ARGUMENTS = ('params', 'timeout')
+
+    def request(self, method, url, headers=None, data=None, stream=False,
+                **kwargs):
+        self._check_arguments(kwargs, self.SUPPORTED_ARGUMENTS)
+        url = _add_params(url, kwargs.get('params'))
+        key = _get_request_key(method, url, _get_body_key(method, data))
+        with self._lock:
+            exchanges = self._responses.get(key)
+            if not exchanges:
+                raise LookupError(
+                    'No recorded response for %s %s' % (key[0], key[1])
+                )
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+        exchange = exchanges[min(index, len(exchanges) - 1)]
+
+        timings = None
+        if self.speed:
+            timings = dict((name, value / self.speed)
+                           for name, value in exchange.timings.items())
+            time.sleep(timings.get('total', 0.0))
+        if 'set-cookie' in (name.lower()
+                            for name in exchange.response_headers):
+            self._cookies = True
+        if hasattr(data, 'read'):
+            # consume uploads like a real transport
+            while data.read(65536):
+                pass
+        return _RecordedResponse(exchange.status_code,
+                                 exchange.response_headers, exchange.content,
+                                 timings)
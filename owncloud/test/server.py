@@ -0,0 +1,1474 @@
+# -*- coding: utf-8 -*-
+#
+# vim: expandtab shiftwidth=4 softtabstop=4
+#
+"""In-process stand-in for an ownCloud server
+
+Implements the subset of the WebDAV and OCS APIs used by
+:class:`owncloud.Client`, keeping all data in memory, so that the tests
+and benchmarks can run without a real server::
+
+    server = StandInServer({'admin': 'admin'}).start()
+    oc = owncloud.Client(server.url)
+    oc.login('admin', 'admin')
+    ...
+    server.stop()
+
+Network latency, bandwidth limits and failing requests can be simulated
+reproducibly with :class:`Conditions`.
+
+WebDAV: PROPFIND, PROPPATCH, REPORT (filter-files, search-files), GET and
+HEAD with Range support, PUT with OC-Chunked assembly, MKCOL, MOVE, COPY
+and DELETE, on the "remote.php/webdav", "remote.php/dav/files/<user>" and
+"public.php/webdav" endpoints.
+
+OCS: capabilities, config, users, groups, apps, shares and privatedata,
+in XML or JSON and on the v1 and v2 endpoints.
+"""
+
+import base64
+import email.utils
+import io
+import json
+import mimetypes
+import random
+import re
+import threading
+import time
+import uuid
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+import six
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib import parse
+
+NS_DAV = 'DAV:'
+NS_OC = 'http://owncloud.org/ns'
+
+PERMISSION_READ = 1
+PERMISSION_UPDATE = 2
+PERMISSION_CREATE = 4
+PERMISSION_DELETE = 8
+PERMISSION_SHARE = 16
+PERMISSION_ALL = 31
+
+SHARE_TYPE_USER = 0
+SHARE_TYPE_GROUP = 1
+SHARE_TYPE_LINK = 3
+
+_NAMESPACE_PREFIXES = {NS_DAV: 'd', NS_OC: 'oc'}
+
+_FILE_PROPERTIES = [
+    '{DAV:}getlastmodified',
+    '{DAV:}getcontentlength',
+    '{DAV:}resourcetype',
+    '{DAV:}getetag',
+    '{DAV:}getcontenttype'
+]
+
+_DIR_PROPERTIES = [
+    '{DAV:}getlastmodified',
+    '{DAV:}resourcetype',
+    '{DAV:}quota-used-bytes',
+    '{DAV:}quota-available-bytes',
+    '{DAV:}getetag'
+]
+
+_CHUNK_NAME = re.compile(r'^(.*)-chunking-([^-/]+)-(\d+)-(\d+)$')
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[a-zA-Z]+$')
+
+
+class Conditions(object):
+    """Network and failure conditions simulated by :class:`StandInServer`
+
+    Attributes can be changed while the server is running. Random
+    decisions use a generator seeded with ``seed``, so that runs with the
+    same requests fail the same way.
+    """
+
+    def __init__(self, latency=0, jitter=0, bandwidth=None, error_rate=0,
+                 error_status=503, retry_after=None, seed=None):
+        """Instantiates conditions
+
+        :param latency: delay in seconds before every response
+        :param jitter: maximum random delay in seconds added to the latency
+        :param bandwidth: bytes per second at which request and response
+            bodies are transferred, defaults to None for no limit
+        :param error_rate: fraction of the requests answered with
+            ``error_status`` instead of being processed, between 0 and 1
+        :param error_status: HTTP status of the failed requests
+        :param retry_after: value of the Retry-After header sent with
+            failed requests, defaults to None to not send it
+        :param seed: seed of the random generator
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def get_delay(self):
+        """Returns the delay before the next response in seconds"""
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def get_transfer_time(self, size):
+        """Returns the time in seconds needed to transfer a body
+
+        :param size: size of the body in bytes
+        """
+        if not self.bandwidth or not size:
+            return 0
+        return float(size) / self.bandwidth
+
+    def should_fail(self):
+        """Returns whether the next request must fail"""
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class _Node(object):
+    """File or directory of the in-memory storage"""
+
+    def __init__(self, fileid, is_dir, data=b''):
+        self.fileid = fileid
+        self.is_dir = is_dir
+        self.data = None if is_dir else data
+        self.children = {} if is_dir else None
+        self.mtime = int(time.time())
+        self.etag = uuid.uuid4().hex[:13]
+        self.favorite = False
+
+    def get_size(self):
+        if not self.is_dir:
+            return len(self.data)
+        return sum(child.get_size() for child in self.children.values())
+
+    def walk(self, path):
+        """Yields the (path, node) pairs of this node and its descendants"""
+        yield path, self
+        if self.is_dir:
+            prefix = path.rstrip('/') + '/'
+            for name in sorted(self.children):
+                for item in self.children[name].walk(prefix + name):
+                    yield item
+
+
+class _DavContext(object):
+    """Target of a WebDAV request: the storage root it can access, the
+    URL path it is served under and the permissions of the requester
+    """
+
+    def __init__(self, user, root, href_base, permissions=PERMISSION_ALL):
+        self.user = user
+        self.root = root
+        self.href_base = href_base
+        self.permissions = permissions
+
+
+class _OCSError(Exception):
+
+    def __init__(self, status_code, message=''):
+        Exception.__init__(self, message)
+        self.status_code = status_code
+        self.message = message
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, without TCP_NODELAY the
+    # body waits for the delayed acknowledgement of the headers
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def handle_request(self):
+        standin = self.server.standin
+        conditions = standin.conditions
+        body = self._read_body()
+        delay = conditions.get_delay() + \
+            conditions.get_transfer_time(len(body))
+        if delay:
+            time.sleep(delay)
+
+        standin.record_request(self.command, self.path)
+        if conditions.should_fail():
+            headers = {}
+            if conditions.retry_after is not None:
+                headers['Retry-After'] = str(conditions.retry_after)
+            status, headers, content = conditions.error_status, headers, b''
+        else:
+            try:
+                status, headers, content = standin.handle(
+                    self.command, self.path, self.headers, body
+                )
+            except Exception:
+                status, headers, content = 500, {}, b''
+
+        transfer_time = conditions.get_transfer_time(len(content))
+        if transfer_time:
+            time.sleep(transfer_time)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        if self.headers.get('Connection', '').lower() == 'close':
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(content)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_DELETE = handle_request
+    do_PROPFIND = do_PROPPATCH = do_REPORT = handle_request
+    do_MKCOL = do_MOVE = do_COPY = handle_request
+
+
+class StandInServer(object):
+    """In-process server speaking the WebDAV and OCS APIs of ownCloud"""
+
+    VERSION = '10.0.10'
+
+    def __init__(self, users=None, host='127.0.0.1', port=0,
+                 conditions=None, chunking='1.0'):
+        """Instantiates a server, which listens once started
+
+        :param users: dictionary of the passwords of the users to create,
+            defaults to an "admin" user with password "admin". The first
+            user is administrator
+        :param host: address to listen on
+        :param port: port to listen on, defaults to a free one
+        :param conditions: :class:`Conditions` to simulate
+        :param chunking: DAV chunking version announced in the
+            capabilities, "1.0" makes clients use the
+            "remote.php/dav/files/<user>" endpoint
+        """
+        self.host = host
+        self.port = port
+        self.conditions = conditions or Conditions()
+        self.chunking = chunking
+        self.lock = threading.RLock()
+        self.users = {}
+        self.groups = {}
+        self.apps = {
+            'files': True,
+            'files_sharing': True,
+            'provisioning_api': True,
+            'activity': False
+        }
+        self.shares = {}
+        self.attributes = {}
+        self.tokens = {}
+        self.sessions = {}
+        self.requests = []
+        self._roots = {}
+        self._chunks = {}
+        self._next_fileid = 1
+        self._next_share_id = 1
+        self._server = None
+        self._thread = None
+
+        if users is None:
+            users = {'admin': 'admin'}
+        for index, (name, password) in enumerate(sorted(users.items())):
+            self.add_user(name, password, ['admin'] if index == 0 else [])
+
+    @property
+    def url(self):
+        """Base URL of the running server"""
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%i/' % (host, port)
+
+    def start(self):
+        """Starts serving requests from a daemon thread
+
+        :returns: the server itself
+        """
+        self._server = _HTTPServer((self.host, self.port), _Handler)
+        self._server.standin = self
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the server"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def add_user(self, name, password, groups=()):
+        """Creates a user
+
+        :param name: user id
+        :param password: password
+        :param groups: names of the groups to add the user to, which are
+            created if needed
+        """
+        with self.lock:
+            self.users[name] = {
+                'password': password,
+                'email': None,
+                'displayname': name,
+                'quota': 'default',
+                'subadmin': set()
+            }
+            self._roots[name] = self._new_node(True)
+            for group in groups:
+                self.groups.setdefault(group, set()).add(name)
+
+    def add_token(self, user, token):
+        """Registers an OAuth2 bearer token
+
+        :param user: user id the token authenticates
+        :param token: access token
+        """
+        with self.lock:
+            self.tokens[token] = user
+
+    def add_file(self, user, path, data=None):
+        """Creates a file or directory in the storage of a user without
+        going through HTTP, for example to prepare big trees quickly.
+        Missing parent directories are created
+
+        :param user: user id
+        :param path: path of the file or directory
+        :param data: contents of the file as bytes, or None to create a
+            directory
+        """
+        with self.lock:
+            node = self._roots[user]
+            parts = self._split(path)
+            for name in parts[:-1]:
+                child = node.children.get(name)
+                if child is None:
+                    child = self._new_node(True)
+                    node.children[name] = child
+                node = child
+            if data is None:
+                if parts[-1] not in node.children:
+                    node.children[parts[-1]] = self._new_node(True)
+            else:
+                node.children[parts[-1]] = self._new_node(False, data)
+            self._touch(self._roots[user], path)
+
+    def record_request(self, method, path):
+        with self.lock:
+            self.requests.append((method, path))
+
+    def get_storage(self, user):
+        """Returns the root directory node of a user, for inspection"""
+        return self._roots.get(user)
+
+    def handle(self, method, url, headers, body):
+        """Handles a request
+
+        :returns: tuple of status, dictionary of headers and body
+        """
+        parts = parse.urlsplit(url)
+        path = parts.path
+        query = dict(parse.parse_qsl(parts.query, keep_blank_values=True))
+
+        if path == '/status.php':
+            return self._json(200, {
+                'installed': True,
+                'maintenance': False,
+                'version': self.VERSION + '.0',
+                'versionstring': self.VERSION,
+                'edition': 'Community',
+                'productname': 'ownCloud'
+            })
+
+        if path.startswith('/public.php/webdav'):
+            with self.lock:
+                context = self._get_public_context(headers)
+                if context is None:
+                    return self._unauthorized()
+                return self._handle_dav(
+                    context, method, _unquote(path[len(context.href_base):]),
+                    headers, body
+                )
+
+        with self.lock:
+            user, cookie = self._authenticate(headers)
+        ocs = re.match(r'^/ocs/v([12])\.php/(.*)$', path)
+        if ocs is not None:
+            version = int(ocs.group(1))
+            json_format = query.pop('format', None) == 'json'
+            if user is None and ocs.group(2) != 'config':
+                return self._unauthorized()
+            with self.lock:
+                result = self._handle_ocs(
+                    user, method, ocs.group(2), query,
+                    self._parse_form(body), version, json_format
+                )
+            return self._with_cookie(result, cookie)
+
+        if user is None:
+            return self._unauthorized()
+
+        with self.lock:
+            if path.startswith('/remote.php/webdav'):
+                context = _DavContext(user, self._roots[user],
+                                      '/remote.php/webdav')
+            elif path.startswith('/remote.php/dav/files/'):
+                owner = _unquote(path.split('/')[4])
+                if owner != user:
+                    return 404, {}, b''
+                context = _DavContext(
+                    user, self._roots[user],
+                    '/remote.php/dav/files/' + path.split('/')[4]
+                )
+            elif path == '/index.php/apps/files/ajax/download.php':
+                return self._with_cookie(
+                    self._handle_zip(user, query), cookie
+                )
+            else:
+                return 404, {}, b''
+            result = self._handle_dav(
+                context, method, _unquote(path[len(context.href_base):]),
+                headers, body
+            )
+        return self._with_cookie(result, cookie)
+
+    # authentication
+
+    def _authenticate(self, headers):
+        """Returns the authenticated user and the session cookie to set"""
+        authorization = headers.get('Authorization')
+        if authorization is not None:
+            scheme, _, credentials = authorization.partition(' ')
+            if scheme.lower() == 'bearer':
+                return self.tokens.get(credentials), None
+            user, password = self._decode_basic(credentials)
+            account = self.users.get(user)
+            if account is None or account['password'] != password:
+                return None, None
+            session_id = self._get_session_id(headers)
+            if session_id in self.sessions:
+                return user, None
+            session_id = uuid.uuid4().hex
+            self.sessions[session_id] = user
+            return user, session_id
+
+        session_id = self._get_session_id(headers)
+        # like the server, only requests which cannot come from a browser
+        # form are authenticated by the session cookie alone
+        if session_id is not None and \
+                headers.get('OCS-APIREQUEST') == 'true':
+            return self.sessions.get(session_id), None
+        return None, None
+
+    @staticmethod
+    def _decode_basic(credentials):
+        try:
+            decoded = base64.b64decode(credentials).decode('utf-8')
+        except (TypeError, ValueError):
+            return None, None
+        user, _, password = decoded.partition(':')
+        return user, password
+
+    @staticmethod
+    def _get_session_id(headers):
+        for cookie in (headers.get('Cookie') or '').split(';'):
+            name, _, value = cookie.strip().partition('=')
+            if name == 'oc_session':
+                return value
+        return None
+
+    @staticmethod
+    def _with_cookie(result, session_id):
+        if session_id is None:
+            return result
+        status, headers, content = result
+        headers = dict(headers)
+        headers['Set-Cookie'] = 'oc_session=%s; path=/; HttpOnly' % session_id
+        return status, headers, content
+
+    @staticmethod
+    def _unauthorized():
+        return 401, {'WWW-Authenticate': 'Basic realm="ownCloud"'}, b''
+
+    def _get_public_context(self, headers):
+        scheme, _, credentials = \
+            (headers.get('Authorization') or '').partition(' ')
+        if scheme.lower() != 'basic':
+            return None
+        token, password = self._decode_basic(credentials)
+        for share in self.shares.values():
+            if share['share_type'] == SHARE_TYPE_LINK and \
+                    share['token'] == token:
+                if (share['password'] or '') != password:
+                    return None
+                node = self._lookup(self._roots[share['owner']],
+                                    share['path'])
+                if node is None:
+                    return None
+                return _DavContext(share['owner'], node,
+                                   '/public.php/webdav',
+                                   share['permissions'])
+        return None
+
+    # storage
+
+    def _new_node(self, is_dir, data=b''):
+        node = _Node(self._next_fileid, is_dir, data)
+        self._next_fileid += 1
+        return node
+
+    @staticmethod
+    def _split(path):
+        return [part for part in path.split('/') if part]
+
+    def _lookup(self, root, path):
+        node = root
+        for name in self._split(path):
+            if not node.is_dir:
+                return None
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    def _lookup_parent(self, root, path):
+        """Returns the parent directory node and the name of a path"""
+        parts = self._split(path)
+        if not parts:
+            return None, None
+        parent = self._lookup(root, '/'.join(parts[:-1]))
+        if parent is None or not parent.is_dir:
+            return None, parts[-1]
+        return parent, parts[-1]
+
+    def _touch(self, root, path, mtime=None):
+        """Changes the etag of a node and of its ancestors"""
+        node = root
+        nodes = [root]
+        for name in self._split(path):
+            node = node.children.get(name) if node.is_dir else None
+            if node is None:
+                break
+            nodes.append(node)
+        now = int(time.time())
+        for node in nodes:
+            node.etag = uuid.uuid4().hex[:13]
+            node.mtime = now
+        if mtime is not None and len(nodes) > 1:
+            nodes[-1].mtime = mtime
+
+    @staticmethod
+    def _normalize(path):
+        return '/' + '/'.join(part for part in path.split('/') if part)
+
+    # WebDAV
+
+    def _handle_dav(self, context, method, path, headers, body):
+        path = self._normalize(path)
+        handler = getattr(self, '_dav_' + method.lower(), None)
+        if handler is None:
+            return 405, {}, b''
+        return handler(context, path, headers, body)
+
+    def _dav_propfind(self, context, path, headers, body):
+        if not context.permissions & PERMISSION_READ:
+            return 404, {}, b''
+        node = self._lookup(context.root, path)
+        if node is None:
+            return 404, {}, b''
+        properties = None
+        if body:
+            prop = ET.fromstring(body).find('{DAV:}prop')
+            if prop is not None:
+                properties = [child.tag for child in prop]
+
+        depth = headers.get('Depth', '1')
+        if depth == '0' or not node.is_dir:
+            items = [(path, node)]
+        elif depth == '1':
+            prefix = path.rstrip('/') + '/'
+            items = [(path, node)] + [
+                (prefix + name, node.children[name])
+                for name in sorted(node.children)
+            ]
+        else:
+            items = list(node.walk(path))
+        return self._multistatus(context, items, properties)
+
+    def _dav_proppatch(self, context, path, headers, body):
+        node = self._lookup(context.root, path)
+        if node is None:
+            return 404, {}, b''
+        tags = []
+        for prop in ET.fromstring(body).iter('{DAV:}prop'):
+            for child in prop:
+                if child.tag == '{%s}favorite' % NS_OC:
+                    node.favorite = (child.text or '0') == '1'
+                tags.append(child.tag)
+        responses = [self._response(
+            context.href_base + _quote(path),
+            [(tag, None) for tag in tags], []
+        )]
+        return self._xml_response(207, self._wrap_multistatus(responses))
+
+    def _dav_report(self, context, path, headers, body):
+        request = ET.fromstring(body)
+        prop = request.find('{DAV:}prop')
+        properties = [child.tag for child in prop] if prop is not None \
+            else None
+        node = self._lookup(context.root, path)
+        if node is None:
+            return 404, {}, b''
+
+        items = []
+        if request.tag == '{%s}filter-files' % NS_OC:
+            rules = request.find('{%s}filter-rules' % NS_OC)
+            if rules is None or len(rules) == 0:
+                # "No filter criteria specified"
+                return 400, {}, b''
+            favorite = rules.find('{%s}favorite' % NS_OC) is not None
+            systemtags = rules.find('{%s}systemtag' % NS_OC) is not None
+            if not systemtags:
+                items = [
+                    (item_path, item)
+                    for item_path, item in node.walk(path)
+                    if item_path != path and (not favorite or item.favorite)
+                ]
+        elif request.tag == '{%s}search-files' % NS_OC:
+            pattern = (request.findtext('{%s}search/{%s}pattern' %
+                                        (NS_OC, NS_OC)) or '').lower()
+            limit = request.findtext('{%s}search/{%s}limit' % (NS_OC, NS_OC))
+            for item_path, item in node.walk(path):
+                name = item_path.rsplit('/', 1)[-1]
+                if item_path != path and pattern in name.lower():
+                    items.append((item_path, item))
+            if limit:
+                items = items[:int(limit)]
+        else:
+            return 415, {}, b''
+        return self._multistatus(context, items, properties)
+
+    def _dav_get(self, context, path, headers, body):
+        if not context.permissions & PERMISSION_READ:
+            return 404, {}, b''
+        node = self._lookup(context.root, path)
+        if node is None:
+            return 404, {}, b''
+        if node.is_dir:
+            return 405, {}, b''
+        response_headers = {
+            'Content-Type': self._get_content_type(path),
+            'ETag': '"%s"' % node.etag,
+            'Last-Modified': email.utils.formatdate(node.mtime, usegmt=True),
+            'Accept-Ranges': 'bytes'
+        }
+        match = _RANGE.match(headers.get('Range') or '')
+        size = len(node.data)
+        if match is None or not (match.group(1) or match.group(2)):
+            return 200, response_headers, node.data
+        if match.group(1):
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else size - 1
+        else:
+            start = max(0, size - int(match.group(2)))
+            end = size - 1
+        end = min(end, size - 1)
+        if start >= size or start > end:
+            return 416, {'Content-Range': 'bytes */%i' % size}, b''
+        response_headers['Content-Range'] = 'bytes %i-%i/%i' % (
+            start, end, size
+        )
+        return 206, response_headers, node.data[start:end + 1]
+
+    _dav_head = _dav_get
+
+    def _dav_put(self, context, path, headers, body):
+        chunk = _CHUNK_NAME.match(path)
+        if chunk is not None and headers.get('OC-Chunked'):
+            target, transfer_id = chunk.group(1), chunk.group(2)
+            count, index = int(chunk.group(3)), int(chunk.group(4))
+            key = (id(context.root), target, transfer_id)
+            chunks = self._chunks.setdefault(key, {})
+            chunks[index] = body
+            if len(chunks) < count:
+                return 201, {}, b''
+            del self._chunks[key]
+            body = b''.join(chunks[i] for i in range(count))
+            path = target
+
+        parent, name = self._lookup_parent(context.root, path)
+        if parent is None:
+            return 409, {}, b''
+        node = parent.children.get(name)
+        if node is not None and node.is_dir:
+            return 409, {}, b''
+        required = PERMISSION_CREATE if node is None else PERMISSION_UPDATE
+        if not context.permissions & required:
+            return 403, {}, b''
+
+        if node is None:
+            node = self._new_node(False, body)
+            parent.children[name] = node
+            status = 201
+        else:
+            node.data = body
+            status = 204
+        mtime = headers.get('X-OC-MTIME')
+        self._touch(context.root, path, int(mtime) if mtime else None)
+        response_headers = {
+            'ETag': '"%s"' % node.etag,
+            'OC-FileId': str(node.fileid)
+        }
+        if mtime:
+            response_headers['X-OC-MTime'] = 'accepted'
+        return status, response_headers, b''
+
+    def _dav_mkcol(self, context, path, headers, body):
+        if not context.permissions & PERMISSION_CREATE:
+            return 403, {}, b''
+        parent, name = self._lookup_parent(context.root, path)
+        if parent is None:
+            return 409 if name is not None else 405, {}, b''
+        if name in parent.children:
+            return 405, {}, b''
+        parent.children[name] = self._new_node(True)
+        self._touch(context.root, path)
+        return 201, {}, b''
+
+    def _dav_delete(self, context, path, headers, body):
+        if not context.permissions & PERMISSION_DELETE:
+            return 403, {}, b''
+        parent, name = self._lookup_parent(context.root, path)
+        if parent is None or name not in parent.children:
+            return 404, {}, b''
+        del parent.children[name]
+        self._touch(context.root, path.rsplit('/', 1)[0])
+        if context.href_base != '/public.php/webdav':
+            self._remove_shares(context.user, path)
+        return 204, {}, b''
+
+    def _dav_move(self, context, path, headers, body):
+        return self._move_copy(context, path, headers, True)
+
+    def _dav_copy(self, context, path, headers, body):
+        return self._move_copy(context, path, headers, False)
+
+    def _move_copy(self, context, path, headers, move):
+        destination = parse.urlsplit(headers.get('Destination') or '').path
+        if not destination.startswith(context.href_base):
+            return 502, {}, b''
+        target = self._normalize(
+            _unquote(destination[len(context.href_base):])
+        )
+        source_parent, source_name = self._lookup_parent(context.root, path)
+        if source_parent is None or source_name not in source_parent.children:
+            return 404, {}, b''
+        target_parent, target_name = self._lookup_parent(context.root, target)
+        if target_parent is None:
+            return 409, {}, b''
+        if target == path or target.startswith(path + '/'):
+            return 403, {}, b''
+        existed = target_name in target_parent.children
+        if existed and headers.get('Overwrite', 'T') == 'F':
+            return 412, {}, b''
+
+        node = source_parent.children[source_name]
+        if move:
+            del source_parent.children[source_name]
+            self._touch(context.root, path.rsplit('/', 1)[0])
+            self._move_shares(context.user, path, target)
+        else:
+            node = self._copy_node(node)
+        target_parent.children[target_name] = node
+        self._touch(context.root, target)
+        return 204 if existed else 201, {}, b''
+
+    def _copy_node(self, node):
+        copy = self._new_node(node.is_dir, node.data)
+        if node.is_dir:
+            for name, child in node.children.items():
+                copy.children[name] = self._copy_node(child)
+        return copy
+
+    def _multistatus(self, context, items, properties):
+        responses = []
+        for path, node in items:
+            href = context.href_base + _quote(path)
+            if node.is_dir and not href.endswith('/'):
+                href += '/'
+            if properties is None:
+                requested = _DIR_PROPERTIES if node.is_dir \
+                    else _FILE_PROPERTIES
+            else:
+                requested = properties
+            found = []
+            missing = []
+            for tag in requested:
+                value = self._get_property(context, node, path, tag)
+                if value is None:
+                    missing.append(tag)
+                else:
+                    found.append((tag, value))
+            responses.append(self._response(href, found, missing))
+        return self._xml_response(207, self._wrap_multistatus(responses))
+
+    def _get_property(self, context, node, path, tag):
+        """Returns the XML content of a property or None if the node
+        does not have it
+        """
+        if tag == '{DAV:}getlastmodified':
+            return escape(email.utils.formatdate(node.mtime, usegmt=True))
+        if tag == '{DAV:}resourcetype':
+            return '<d:collection/>' if node.is_dir else ''
+        if tag == '{DAV:}getetag':
+            return '&quot;%s&quot;' % node.etag
+        if tag == '{DAV:}getcontentlength' and not node.is_dir:
+            return str(len(node.data))
+        if tag == '{DAV:}getcontenttype' and not node.is_dir:
+            return escape(self._get_content_type(path))
+        if tag == '{DAV:}quota-used-bytes' and node.is_dir:
+            return str(node.get_size())
+        if tag == '{DAV:}quota-available-bytes' and node.is_dir:
+            return '-3'
+        if tag == '{%s}fileid' % NS_OC:
+            return str(node.fileid)
+        if tag == '{%s}id' % NS_OC:
+            return '%08iocstandin' % node.fileid
+        if tag == '{%s}size' % NS_OC:
+            return str(node.get_size())
+        if tag == '{%s}permissions' % NS_OC:
+            return 'RDNVCK' if node.is_dir else 'RDNVW'
+        if tag == '{%s}favorite' % NS_OC:
+            return '1' if node.favorite else '0'
+        if tag == '{%s}owner-id' % NS_OC:
+            return escape(context.user)
+        if tag == '{%s}owner-display-name' % NS_OC:
+            return escape(self.users[context.user]['displayname'])
+        if tag == '{%s}share-types' % NS_OC:
+            return ''
+        return None
+
+    @staticmethod
+    def _response(href, found, missing):
+        parts = ['<d:response><d:href>%s</d:href>' % escape(href)]
+        if found:
+            parts.append('<d:propstat><d:prop>')
+            for tag, value in found:
+                parts.append(_element(tag, value))
+            parts.append('</d:prop><d:status>HTTP/1.1 200 OK</d:status>'
+                         '</d:propstat>')
+        if missing:
+            parts.append('<d:propstat><d:prop>')
+            for tag in missing:
+                parts.append(_element(tag, None))
+            parts.append('</d:prop><d:status>HTTP/1.1 404 Not Found'
+                         '</d:status></d:propstat>')
+        parts.append('</d:response>')
+        return ''.join(parts)
+
+    @staticmethod
+    def _wrap_multistatus(responses):
+        return (
+            '<?xml version="1.0"?>'
+            '<d:multistatus xmlns:d="DAV:" xmlns:s="http://sabredav.org/ns" '
+            'xmlns:oc="http://owncloud.org/ns">' +
+            ''.join(responses) +
+            '</d:multistatus>'
+        )
+
+    @staticmethod
+    def _xml_response(status, text):
+        return status, {'Content-Type': 'application/xml; charset=utf-8'}, \
+            text.encode('utf-8')
+
+    @staticmethod
+    def _json(status, value):
+        return status, {'Content-Type': 'application/json; charset=utf-8'}, \
+            json.dumps(value).encode('utf-8')
+
+    @staticmethod
+    def _get_content_type(path):
+        return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    def _handle_zip(self, user, query):
+        path = self._normalize(query.get('dir', '/'))
+        node = self._lookup(self._roots[user], path)
+        if node is None or not node.is_dir:
+            return 404, {}, b''
+        buffer = io.BytesIO()
+        base = path.rsplit('/', 1)[0]
+        archive = zipfile.ZipFile(buffer, 'w')
+        for item_path, item in node.walk(path):
+            name = item_path[len(base):].lstrip('/')
+            if item.is_dir:
+                archive.writestr(name + '/', b'')
+            else:
+                archive.writestr(name, item.data)
+        archive.close()
+        return 200, {
+            'Content-Type': 'application/zip',
+            'Content-Disposition': 'attachment; filename="%s.zip"' %
+                                   (path.rsplit('/', 1)[-1] or 'download')
+        }, buffer.getvalue()
+
+    # OCS
+
+    @staticmethod
+    def _parse_form(body):
+        if not body:
+            return {}
+        return dict(parse.parse_qsl(body.decode('utf-8'),
+                                    keep_blank_values=True))
+
+    def _handle_ocs(self, user, method, path, query, form, version,
+                    json_format):
+        parts = [_unquote(part) for part in path.split('/')]
+        try:
+            if parts[0] == 'config':
+                data = self._ocs_config()
+            elif parts[0] == 'cloud':
+                data = self._ocs_cloud(user, method, parts[1:], query, form)
+            elif parts[:4] == ['apps', 'files_sharing', 'api', 'v1']:
+                data = self._ocs_sharing(user, method, parts[4:], query, form)
+            elif parts[0] == 'privatedata':
+                data = self._ocs_privatedata(user, method, parts[1:], form)
+            else:
+                raise _OCSError(998, 'Invalid query')
+            status_code, message = 100, 'OK'
+        except _OCSError as e:
+            status_code, message, data = e.status_code, e.message, []
+        return self._ocs_response(status_code, message, data, version,
+                                  json_format)
+
+    def _ocs_response(self, status_code, message, data, version,
+                      json_format):
+        http_status = 200
+        if version == 2:
+            if status_code == 100:
+                status_code = 200
+            elif status_code == 997:
+                http_status = 401
+            elif status_code == 998:
+                http_status = 404
+            elif status_code < 200 or status_code > 599:
+                http_status = 400
+            else:
+                http_status = status_code
+        meta = {
+            'status': 'ok' if status_code in (100, 200) else 'failure',
+            'statuscode': status_code,
+            'message': message
+        }
+        if json_format:
+            return self._json(http_status, {'ocs': {
+                'meta': meta,
+                'data': data
+            }})
+        text = '<?xml version="1.0"?><ocs><meta>' + \
+            '<status>%s</status><statuscode>%i</statuscode>' % (
+                meta['status'], status_code
+            ) + \
+            '<message>%s</message></meta>%s</ocs>' % (
+                escape(message or ''), _to_xml('data', data)
+            )
+        return self._xml_response(http_status, text)
+
+    def _ocs_config(self):
+        return {
+            'version': '1.7',
+            'website': 'ownCloud',
+            'host': self.host,
+            'contact': '',
+            'ssl': 'false'
+        }
+
+    def _ocs_cloud(self, user, method, parts, query, form):
+        if parts == ['capabilities'] and method == 'GET':
+            major, minor, micro = self.VERSION.split('.')
+            return {
+                'capabilities': {
+                    'core': {
+                        'pollinterval': 60,
+                        'webdav-root': 'remote.php/webdav'
+                    },
+                    'dav': {'chunking': self.chunking},
+                    'files': {'bigfilechunking': True},
+                    'files_sharing': {
+                        'api_enabled': True,
+                        'resharing': True
+                    }
+                },
+                'version': {
+                    'major': int(major),
+                    'minor': int(minor),
+                    'micro': int(micro),
+                    'string': self.VERSION,
+                    'edition': ''
+                }
+            }
+        if parts[0] == 'users':
+            return self._ocs_users(method, parts[1:], query, form)
+        if parts[0] == 'groups':
+            return self._ocs_groups(method, parts[1:], query, form)
+        if parts[0] == 'apps':
+            return self._ocs_apps(method, parts[1:], query)
+        raise _OCSError(998, 'Invalid query')
+
+    def _ocs_users(self, method, parts, query, form):
+        if not parts:
+            if method == 'GET':
+                search = query.get('search', '')
+                return {'users': sorted(
+                    name for name in self.users if search in name
+                )}
+            if method == 'POST':
+                name = form.get('userid')
+                if not name or not form.get('password'):
+                    raise _OCSError(101, 'Invalid input data')
+                if name in self.users:
+                    raise _OCSError(102, 'User already exists')
+                self.add_user(name, form['password'])
+                return []
+            raise _OCSError(998, 'Invalid query')
+
+        name = parts[0]
+        account = self.users.get(name)
+        if len(parts) == 1:
+            if method == 'GET':
+                if account is None:
+                    raise _OCSError(998, 'The requested user could not be '
+                                         'found')
+                used = self._roots[name].get_size()
+                return {
+                    'enabled': 'true',
+                    'quota': {
+                        'free': 10 ** 12 - used,
+                        'used': used,
+                        'total': 10 ** 12,
+                        'relative': round(100.0 * used / 10 ** 12, 2)
+                    },
+                    'email': account['email'],
+                    'displayname': account['displayname'],
+                    'two_factor_auth_enabled': 'false'
+                }
+            if method == 'PUT':
+                if account is None:
+                    raise _OCSError(997)
+                key, value = form.get('key'), form.get('value')
+                if key == 'email':
+                    if not _EMAIL.match(value or ''):
+                        raise _OCSError(102)
+                    account['email'] = value
+                elif key == 'password':
+                    account['password'] = value
+                elif key in ('display', 'displayname'):
+                    account['displayname'] = value
+                elif key == 'quota':
+                    account['quota'] = value
+                else:
+                    raise _OCSError(103)
+                return []
+            if method == 'DELETE':
+                if account is None:
+                    raise _OCSError(101)
+                del self.users[name]
+                del self._roots[name]
+                for members in self.groups.values():
+                    members.discard(name)
+                for share_id, share in list(self.shares.items()):
+                    if share['owner'] == name or share['share_with'] == name:
+                        del self.shares[share_id]
+                return []
+            raise _OCSError(998, 'Invalid query')
+
+        if parts[1] == 'groups':
+            if method == 'GET':
+                if account is None:
+                    raise _OCSError(998)
+                return {'groups': sorted(
+                    group for group, members in self.groups.items()
+                    if name in members
+                )}
+            group = form.get('groupid', '')
+            if not group:
+                raise _OCSError(101, 'Group id not given')
+            if group not in self.groups:
+                raise _OCSError(102, 'Group does not exist')
+            if account is None:
+                raise _OCSError(103, 'User does not exist')
+            if method == 'POST':
+                self.groups[group].add(name)
+            elif method == 'DELETE':
+                self.groups[group].discard(name)
+            else:
+                raise _OCSError(998, 'Invalid query')
+            return []
+
+        if parts[1] == 'subadmins':
+            if account is None:
+                raise _OCSError(101, 'User does not exist')
+            if method == 'GET':
+                return sorted(account['subadmin'])
+            group = form.get('groupid', '')
+            if group not in self.groups:
+                raise _OCSError(102, 'Group does not exist')
+            if method == 'POST':
+                if group in account['subadmin']:
+                    raise _OCSError(103, 'User is already a subadmin')
+                account['subadmin'].add(group)
+                return []
+            if method == 'DELETE':
+                account['subadmin'].discard(group)
+                return []
+        raise _OCSError(998, 'Invalid query')
+
+    def _ocs_groups(self, method, parts, query, form):
+        if not parts:
+            if method == 'GET':
+                search = query.get('search', '')
+                return {'groups': sorted(
+                    group for group in self.groups if search in group
+                )}
+            if method == 'POST':
+                group = form.get('groupid', '')
+                if not group:
+                    raise _OCSError(101, 'Invalid group name')
+                if group in self.groups:
+                    raise _OCSError(102, 'Group already exists')
+                self.groups[group] = set()
+                return []
+            raise _OCSError(998, 'Invalid query')
+
+        group = parts[0]
+        if group not in self.groups:
+            raise _OCSError(998 if method == 'GET' else 101,
+                            'The requested group could not be found')
+        if method == 'GET':
+            return {'users': sorted(self.groups[group])}
+        if method == 'DELETE':
+            del self.groups[group]
+            return []
+        raise _OCSError(998, 'Invalid query')
+
+    def _ocs_apps(self, method, parts, query):
+        if not parts and method == 'GET':
+            apps_filter = query.get('filter')
+            return {'apps': sorted(
+                app for app, enabled in self.apps.items()
+                if apps_filter is None
+                or enabled == (apps_filter == 'enabled')
+            )}
+        if len(parts) == 1 and method in ('POST', 'DELETE'):
+            self.apps[parts[0]] = method == 'POST'
+            return []
+        raise _OCSError(998, 'Invalid query')
+
+    def _ocs_sharing(self, user, method, parts, query, form):
+        if parts and parts[0] == 'remote_shares':
+            if method == 'GET' and parts[1:] == ['pending']:
+                return []
+            raise _OCSError(404, 'Wrong share ID, share doesn\'t exist')
+        if not parts or parts[0] != 'shares':
+            raise _OCSError(998, 'Invalid query')
+
+        if len(parts) == 1:
+            if method == 'GET':
+                return self._list_shares(user, query)
+            if method == 'POST':
+                return self._create_share(user, form)
+            raise _OCSError(998, 'Invalid query')
+
+        try:
+            share = self.shares.get(int(parts[1]))
+        except ValueError:
+            share = None
+        if share is None or share['owner'] != user:
+            raise _OCSError(404, 'Wrong share ID, share doesn\'t exist')
+        if method == 'GET':
+            return [self._share_data(share)]
+        if method == 'DELETE':
+            del self.shares[share['id']]
+            return []
+        if method == 'PUT':
+            return self._update_share(user, share, form)
+        raise _OCSError(998, 'Invalid query')
+
+    def _list_shares(self, user, query):
+        if query.get('shared_with_me') == 'true':
+            groups = set(group for group, members in self.groups.items()
+                         if user in members)
+            return [
+                self._share_data(share, recipient=True)
+                for share in self._sorted_shares()
+                if (share['share_type'] == SHARE_TYPE_USER
+                    and share['share_with'] == user)
+                or (share['share_type'] == SHARE_TYPE_GROUP
+                    and share['share_with'] in groups)
+            ]
+
+        path = query.get('path')
+        if path is None:
+            return [self._share_data(share)
+                    for share in self._sorted_shares()
+                    if share['owner'] == user]
+
+        path = self._normalize(path)
+        node = self._lookup(self._roots[user], path)
+        if node is None:
+            raise _OCSError(404, 'Wrong path, file/folder doesn\'t exist')
+        if query.get('subfiles') == 'true':
+            if not node.is_dir:
+                raise _OCSError(400, 'Not a directory')
+            prefix = path.rstrip('/') + '/'
+            return [
+                self._share_data(share) for share in self._sorted_shares()
+                if share['owner'] == user
+                and share['path'].startswith(prefix)
+                and '/' not in share['path'][len(prefix):]
+            ]
+        return [self._share_data(share) for share in self._sorted_shares()
+                if share['owner'] == user and share['path'] == path]
+
+    def _create_share(self, user, form):
+        path = self._normalize(form.get('path', ''))
+        node = self._lookup(self._roots[user], path)
+        if node is None or path == '/':
+            raise _OCSError(404, 'Wrong path, file/folder doesn\'t exist')
+        share_type = int(form.get('shareType', -1))
+        permissions = form.get('permissions')
+        share = {
+            'id': self._next_share_id,
+            'share_type': share_type,
+            'owner': user,
+            'path': path,
+            'is_dir': node.is_dir,
+            'fileid': node.fileid,
+            'stime': int(time.time()),
+            'share_with': None,
+            'token': None,
+            'password': None,
+            'name': None
+        }
+
+        if share_type in (SHARE_TYPE_USER, SHARE_TYPE_GROUP):
+            share_with = form.get('shareWith', '')
+            if share_type == SHARE_TYPE_USER and share_with not in self.users:
+                raise _OCSError(404, 'Please specify a valid user')
+            if share_type == SHARE_TYPE_GROUP and \
+                    share_with not in self.groups:
+                raise _OCSError(404, 'Please specify a valid group')
+            if share_with == user:
+                raise _OCSError(400, 'Can\'t share with yourself')
+            share['share_with'] = share_with
+            share['permissions'] = int(permissions or PERMISSION_ALL)
+            if not node.is_dir:
+                share['permissions'] &= ~(PERMISSION_CREATE |
+                                          PERMISSION_DELETE)
+        elif share_type == SHARE_TYPE_LINK:
+            share['token'] = uuid.uuid4().hex[:15]
+            share['password'] = form.get('password') or None
+            share['name'] = form.get('name')
+            share['permissions'] = self._get_link_permissions(
+                node, permissions, form.get('publicUpload')
+            )
+        else:
+            raise _OCSError(403, 'Unknown share type')
+
+        self._next_share_id += 1
+        self.shares[share['id']] = share
+        return self._share_data(share)
+
+    def _update_share(self, user, share, form):
+        node = self._lookup(self._roots[user], share['path'])
+        if share['share_type'] == SHARE_TYPE_LINK:
+            if 'publicUpload' in form and not node.is_dir:
+                raise _OCSError(400, 'public upload is only possible for '
+                                     'public shared folders')
+            if 'permissions' in form or 'publicUpload' in form:
+                share['permissions'] = self._get_link_permissions(
+                    node, form.get('permissions'), form.get('publicUpload')
+                )
+            if 'password' in form:
+                share['password'] = form['password'] or None
+            if 'name' in form:
+                share['name'] = form['name']
+        elif 'permissions' in form:
+            share['permissions'] = int(form['permissions'])
+        return self._share_data(share)
+
+    @staticmethod
+    def _get_link_permissions(node, permissions, public_upload):
+        if not node.is_dir:
+            return PERMISSION_READ
+        if public_upload == 'true':
+            return PERMISSION_READ | PERMISSION_UPDATE | \
+                PERMISSION_CREATE | PERMISSION_DELETE
+        if permissions:
+            return int(permissions) & ~PERMISSION_SHARE
+        return PERMISSION_READ
+
+    def _sorted_shares(self):
+        return [self.shares[share_id] for share_id in sorted(self.shares)]
+
+    def _share_data(self, share, recipient=False):
+        owner = share['owner']
+        name = share['path'].rsplit('/', 1)[-1]
+        data = {
+            'id': share['id'],
+            'share_type': share['share_type'],
+            'uid_owner': owner,
+            'displayname_owner': self.users[owner]['displayname'],
+            'permissions': share['permissions'],
+            'stime': share['stime'],
+            'parent': None,
+            'expiration': None,
+            'token': share['token'],
+            'uid_file_owner': owner,
+            'displayname_file_owner': self.users[owner]['displayname'],
+            'path': '/' + name if recipient else share['path'],
+            'item_type': 'folder' if share['is_dir'] else 'file',
+            'mimetype': 'httpd/unix-directory' if share['is_dir']
+            else self._get_content_type(name),
+            'storage_id': 'home::' + owner,
+            'storage': 1,
+            'item_source': share['fileid'],
+            'file_source': share['fileid'],
+            'file_parent': 1,
+            'file_target': '/' + name,
+            'share_with': share['share_with'],
+            'share_with_displayname': share['share_with'],
+            'name': share['name'],
+            'mail_send': 0
+        }
+        if share['share_type'] == SHARE_TYPE_LINK:
+            data['url'] = self.url + 'index.php/s/' + share['token']
+            if share['password']:
+                data['share_with'] = '***redacted***'
+                data['share_with_displayname'] = '***redacted***'
+        return data
+
+    def _remove_shares(self, user, path):
+        for share_id, share in list(self.shares.items()):
+            if share['owner'] == user and (
+                    share['path'] == path or
+                    share['path'].startswith(path + '/')):
+                del self.shares[share_id]
+
+    def _move_shares(self, user, source, target):
+        for share in self.shares.values():
+            if share['owner'] != user:
+                continue
+            if share['path'] == source:
+                share['path'] = target
+            elif share['path'].startswith(source + '/'):
+                share['path'] = target + share['path'][len(source):]
+
+    def _ocs_privatedata(self, user, method, parts, form):
+        action = parts[0] if parts else ''
+        if action == 'getattribute' and method == 'GET':
+            app = parts[1] if len(parts) > 1 else None
+            key = parts[2] if len(parts) > 2 else None
+            return [
+                {'key': attr_key, 'app': attr_app, 'value': value}
+                for (attr_user, attr_app, attr_key), value
+                in sorted(self.attributes.items())
+                if attr_user == user
+                and app in (None, attr_app) and key in (None, attr_key)
+            ]
+        if len(parts) != 3 or method != 'POST':
+            raise _OCSError(998, 'Invalid query')
+        if action == 'setattribute':
+            self.attributes[(user, parts[1], parts[2])] = \
+                form.get('value', '')
+            return []
+        if action == 'deleteattribute':
+            self.attributes.pop((user, parts[1], parts[2]), None)
+            return []
+        raise _OCSError(998, 'Invalid query')
+
+
+def _quote(path):
+    if isinstance(path, six.text_type):
+        path = path.encode('utf-8')
+    return parse.quote(path)
+
+
+def _unquote(path):
+    path = parse.unquote(path)
+    if six.PY2 and isinstance(path, str):
+        path = path.decode('utf-8')
+    return path
+
+
+def _element(tag, value):
+    """Returns a WebDAV property element as XML string
+
+    :param tag: tag in "{namespace}name" notation
+    :param value: XML content or None for an empty element
+    """
+    namespace, _, name = tag[1:].partition('}')
+    prefix = _NAMESPACE_PREFIXES.get(namespace)
+    declaration = ''
+    if prefix is None:
+        prefix = 'x'
+        declaration = ' xmlns:x="%s"' % escape(namespace, {'"': '&quot;'})
+    if not value:
+        return '<%s:%s%s/>' % (prefix, name, declaration)
+    return '<%s:%s%s>%s</%s:%s>' % (
+        prefix, name, declaration, value, prefix, name
+    )
+
+
+def _to_xml(tag, value):
+    """Serializes an OCS data value: dictionaries become child elements,
+    lists "element" children and booleans "1" or ""
+    """
+    if value is None or value is False or value == [] or value == {}:
+        return '<%s/>' % tag
+    if isinstance(value, dict):
+        return '<%s>%s</%s>' % (
+            tag, ''.join(_to_xml(key, child) for key, child in value.items()),
+            tag
+        )
+    if isinstance(value, (list, tuple)):
+        return '<%s>%s</%s>' % (
+            tag, ''.join(_to_xml('element', child) for child in value), tag
+        )
+    if value is True:
+        value = '1'
+    return '<%s>%s</%s>' % (tag, escape(six.text_type(value)), tag)
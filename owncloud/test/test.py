@@ -4,16 +4,44 @@
 import unittest
 from unittest_data_provider import data_provider
 import os
+import json
+import gzip
+import pickle
+import logging
 import shutil
 import owncloud
+import owncloud.indexer
+import owncloud.loadgen
+import owncloud.metrics
+import owncloud.replay
+import owncloud.tracing
+from owncloud.test.server import Conditions, StandInServer
+import requests
 import datetime
 import time
 import tempfile
+import threading
 import random
+import sys
+import warnings
 import six
+import xml.etree.ElementTree as ET
+
+try:
+    import asyncio
+    import owncloud.aio
+except (ImportError, SyntaxError):
+    asyncio = None
 
 from config import Config
 
+if Config['owncloud_url'] is None:
+    # no server configured, run against the in-process stand-in
+    standin_server = StandInServer({
+        Config['owncloud_login']: Config['owncloud_password']
+    }).start()
+    Config['owncloud_url'] = standin_server.url
+
 def getSupportedDavVersion():
     # connect just to check supported DAV version
     client = owncloud.Client(Config['owncloud_url'])
@@ -205,6 +233,55 @@ class TestFileAccess(unittest.TestCase):
         self.assertIsNotNone(dir_info.attributes['{http://owncloud.org/ns}owner-id'])
         self.assertIsNotNone(dir_info.attributes['{http://owncloud.org/ns}owner-display-name'])
 
+    def test_get_file_info_many(self):
+        """Test getting the file info of many paths at once"""
+        self.assertTrue(self.client.mkdir(self.test_root + 'subdir'))
+        paths = []
+        for i in range(4):
+            paths.append(self.test_root + 'subdir/file%i.txt' % i)
+            self.assertTrue(self.client.put_file_contents(paths[-1], 'x' * i))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'single.txt', 'single'))
+        paths.append(self.test_root + 'single.txt')
+        paths.append(self.test_root + 'subdir/unexist.txt')
+        paths.append(self.test_root + 'unexist/file.txt')
+        paths.append(self.test_root + 'subdir')
+
+        infos = self.client.file_info_many(paths)
+        self.assertEqual(len(infos), len(paths))
+        for i in range(4):
+            info = infos[self.test_root + 'subdir/file%i.txt' % i]
+            self.assertEqual(info.get_name(), 'file%i.txt' % i)
+            self.assertEqual(info.get_size(), i)
+        self.assertEqual(infos[self.test_root + 'single.txt'].get_size(), 6)
+        self.assertIsNone(infos[self.test_root + 'subdir/unexist.txt'])
+        self.assertIsNone(infos[self.test_root + 'unexist/file.txt'])
+        self.assertTrue(infos[self.test_root + 'subdir'].is_dir())
+
+    def test_get_file_info_many_large_directory(self):
+        """Test that a few paths of a large directory are not listed"""
+        self.assertTrue(self.client.mkdir(self.test_root + 'subdir'))
+        paths = []
+        for i in range(10):
+            paths.append(self.test_root + 'subdir/file%i.txt' % i)
+            self.assertTrue(self.client.put_file_contents(paths[-1], 'x'))
+
+        events = []
+        self.client.add_event_hook(events.append)
+        # the size of the directory is not known yet
+        infos = self.client.file_info_many(paths[:3], sibling_ratio=0.5)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(infos[paths[0]].get_name(), 'file0.txt')
+
+        del events[:]
+        infos = self.client.file_info_many(paths[:3], sibling_ratio=0.5)
+        self.assertEqual(len(events), 3)
+        self.assertEqual(infos[paths[0]].get_name(), 'file0.txt')
+
+        del events[:]
+        infos = self.client.file_info_many(paths[:5], sibling_ratio=0.5)
+        self.assertEqual(len(events), 1)
+        self.client.remove_event_hook(events.append)
+
     def test_get_file_info_non_existing(self):
         """Test getting file info for non existing file"""
         with self.assertRaises(owncloud.ResponseError) as e:
@@ -276,6 +353,105 @@ class TestFileAccess(unittest.TestCase):
             self.assertIsNotNone(listing[i].attributes['{http://owncloud.org/ns}owner-display-name'])
 
 
+    def test_get_file_listing_with_profile(self):
+        """Test getting file listing with a named property profile"""
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'file one.txt', 'first file'))
+        self.assertTrue(self.client.mkdir(self.test_root + 'subdir'))
+
+        listing = self.client.list(self.test_root, properties='sync')
+        self.assertEqual(len(listing), 2)
+        self.assertEqual(listing[0].get_name(), 'file one.txt')
+        self.assertEqual(listing[0].get_size(), 10)
+        self.assertIsNotNone(listing[0].get_etag())
+        self.assertTrue(type(listing[0].get_last_modified()) is datetime.datetime)
+        self.assertNotIn('{http://owncloud.org/ns}permissions', listing[0].attributes)
+        self.assertTrue(listing[1].is_dir())
+
+        listing = self.client.list(self.test_root, properties='names')
+        self.assertEqual([f.get_name() for f in listing], ['file one.txt', 'subdir'])
+        self.assertNotIn('{DAV:}getetag', listing[0].attributes)
+
+        file_info = self.client.file_info(self.test_root + 'file one.txt', 'full')
+        self.assertEqual(file_info.get_size(), 10)
+
+        with self.assertRaises(ValueError):
+            self.client.list(self.test_root, properties='unknown')
+
+    def test_request_body_cache_size(self):
+        """Test that the cache of request bodies does not grow without limit"""
+        for i in range(owncloud.owncloud._MAX_DAV_PROPS + 10):
+            self.client._get_propfind_body(['d:getetag', 'oc:prop%i' % i])
+        self.assertLessEqual(len(owncloud.owncloud._DAV_PROPS), owncloud.owncloud._MAX_DAV_PROPS)
+        body = ET.fromstring(self.client._get_propfind_body(['d:getetag', 'oc:prop1']))
+        self.assertEqual([p.tag for p in body.find('{DAV:}prop')],
+                         ['{DAV:}getetag', '{http://owncloud.org/ns}prop1'])
+
+    def test_filter_files_favorite(self):
+        """Test server side filtering of favorite files"""
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'fav.txt', b'fav'))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'other.txt', b'other'))
+        self.client._make_dav_request(
+            'PROPPATCH',
+            self.test_root + 'fav.txt',
+            data='<d:propertyupdate xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns">'
+                 '<d:set><d:prop><oc:favorite>1</oc:favorite></d:prop></d:set>'
+                 '</d:propertyupdate>'
+        )
+
+        files = self.client.filter_files(self.test_root, favorite=True)
+        self.assertEqual(len(files), 1)
+        self.assertEqual(files[0].get_name(), 'fav.txt')
+        self.assertEqual(files[0].attributes['{http://owncloud.org/ns}favorite'], '1')
+
+    def test_filter_files_systemtag(self):
+        """Test filtering files by system tags"""
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'tagged.txt', b'tag'))
+        body = ET.fromstring(self.client._get_filter_files_body(True, [1, 2], None))
+        rules = body.find('{http://owncloud.org/ns}filter-rules')
+        self.assertEqual([(rule.tag, rule.text) for rule in rules], [
+            ('{http://owncloud.org/ns}favorite', '1'),
+            ('{http://owncloud.org/ns}systemtag', '1'),
+            ('{http://owncloud.org/ns}systemtag', '2')
+        ])
+        # no file is tagged
+        self.assertEqual(self.client.filter_files(self.test_root, systemtag=1), [])
+        self.assertEqual(self.client.filter_files(self.test_root, systemtag=[1, 2]), [])
+
+    def test_filter_files_without_criteria(self):
+        """Test that filtering files needs a filter rule"""
+        with self.assertRaises(ValueError):
+            self.client.filter_files(self.test_root)
+        with self.assertRaises(ValueError):
+            self.client.filter_files(self.test_root, favorite=False)
+        with self.assertRaises(ValueError):
+            self.client.filter_files(self.test_root, systemtag=[])
+
+    def test_filter_files_empty_rules(self):
+        """Test that the server rejects a filter-files REPORT without rules"""
+        with self.assertRaises(owncloud.HTTPResponseError) as e:
+            self.client._make_dav_request(
+                'REPORT',
+                self.test_root,
+                data='<oc:filter-files xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns">'
+                     '<d:prop><d:getetag/></d:prop><oc:filter-rules/>'
+                     '</oc:filter-files>'
+            )
+        self.assertEqual(e.exception.status_code, 400)
+
+    def test_search_files(self):
+        """Test searching files by name"""
+        for name in ['searchme-1.txt', 'searchme-2.txt', 'SearchMe-3.txt', 'other.txt']:
+            self.assertTrue(self.client.put_file_contents(self.test_root + name, b'x'))
+
+        files = self.client.search_files('searchme')
+        self.assertEqual(
+            sorted(f.get_name() for f in files),
+            ['SearchMe-3.txt', 'searchme-1.txt', 'searchme-2.txt']
+        )
+        self.assertIsNotNone(files[0].attributes['{http://owncloud.org/ns}fileid'])
+        self.assertEqual(len(self.client.search_files('searchme', limit=2)), 2)
+        self.assertEqual(self.client.search_files('nomatch-pattern'), [])
+
     def test_get_file_listing_non_existing(self):
         """Test getting file listing for non existing directory"""
         with self.assertRaises(owncloud.ResponseError) as e:
@@ -754,6 +930,37 @@ class TestFileAccess(unittest.TestCase):
 
         self.assertTrue(self.client.delete(path))
 
+    def test_share_with_user_debug(self):
+        """Test sharing a file to user with debug output enabled"""
+
+        path = self.test_root + 'debug.txt'
+        self.assertTrue(self.client.put_file_contents(path, 'hello world!'))
+
+        # debug output is enabled for the whole process, restore it after
+        logger = logging.getLogger('owncloud')
+        level = logger.level
+        handlers = list(logger.handlers)
+        stdout = sys.stdout
+        sys.stdout = six.StringIO()
+        try:
+            client = owncloud.Client(Config['owncloud_url'], debug=True)
+            client.login(Config['owncloud_login'], Config['owncloud_password'])
+            share_info = client.share_file_with_user(path, self.share2user)
+            client.logout()
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+            logger.setLevel(level)
+            for handler in list(logger.handlers):
+                if handler not in handlers:
+                    logger.removeHandler(handler)
+
+        self.assertTrue(isinstance(share_info, owncloud.ShareInfo))
+        self.assertEqual(share_info.get_path(), path)
+        self.assertIn('share_file request for file %s' % path, output)
+
+        self.assertTrue(self.client.delete(path))
+
     @data_provider(files)
     def test_share_with_group(self, file_name):
         """Test sharing a file to a group"""
@@ -1252,6 +1459,70 @@ class TestGetConfig(unittest.TestCase):
         self.client.logout()
 
 
+class TestCapabilitiesCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir=os.getcwd())
+        self.cache = owncloud.CapabilitiesCache(
+            os.path.join(self.temp_dir, 'capabilities.json')
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def login(self, **kwargs):
+        client = owncloud.Client(Config['owncloud_url'], capabilities_cache=self.cache, **kwargs)
+        client.login(Config['owncloud_login'], Config['owncloud_password'])
+        return client
+
+    def test_login_from_cache(self):
+        """Test that the capabilities are fetched once and then read from the cache"""
+        client = self.login()
+        self.assertIsNotNone(self.cache.get(client.url))
+        client.logout()
+
+        client = self.login()
+        self.assertEqual(client.get_pool_stats()['requests'], 0)
+        self.assertEqual(client.get_version(), self.cache.get(client.url)['version'])
+        self.assertIn('core', client.get_capabilities())
+        self.assertIsNotNone(client.file_info('/'))
+        client.logout()
+
+    def test_expired_entry(self):
+        self.login().logout()
+        self.cache.ttl = -1
+        self.assertIsNone(self.cache.get(Config['owncloud_url']))
+
+    def test_concurrent_updates(self):
+        """Test that concurrent updates of the cache keep all entries"""
+        def update(index):
+            cache = owncloud.CapabilitiesCache(self.cache.path)
+            for i in range(20):
+                cache.set('http://server%i-%i/' % (index, i), {}, '10.0')
+
+        threads = [threading.Thread(target=update, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for index in range(4):
+            for i in range(20):
+                self.assertIsNotNone(self.cache.get('http://server%i-%i/' % (index, i)))
+        # no temporary files are left behind
+        self.assertEqual(
+            [name for name in os.listdir(self.temp_dir) if not name.startswith('capabilities.json')],
+            []
+        )
+
+    def test_lazy_login(self):
+        """Test that a lazy login fetches the capabilities on demand"""
+        client = self.login(lazy_login=True)
+        self.assertEqual(client.get_pool_stats()['requests'], 0)
+        self.assertIsNotNone(client.file_info('/'))
+        self.assertIsNotNone(self.cache.get(client.url))
+        client.logout()
+
+
 class TestLogin(unittest.TestCase):
 
     def setUp(self):
@@ -1263,10 +1534,155 @@ class TestLogin(unittest.TestCase):
         self.assertEqual(e.exception.status_code, 401)
         self.client.login(Config['owncloud_login'], Config['owncloud_password'])
 
+    def test_reuse_session(self):
+        """Test that the credentials are only sent until a session exists"""
+        self.client = owncloud.Client(Config['owncloud_url'], reuse_session=True)
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+        self.assertTrue(self.client._session_established)
+        self.assertIsNotNone(self.client.file_info('/'))
+        self.assertIsNotNone(self.client.get_config())
+
+        # an expired session falls back to the credentials
+        self.client._transport.clear_cookies()
+        self.assertIsNotNone(self.client.file_info('/'))
+        self.assertTrue(self.client._session_established)
+
+    def tearDown(self):
+        self.client.logout()
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.client = owncloud.Client(
+            Config['owncloud_url'],
+            pool_maxsize=2,
+            pool_block=True
+        )
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+
+    def test_connections_reused(self):
+        """Test that sequential requests reuse the pooled connection"""
+        for i in range(5):
+            self.assertIsNotNone(self.client.file_info('/'))
+        stats = self.client.get_pool_stats()
+        self.assertEqual(stats['pools'], 1)
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['connections_reused'], stats['requests'] - 1)
+
+    def test_no_keep_alive(self):
+        """Test that connections are not reused without keep alive"""
+        client = owncloud.Client(Config['owncloud_url'], keep_alive=False)
+        client.login(Config['owncloud_login'], Config['owncloud_password'])
+        self.assertIsNotNone(client.file_info('/'))
+        stats = client.get_pool_stats()
+        self.assertEqual(stats['connections_created'], stats['requests'])
+        client.logout()
+
     def tearDown(self):
         self.client.logout()
 
 
+class FailingAdapter(requests.adapters.BaseAdapter):
+    """Answers the first requests with a 503 error, then sends the
+    requests through another adapter"""
+
+    def __init__(self, adapter, failures, retry_after):
+        super(FailingAdapter, self).__init__()
+        self.adapter = adapter
+        self.failures = failures
+        self.retry_after = retry_after
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        if self.failures > 0:
+            self.failures -= 1
+            res = requests.Response()
+            res.status_code = 503
+            res.headers['Retry-After'] = self.retry_after
+            res.request = request
+            res.url = request.url
+            res._content = b''
+            return res
+        return self.adapter.send(request, **kwargs)
+
+    def close(self):
+        self.adapter.close()
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def response(self, status_code, retry_after=None):
+        res = requests.Response()
+        res.status_code = status_code
+        if retry_after is not None:
+            res.headers['Retry-After'] = retry_after
+        return res
+
+    def test_retryable_methods(self):
+        policy = owncloud.RetryPolicy()
+        self.assertTrue(policy.is_retryable('PROPFIND'))
+        self.assertTrue(policy.is_retryable('put'))
+        self.assertFalse(policy.is_retryable('POST'))
+        self.assertFalse(policy.is_retryable('MOVE'))
+
+    def test_exponential_backoff(self):
+        policy = owncloud.RetryPolicy(max_retries=3, backoff_factor=1, jitter=False)
+        self.assertEqual(policy.get_retry_delay(0, self.response(503)), 1)
+        self.assertEqual(policy.get_retry_delay(2, self.response(429)), 4)
+        self.assertIsNone(policy.get_retry_delay(3, self.response(503)))
+        self.assertIsNone(policy.get_retry_delay(0, self.response(404)))
+        self.assertEqual(policy.get_retry_delay(1, error=requests.exceptions.ConnectionError()), 2)
+
+        policy = owncloud.RetryPolicy(backoff_factor=1)
+        delay = policy.get_retry_delay(2, self.response(503))
+        self.assertTrue(0 <= delay <= 4)
+
+    def test_retry_after(self):
+        policy = owncloud.RetryPolicy(max_backoff=30)
+        self.assertEqual(policy.get_retry_delay(0, self.response(503, '7')), 7)
+        self.assertEqual(policy.get_retry_delay(0, self.response(503, '120')), 30)
+        self.assertEqual(policy.get_retry_delay(0, self.response(503, 'Wed, 21 Oct 2015 07:28:00 GMT')), 0)
+
+    def test_budget(self):
+        policy = owncloud.RetryPolicy(budget_ratio=0.5, budget_size=2)
+        self.assertTrue(policy.acquire('GET dav'))
+        self.assertTrue(policy.acquire('GET dav'))
+        self.assertFalse(policy.acquire('GET dav'))
+        policy.on_request()
+        policy.on_request()
+        self.assertTrue(policy.acquire('PUT dav'))
+        stats = policy.get_stats()
+        self.assertEqual(stats['retries'], {'GET dav': 2, 'PUT dav': 1})
+        self.assertEqual(stats['budget_exhausted'], 1)
+
+    def test_retried_request(self):
+        """Test that a request failing with 503 is sent again, after at
+        most max_backoff seconds when Retry-After is longer"""
+        policy = owncloud.RetryPolicy(max_backoff=0.1, jitter=False)
+        client = owncloud.Client(Config['owncloud_url'], retry_policy=policy)
+        client.login(Config['owncloud_login'], Config['owncloud_password'])
+        transport = client._transport
+        adapter = FailingAdapter(transport.adapter, 2, '120')
+        transport.session.mount('http://', adapter)
+        transport.session.mount('https://', adapter)
+
+        start = time.time()
+        self.assertTrue(client.file_info('/').is_dir())
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(adapter.sent, 3)
+        self.assertEqual(policy.get_stats()['retries'], {'PROPFIND dav': 2})
+
+        # MKCOL is not idempotent
+        adapter.failures = 1
+        with self.assertRaises(owncloud.HTTPResponseError) as e:
+            client.mkdir('/' + Config['test_root'].strip('/') + '-retry/')
+        self.assertEqual(e.exception.status_code, 503)
+        self.assertEqual(adapter.sent, 4)
+        client.logout()
+
+
 class TestOCSRequest(unittest.TestCase):
 
     def setUp(self):
@@ -1297,9 +1713,749 @@ class TestOCSRequest(unittest.TestCase):
             )
         self.assertEqual(e.exception.status_code, 100)
 
+    def test_make_request_transport_arguments(self):
+        """Test passing request arguments to the transport"""
+        res = self.client.make_ocs_request(
+            'GET',
+            'cloud',
+            'users',
+            params={'search': Config['owncloud_login']},
+            timeout=5
+        )
+        users = [x.text for x in res.ocs.data.findall('users/element')]
+        self.assertIn(Config['owncloud_login'], users)
+
+    def test_make_request_parsed_response(self):
+        res = self.client.make_ocs_request('GET', '', 'config')
+        self.assertIsInstance(res.ocs, owncloud.OCSResponse)
+        self.assertEqual(res.ocs.status_code, 100)
+        self.assertIsNotNone(res.ocs.data.find('version'))
+
+    def ocs_options():
+        return (
+            ['xml', 1],
+            ['json', 1],
+            ['xml', 2],
+            ['json', 2]
+        )
+
+    @data_provider(ocs_options)
+    def test_ocs_format_and_version(self, ocs_format, ocs_version):
+        client = owncloud.Client(
+            Config['owncloud_url'],
+            ocs_format=ocs_format,
+            ocs_version=ocs_version
+        )
+        client.login(Config['owncloud_login'], Config['owncloud_password'])
+        res = client.make_ocs_request('GET', '', 'config')
+        self.assertEqual(res.ocs.status_code, 100)
+        self.assertIsNotNone(res.ocs.data.find('version').text)
+        self.assertEqual(
+            dict(client.get_config()),
+            dict(self.client.get_config())
+        )
+        self.assertTrue(client.user_exists(Config['owncloud_login']))
+        client.logout()
+
+    @data_provider(ocs_options)
+    def test_ocs_format_shares_and_capabilities(self, ocs_format, ocs_version):
+        """Test that shares and capabilities read the same in all formats"""
+        client = owncloud.Client(
+            Config['owncloud_url'],
+            ocs_format=ocs_format,
+            ocs_version=ocs_version
+        )
+        client.login(Config['owncloud_login'], Config['owncloud_password'])
+        self.assertEqual(client.get_capabilities(), self.client.get_capabilities())
+        self.assertEqual(client.get_version(), self.client.get_version())
+
+        test_root = '/' + Config['test_root'].strip('/') + '/'
+        path = test_root + 'ocs_format.txt'
+        self.client.mkdir(test_root)
+        try:
+            self.client.put_file_contents(path, b'hello')
+            share = client.share_file_with_link(path)
+            self.assertIsInstance(share.get_id(), int)
+            self.assertIsNotNone(share.get_token())
+            shares = client.get_shares(path)
+            expected = self.client.get_shares(path)
+            self.assertEqual(
+                [s.share_info for s in shares],
+                [s.share_info for s in expected]
+            )
+            self.assertEqual(
+                client.get_share(share.get_id()).share_info,
+                self.client.get_share(share.get_id()).share_info
+            )
+        finally:
+            self.client.delete(test_root)
+        client.logout()
+
+    def test_invalid_ocs_options(self):
+        with self.assertRaises(ValueError):
+            owncloud.Client(Config['owncloud_url'], ocs_format='yaml')
+        with self.assertRaises(ValueError):
+            owncloud.Client(Config['owncloud_url'], ocs_version=3)
+
+    def tearDown(self):
+        self.client.logout()
+
+class TestEventHooks(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.metrics = owncloud.metrics.MetricsCollector()
+        self.client = owncloud.Client(
+            Config['owncloud_url'],
+            event_hooks=[self.events.append, self.metrics]
+        )
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+        self.test_root = Config['test_root']
+        if not self.test_root[-1] == '/':
+            self.test_root += '/'
+        if not self.test_root[0] == '/':
+            self.test_root = '/' + self.test_root
+        self.client.mkdir(self.test_root)
+
+    def test_events(self):
+        del self.events[:]
+        self.client.put_file_contents(self.test_root + 'hooks.txt', b'hello')
+        self.client.get_file_contents(self.test_root + 'hooks.txt')
+        self.client.get_config()
+
+        self.assertEqual(len(self.events), 3)
+        put, get, ocs = self.events
+        self.assertEqual(put.operation, 'PUT dav')
+        self.assertEqual(put.endpoint_class, 'dav')
+        self.assertEqual(put.bytes_sent, 5)
+        self.assertIn(put.status_code, [201, 204])
+        self.assertEqual(get.bytes_received, 5)
+        self.assertEqual(get.status_code, 200)
+        self.assertEqual(ocs.endpoint_class, 'ocs')
+        self.assertEqual(ocs.retries, 0)
+        for event in self.events:
+            self.assertIsNone(event.error)
+            self.assertGreaterEqual(event.timings['total'],
+                                    event.timings['ttfb'])
+            self.assertGreaterEqual(event.timings['connect'], 0)
+
+        self.client.remove_event_hook(self.events.append)
+        self.client.get_config()
+        self.assertEqual(len(self.events), 3)
+
+    def test_metrics(self):
+        self.metrics.reset()
+        for _ in range(3):
+            self.client.file_info(self.test_root)
+        stats = self.metrics.get_stats()['PROPFIND dav']
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['status_codes'], {207: 3})
+        self.assertLessEqual(stats['p50'], stats['p99'])
+
+        text = self.metrics.to_prometheus()
+        self.assertIn('# TYPE owncloud_request_duration_seconds histogram',
+                      text)
+        self.assertIn(
+            'owncloud_request_duration_seconds_count'
+            '{method="PROPFIND",endpoint="dav"} 3', text
+        )
+        self.assertIn(
+            'owncloud_requests_total'
+            '{method="PROPFIND",endpoint="dav",status="207"} 3', text
+        )
+
+        server = self.metrics.serve(0, '127.0.0.1')
+        try:
+            res = requests.get('http://127.0.0.1:%i/' % server.server_address[1])
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('owncloud_requests_total', res.text)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_track(self):
+        """Test recording requests by client method"""
+        path_a = self.test_root + 'a.txt'
+        path_b = self.test_root + 'b.txt'
+        self.client.put_file_contents(path_a, b'a')
+        self.client.put_file_contents(path_b, b'b')
+        with self.client.track() as tracker:
+            self.client.file_info(path_a)
+            self.client.file_info(path_b)
+            self.client.is_shared(path_a)
+            self.client.file_info_many([path_a, path_b], sibling_threshold=3)
+        self.client.file_info(path_a)
+
+        stats = tracker.get_stats()
+        self.assertEqual(stats['file_info']['calls'], 2)
+        self.assertEqual(stats['file_info']['requests'], 2)
+        self.assertEqual(stats['file_info']['operations'], {'PROPFIND dav': 2})
+        # file_info() calls made by is_shared() are counted for is_shared
+        self.assertEqual(stats['is_shared']['calls'], 1)
+        self.assertEqual(
+            stats['is_shared']['operations'],
+            {'PROPFIND dav': 1, 'GET ocs/apps/files_sharing/api/v1': 1}
+        )
+        # requests of the worker threads are counted for file_info_many
+        self.assertEqual(stats['file_info_many']['requests'], 2)
+        self.assertNotIn(owncloud.RequestTracker.UNKNOWN, stats)
+        self.assertEqual(tracker.requests, 6)
+
+    def test_track_invocations(self):
+        """Test that the tracker tells consecutive invocations apart
+        without keeping their variables alive
+        """
+        data = b'x' * 1000
+        refs = sys.getrefcount(data)
+        with self.client.track() as tracker:
+            for index in range(5):
+                self.client.put_file_contents(self.test_root + 'loop.txt', data)
+            # the data of the last invocation is released once it returned
+            self.assertEqual(sys.getrefcount(data), refs)
+        self.assertEqual(tracker.get_stats()['put_file_contents']['calls'], 5)
+
+    def tearDown(self):
+        self.client.delete(self.test_root)
+        self.client.logout()
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='pyocclient_test')
+        self.tracer = owncloud.tracing.Tracer()
+        self.client = owncloud.Client(
+            Config['owncloud_url'],
+            tracer=self.tracer
+        )
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+        self.test_root = Config['test_root']
+        if not self.test_root[-1] == '/':
+            self.test_root += '/'
+        if not self.test_root[0] == '/':
+            self.test_root = '/' + self.test_root
+        self.client.mkdir(self.test_root)
+
+    def test_chrome_trace(self):
+        local_file = os.path.join(self.temp_dir, 'chunks.dat')
+        with open(local_file, 'wb') as f:
+            f.write(b'x' * 2500)
+        self.tracer.clear()
+        self.client.put_file(self.test_root, local_file, chunk_size=1000)
+        self.client.list(self.test_root)
+        self.client.get_config()
+
+        trace_file = os.path.join(self.temp_dir, 'trace.json')
+        self.tracer.export(trace_file)
+        with open(trace_file, 'r') as f:
+            trace = json.load(f)
+
+        spans = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+        names = [span['name'] for span in spans]
+        self.assertEqual(names.count('read chunk'), 3)
+        self.assertEqual(names.count('upload chunk'), 3)
+        self.assertEqual(names.count('PUT dav'), 3)
+        self.assertIn('PROPFIND dav', names)
+        self.assertIn('parse XML', names)
+        self.assertIn('build FileInfo', names)
+        self.assertIn('OCS GET', names)
+        self.assertIn('parse OCS', names)
+
+        thread_ids = set(span['tid'] for span in spans)
+        named_threads = set(
+            e['tid'] for e in trace['traceEvents'] if e['ph'] == 'M'
+        )
+        self.assertEqual(thread_ids, named_threads)
+
+        # request spans are nested in the span of their chunk
+        upload = [s for s in spans if s['name'] == 'upload chunk'][0]
+        put = [s for s in spans if s['name'] == 'PUT dav'][0]
+        self.assertGreaterEqual(put['ts'], upload['ts'])
+        self.assertLessEqual(put['ts'] + put['dur'],
+                             upload['ts'] + upload['dur'])
+        self.assertEqual(upload['args']['size'], 1000)
+
+    def test_pool_wait(self):
+        """Test recording the wait for a free connection of the pool"""
+        client = owncloud.Client(
+            Config['owncloud_url'],
+            tracer=self.tracer,
+            pool_maxsize=1,
+            pool_block=True
+        )
+        client.login(Config['owncloud_login'], Config['owncloud_password'])
+        # a streamed response holds the only connection until it is closed
+        res = client._transport.request('GET', client.url, stream=True)
+        self.tracer.clear()
+        thread = threading.Thread(
+            target=client.file_info, args=(self.test_root,)
+        )
+        thread.start()
+        time.sleep(0.2)
+        res.close()
+        thread.join()
+        client.logout()
+
+        spans = [
+            e for e in self.tracer.to_chrome_trace()['traceEvents']
+            if e['name'] == 'PROPFIND dav'
+        ]
+        self.assertEqual(len(spans), 1)
+        self.assertGreaterEqual(spans[0]['args']['pool_wait_ms'], 150)
+        self.assertLess(spans[0]['args']['connect_ms'], 150)
+
+    def test_disable_tracing(self):
+        self.tracer.clear()
+        self.client.set_tracer(None)
+        self.client.file_info(self.test_root)
+        self.assertEqual(self.tracer.to_chrome_trace()['traceEvents'], [])
+
+    def tearDown(self):
+        self.client.delete(self.test_root)
+        self.client.logout()
+        shutil.rmtree(self.temp_dir)
+
+class TestLogging(unittest.TestCase):
+
+    class RecordingHandler(logging.Handler):
+
+        def __init__(self):
+            logging.Handler.__init__(self)
+            self.messages = []
+
+        def emit(self, record):
+            self.messages.append((record.name, record.getMessage()))
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='pyocclient_test')
+        self.handler = self.RecordingHandler()
+        self.logger = logging.getLogger('owncloud')
+        self.logger.addHandler(self.handler)
+        self.level = self.logger.level
+        self.logger.setLevel(logging.DEBUG)
+        self.client = owncloud.Client(Config['owncloud_url'])
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+        self.test_root = Config['test_root']
+        if not self.test_root[-1] == '/':
+            self.test_root += '/'
+        if not self.test_root[0] == '/':
+            self.test_root = '/' + self.test_root
+        self.client.mkdir(self.test_root)
+
+    def test_subsystem_loggers(self):
+        del self.handler.messages[:]
+        self.client.put_file_contents(self.test_root + 'log.txt', b'log')
+        self.client.get_file(self.test_root + 'log.txt',
+                             os.path.join(self.temp_dir, 'log.txt'))
+        self.client.get_config()
+
+        names = set(name for name, _ in self.handler.messages)
+        self.assertEqual(
+            names,
+            set(['owncloud.dav', 'owncloud.ocs', 'owncloud.transfer'])
+        )
+        self.assertIn(
+            ('owncloud.dav', 'request: PUT ' + self.test_root + 'log.txt'),
+            self.handler.messages
+        )
+
+    def test_credentials_redacted(self):
+        del self.handler.messages[:]
+        self.client.make_ocs_request(
+            'GET',
+            '',
+            'config',
+            headers={'Authorization': 'Basic c2VjcmV0'},
+            data={'password': 'secret'}
+        )
+        logged = ' '.join(message for _, message in self.handler.messages)
+        self.assertNotIn('c2VjcmV0', logged)
+        self.assertNotIn('secret', logged)
+        self.assertIn('<redacted>', logged)
+
+    def tearDown(self):
+        self.client.delete(self.test_root)
+        self.client.logout()
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
+        shutil.rmtree(self.temp_dir)
+
+class TestStandInConditions(unittest.TestCase):
+
+    def setUp(self):
+        self.conditions = Conditions(seed=42)
+        self.server = StandInServer(conditions=self.conditions).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def login(self, **kwargs):
+        client = owncloud.Client(self.server.url, **kwargs)
+        client.login('admin', 'admin')
+        return client
+
+    def test_latency_and_bandwidth(self):
+        """Test that responses are delayed and throttled"""
+        client = self.login()
+        self.assertTrue(client.put_file_contents('/test.txt', b'x' * 10000))
+        self.conditions.latency = 0.05
+        self.conditions.bandwidth = 100000
+        start = time.time()
+        self.assertEqual(client.get_file_contents('/test.txt'), b'x' * 10000)
+        self.assertGreaterEqual(time.time() - start, 0.15)
+
+    def test_error_rate(self):
+        """Test that failed requests are retried"""
+        client = self.login(retry_policy=owncloud.RetryPolicy(
+            max_retries=10, backoff_factor=0, jitter=False
+        ))
+        self.conditions.error_rate = 0.5
+        self.conditions.retry_after = 0
+        for i in range(10):
+            self.assertIsNotNone(client.file_info('/'))
+        self.assertGreater(sum(client.get_retry_stats()['retries'].values()), 0)
+
+        self.conditions.error_rate = 1
+        with self.assertRaises(owncloud.HTTPResponseError) as e:
+            self.login().list('/')
+        self.assertEqual(e.exception.status_code, 503)
+
+
+class TestLoadGenerator(unittest.TestCase):
+
+    def test_run(self):
+        """Test running simulated users through a workload mix"""
+        generator = owncloud.loadgen.LoadGenerator(
+            Config['owncloud_url'],
+            [(Config['owncloud_login'], Config['owncloud_password'])],
+            users=3, operations=10, seed=1,
+            workload={'list': 2, 'get_small': 2, 'put_small': 1, 'chunked_upload': 1},
+            chunked_size=3000, chunk_size=1000,
+            prefix=Config['test_root'].strip('/') + '-load'
+        )
+        report = generator.run()
+        self.assertEqual(report['operations_count'], 30)
+        self.assertEqual(report['error_rate'], 0)
+        self.assertEqual(sum(stats['count'] for stats in report['operations'].values()), 30)
+        for stats in report['operations'].values():
+            self.assertLessEqual(stats['p50'], stats['p99'])
+            self.assertLessEqual(stats['p99'], stats['max'])
+        self.assertIn('PROPFIND dav', report['requests'])
+
+        client = owncloud.Client(Config['owncloud_url'])
+        client.login(Config['owncloud_login'], Config['owncloud_password'])
+        with self.assertRaises(owncloud.HTTPResponseError) as e:
+            client.file_info('/' + Config['test_root'].strip('/') + '-load-0')
+        self.assertEqual(e.exception.status_code, 404)
+        client.logout()
+
+    def test_latency_from_schedule(self):
+        """Test that with a target rate the operations delayed by a slow
+        one report the delay in their latency
+        """
+        def slow_first_listing(event):
+            if event.method == 'PROPFIND' and not listings:
+                listings.append(event)
+                time.sleep(0.3)
+
+        listings = []
+        generator = owncloud.loadgen.LoadGenerator(
+            Config['owncloud_url'],
+            [(Config['owncloud_login'], Config['owncloud_password'])],
+            users=1, operations=6, rate=20, seed=1, workload={'list': 1},
+            prefix=Config['test_root'].strip('/') + '-load',
+            client_options={'event_hooks': [slow_first_listing]}
+        )
+        report = generator.run()
+        stats = report['operations']['list']
+        self.assertEqual(stats['count'], 6)
+        self.assertGreaterEqual(stats['max'], 0.3)
+        # the next operations were scheduled every 50 ms during the slow one
+        self.assertGreaterEqual(stats['p50'], 0.1)
+
+    def test_invalid_workload(self):
+        with self.assertRaises(ValueError):
+            owncloud.loadgen.LoadGenerator(Config['owncloud_url'], [('a', 'b')],
+                                           workload={'unknown': 1})
+
+
+class TestRecordReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_root = '/' + Config['test_root'].strip('/') + '/'
+
     def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def session(self, client):
+        client.login(Config['owncloud_login'], Config['owncloud_password'])
+        client.mkdir(self.test_root)
+        client.put_file_contents(self.test_root + u'文件.txt', b'abc')
+        local_file = os.path.join(self.temp_dir, 'big.bin')
+        with open(local_file, 'wb') as f:
+            f.write(b'x' * 2500)
+        client.put_file(self.test_root + 'big.bin', local_file, chunk_size=1000)
+        names = sorted(f.get_name() for f in client.list(self.test_root))
+        content = client.get_file_contents(self.test_root + u'文件.txt')
+        user = client.get_user(Config['owncloud_login'])
+        client.delete(self.test_root)
+        client.logout()
+        return names, content, user
+
+    def test_replay_arguments(self):
+        """Test that replaying rejects unsupported request arguments"""
+        transport = owncloud.replay.ReplayTransport(owncloud.replay.Recording())
+        with self.assertRaises(TypeError) as e:
+            transport.request('GET', 'http://localhost/', allow_redirects=False)
+        self.assertIn('"allow_redirects"', str(e.exception))
+
+    def test_record_and_replay(self):
+        """Test replaying a recorded session without server"""
+        recording = owncloud.replay.Recording()
+        client = owncloud.Client(Config['owncloud_url'], recording=recording)
+        recorded = self.session(client)
+        self.assertEqual(recorded[0], ['big.bin', u'文件.txt'])
+
+        path = os.path.join(self.temp_dir, 'session.ocrec')
+        recording.save(path)
+        with open(path, 'rb') as f:
+            saved = f.read()
+        saved = gzip.GzipFile(fileobj=six.BytesIO(saved)).read()
+        credentials = owncloud.Client._get_basic_auth_header(
+            Config['owncloud_login'], Config['owncloud_password']
+        ).split(' ')[1]
+        self.assertNotIn(credentials.encode('ascii'), saved)
+
+        loaded = owncloud.replay.Recording.load(path)
+        self.assertEqual(len(loaded), len(recording))
+        replay = owncloud.replay.ReplayTransport(loaded)
+        # no request reaches the network
+        url = 'http://replay.invalid' + six.moves.urllib.parse.urlsplit(Config['owncloud_url']).path
+        client = owncloud.Client(url, transport=replay)
+        self.assertEqual(self.session(client), recorded)
+
+        client = owncloud.Client(Config['owncloud_url'], transport=replay)
+        client.login(Config['owncloud_login'], Config['owncloud_password'])
+        with self.assertRaises(LookupError):
+            client.list('/not-recorded')
+
+
+class TestThreadSafety(unittest.TestCase):
+
+    THREADS = 8
+
+    def setUp(self):
+        self.test_root = '/' + Config['test_root'].strip('/') + '/'
+        self.capabilities_requests = []
+        self.client = owncloud.Client(
+            Config['owncloud_url'], lazy_login=True, reuse_session=True,
+            pool_maxsize=4, pool_block=True,
+            event_hooks=[self.count_capabilities]
+        )
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+
+    def tearDown(self):
+        self.client.delete(self.test_root)
+        self.client.logout()
+
+    def count_capabilities(self, event):
+        if event.url.endswith('/capabilities'):
+            self.capabilities_requests.append(event)
+
+    def run_threads(self, target):
+        errors = []
+
+        def run(index):
+            try:
+                target(index)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(index,))
+                   for index in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def test_shared_client(self):
+        """Test using one client from several threads at the same time"""
+        other = owncloud.Client(Config['owncloud_url'])
+        other.login(Config['owncloud_login'], Config['owncloud_password'])
+        other.mkdir(self.test_root)
+        other.logout()
+        results = {}
+
+        def work(index):
+            # the first requests of all threads race for the DAV URL
+            path = self.test_root + 'thread%i/' % index
+            self.client.mkdir(path)
+            for count in range(10):
+                data = ('%i-%i' % (index, count)).encode('ascii')
+                self.client.put_file_contents(path + 'file%i.txt' % count, data)
+                self.assertEqual(self.client.get_file_contents(path + 'file%i.txt' % count), data)
+            names = sorted(f.get_name() for f in self.client.list(path))
+            user = self.client.get_user(Config['owncloud_login'])
+            results[index] = (names, user['enabled'], self.client.get_version())
+
+        self.run_threads(work)
+
+        expected_names = sorted('file%i.txt' % count for count in range(10))
+        self.assertEqual(len(results), self.THREADS)
+        for names, enabled, version in results.values():
+            self.assertEqual(names, expected_names)
+            self.assertEqual(version, self.client.get_version())
+        self.assertEqual(len(self.capabilities_requests), 1)
+        stats = self.client.get_pool_stats()
+        self.assertLessEqual(stats['connections_created'], 4)
+
+    def test_shared_lazy_init(self):
+        """Test that racing threads fetch the capabilities only once"""
+        versions = []
+        self.run_threads(lambda index: versions.append(self.client.get_version()))
+        self.assertEqual(len(set(versions)), 1)
+        self.assertEqual(len(self.capabilities_requests), 1)
+        self.client.mkdir(self.test_root)
+
+
+class TestPickleAndFork(unittest.TestCase):
+
+    def setUp(self):
+        self.test_root = '/' + Config['test_root'].strip('/') + '/'
+        self.client = owncloud.Client(Config['owncloud_url'], reuse_session=True)
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+        self.client.mkdir(self.test_root)
+        self.client.put_file_contents(self.test_root + 'test.txt', b'hello')
+
+    def tearDown(self):
+        self.client.delete(self.test_root)
         self.client.logout()
 
+    def test_pickle(self):
+        """Test that an unpickled client neither logs in nor fetches the
+        capabilities again"""
+        self.client.add_event_hook(lambda event: None)
+        copy = pickle.loads(pickle.dumps(self.client))
+        events = []
+        copy.add_event_hook(events.append)
+        self.assertEqual(copy.get_file_contents(self.test_root + 'test.txt'), b'hello')
+        self.assertEqual(copy.get_version(), self.client.get_version())
+        self.assertEqual([event.method for event in events], ['GET'])
+        # the session cookies were pickled too
+        self.assertTrue(copy._transport.has_cookies())
+        self.assertEqual(copy.get_pool_stats()['connections_created'], 1)
+        copy.logout()
+        # the original client still works
+        self.assertEqual(self.client.get_file_contents(self.test_root + 'test.txt'), b'hello')
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork()')
+    def test_fork(self):
+        """Test that a forked process opens its own connections"""
+        self.assertEqual(self.client.get_pool_stats()['connections_created'], 1)
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(read_fd)
+                content = self.client.get_file_contents(self.test_root + 'test.txt')
+                stats = self.client.get_pool_stats()
+                result = {
+                    'content': content.decode('ascii'),
+                    'requests': stats['requests'],
+                    'connections': stats['connections_created']
+                }
+                os.write(write_fd, json.dumps(result).encode('ascii'))
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as f:
+            output = f.read()
+        os.waitpid(pid, 0)
+        result = json.loads(output.decode('ascii'))
+        self.assertEqual(result, {'content': 'hello', 'requests': 1, 'connections': 1})
+        # the connection of the parent was not used by the child
+        self.assertEqual(self.client.get_file_contents(self.test_root + 'test.txt'), b'hello')
+        self.assertEqual(self.client.get_pool_stats()['connections_created'], 1)
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.test_root = '/' + Config['test_root'].strip('/') + '/'
+        self.client = owncloud.Client(Config['owncloud_url'])
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+        self.client.mkdir(self.test_root)
+
+    def tearDown(self):
+        self.client.delete(self.test_root)
+        self.client.logout()
+
+    def list_names(self, path):
+        return sorted(f.get_name() for f in self.client.list(path))
+
+    @data_provider(lambda: ((8,), (1,)))
+    def test_batch(self, max_workers):
+        """Test running dependent operations in a batch"""
+        root = self.test_root + 'workers%i/' % max_workers
+        self.client.mkdir(root)
+        for index in range(10):
+            self.client.put_file_contents(root + 'file%i.txt' % index, b'x')
+
+        with self.client.batch(max_workers=max_workers) as batch:
+            batch.mkdir(root + 'a')
+            batch.mkdir(root + 'a/b')
+            batch.mkdir(root + 'a/b/c')
+            for index in range(5):
+                batch.move(root + 'file%i.txt' % index,
+                           root + 'a/b/c/file%i.txt' % index)
+            for index in range(5, 10):
+                batch.copy(root + 'file9.txt',
+                           root + 'a/copy%i.txt' % index)
+            # chain of moves depending on each other
+            batch.move(root + 'a/b/c/file0.txt', root + 'a/moved.txt')
+            batch.move(root + 'a/moved.txt', root + 'a/b/moved.txt')
+            batch.delete(root + 'file8.txt')
+        report = batch.report
+
+        self.assertTrue(report.is_successful())
+        self.assertEqual(len(report.operations), 16)
+        self.assertEqual(len(batch), 0)
+        self.assertTrue(all(op.result for op in report.operations))
+        self.assertEqual(self.list_names(root + 'a/b/c'), ['file%i.txt' % index for index in range(1, 5)])
+        self.assertEqual(self.list_names(root + 'a/b'), ['c', 'moved.txt'])
+        self.assertEqual(self.list_names(root + 'a'), ['b'] + ['copy%i.txt' % index for index in range(5, 10)])
+        self.assertEqual(self.list_names(root), ['a', 'file5.txt', 'file6.txt', 'file7.txt', 'file9.txt'])
+
+    def test_errors(self):
+        """Test that operations depending on a failed one are skipped"""
+        batch = self.client.batch()
+        failed = batch.mkdir(self.test_root + 'missing/a')
+        skipped = batch.mkdir(self.test_root + 'missing/a/b')
+        succeeded = batch.mkdir(self.test_root + 'other')
+        report = batch.execute()
+
+        self.assertFalse(report.is_successful())
+        self.assertEqual(report.get_failed(), [failed])
+        self.assertEqual(report.get_skipped(), [skipped])
+        self.assertEqual(report.get_succeeded(), [succeeded])
+        self.assertIsInstance(failed.error, owncloud.HTTPResponseError)
+        self.assertIs(skipped.dependency, failed)
+        self.assertIsNone(skipped.error)
+        self.assertEqual(self.list_names(self.test_root), ['other'])
+
+    def test_stop_on_error(self):
+        """Test skipping the remaining operations after an error"""
+        batch = self.client.batch(max_workers=1, stop_on_error=True)
+        batch.delete(self.test_root + 'missing')
+        batch.mkdir(self.test_root + 'a')
+        report = batch.execute()
+        self.assertEqual([op.status for op in report.operations], ['failed', 'skipped'])
+        self.assertEqual(self.list_names(self.test_root), [])
+
+
 class TestPublicFolder(unittest.TestCase):
 
     def get_dav_endpoint_version(self):
@@ -1557,5 +2713,308 @@ class TestPublicFolder(unittest.TestCase):
         self.assertIsNotNone(file_info)
         self.assertEqual(file_info.get_size(), 2 * 1024)
 
+class TestTransports(unittest.TestCase):
+
+    def transports():
+        transports = [['requests']]
+        try:
+            owncloud.HTTP2Transport()
+            transports.append(['http2'])
+        except ImportError:
+            pass
+        return transports
+
+    def setUp(self):
+        self.test_root = '/' + Config['test_root'].strip('/') + '/'
+        self.temp_dir = tempfile.mkdtemp(dir=os.getcwd())
+
+    def login(self, transport):
+        self.client = owncloud.Client(Config['owncloud_url'], transport=transport)
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+
+    def tearDown(self):
+        self.client.delete(self.test_root)
+        self.client.logout()
+        shutil.rmtree(self.temp_dir)
+
+    @data_provider(transports)
+    def test_file_access_and_ocs(self, transport):
+        """Test uploads, downloads and OCS requests with the given transport"""
+        self.login(transport)
+        self.assertEqual(self.client._transport.name, transport)
+        self.assertTrue(self.client.mkdir(self.test_root))
+
+        local_file = os.path.join(self.temp_dir, 'upload.dat')
+        with open(local_file, 'wb') as f:
+            f.write(b'0123456789' * 1000)
+        self.assertTrue(self.client.put_file(self.test_root, local_file, chunked=False))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'test.txt', b'abc'))
+
+        self.assertEqual(self.client.file_info(self.test_root + 'upload.dat').get_size(), 10000)
+        self.assertEqual(self.client.get_file_contents(self.test_root + 'test.txt'), b'abc')
+        download = os.path.join(self.temp_dir, 'download.dat')
+        self.assertTrue(self.client.get_file(self.test_root + 'upload.dat', download))
+        with open(download, 'rb') as f:
+            self.assertEqual(f.read(), b'0123456789' * 1000)
+
+        self.assertIsNotNone(self.client.get_config())
+        self.assertGreater(self.client.get_pool_stats()['requests'], 0)
+
+
+class TestXMLBackends(unittest.TestCase):
+
+    def backends():
+        backends = [['etree']]
+        try:
+            owncloud.LxmlBackend()
+            backends.append(['lxml'])
+        except ImportError:
+            pass
+        return backends
+
+    def setUp(self):
+        self.test_root = '/' + Config['test_root'].strip('/') + '/'
+
+    def login(self, backend):
+        self.client = owncloud.Client(Config['owncloud_url'], xml_backend=backend)
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+
+    def logout(self):
+        # the data provider runs every backend within the same test
+        self.client.delete(self.test_root)
+        self.client.logout()
+
+    @data_provider(backends)
+    def test_listing_and_ocs(self, backend):
+        """Test DAV and OCS parsing with the given backend"""
+        self.login(backend)
+        self.assertEqual(self.client._xml.name, backend)
+        self.assertTrue(self.client.mkdir(self.test_root))
+        self.assertTrue(self.client.put_file_contents(self.test_root + u'文件.txt', b'abc'))
+        listing = self.client.list(self.test_root)
+        self.assertEqual(len(listing), 1)
+        self.assertEqual(listing[0].get_name(), u'文件.txt')
+        self.assertEqual(listing[0].get_size(), 3)
+        self.assertIsNotNone(self.client.get_config())
+        share_info = self.client.share_file_with_link(self.test_root + u'文件.txt')
+        self.assertTrue(type(share_info.get_id()) is int)
+        self.assertIsNotNone(share_info.get_token())
+
+        with self.assertRaises(owncloud.OCSResponseError) as e:
+            self.client.make_ocs_request('GET', '', 'config', accepted_codes=[102])
+        self.assertEqual(e.exception.status_code, 100)
+
+        self.logout()
+
+    def test_default_backend(self):
+        """Test that ElementTree is used unless another backend is chosen"""
+        self.assertEqual(owncloud.Client(Config['owncloud_url'])._xml.name, 'etree')
+        client = owncloud.Client(Config['owncloud_url'], xml_backend='auto')
+        self.assertIn(client._xml.name, ['etree', 'lxml'])
+
+
+class TestRemoteIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.client = owncloud.Client(Config['owncloud_url'])
+        self.client.login(Config['owncloud_login'], Config['owncloud_password'])
+        self.test_root = '/' + Config['test_root'].strip('/') + '/'
+        self.client.mkdir(self.test_root)
+        self.index = owncloud.indexer.RemoteIndex(self.client, root=self.test_root)
+
+    def tearDown(self):
+        self.index.close()
+        self.client.delete(self.test_root)
+        self.client.logout()
+
+    def test_refresh_and_query(self):
+        """Test indexing a tree and querying it locally"""
+        self.assertTrue(self.client.mkdir(self.test_root + 'subdir'))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'small.txt', b'x'))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'subdir/big.dat', b'x' * 4096))
+
+        stats = self.index.refresh()
+        self.assertEqual(stats['listed'], 2)
+        self.assertEqual(stats['added'], 4)
+
+        big = self.index.query(min_size=1024, file_type='file')
+        self.assertEqual(len(big), 1)
+        self.assertEqual(big[0].get_name(), 'big.dat')
+        self.assertEqual(big[0].get_size(), 4096)
+        self.assertIsNotNone(big[0].get_etag())
+
+        files = self.index.query(prefix=self.test_root + 'subdir', file_type='file')
+        self.assertEqual([f.get_name() for f in files], ['big.dat'])
+        self.assertEqual(self.index.count(glob='*.txt'), 1)
+        self.assertTrue(self.index.get(self.test_root + 'subdir').is_dir())
+
+    def test_incremental_refresh(self):
+        """Test that unchanged subtrees are not listed again"""
+        self.assertTrue(self.client.mkdir(self.test_root + 'unchanged'))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'unchanged/a.txt', b'a'))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'b.txt', b'b'))
+        self.index.refresh()
+
+        stats = self.index.refresh()
+        self.assertEqual(stats['listed'], 0)
+
+        self.assertTrue(self.client.delete(self.test_root + 'b.txt'))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'c.txt', b'c'))
+        stats = self.index.refresh()
+        self.assertEqual(stats['listed'], 1)
+        self.assertEqual(stats['removed'], 1)
+        self.assertIsNone(self.index.get(self.test_root + 'b.txt'))
+        self.assertIsNotNone(self.index.get(self.test_root + 'c.txt'))
+
+    def test_refresh_replaced_and_deleted(self):
+        """Test refreshing directories replaced by files or deleted"""
+        self.assertTrue(self.client.mkdir(self.test_root + 'replaced'))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'replaced/a.txt', b'a'))
+        self.assertTrue(self.client.mkdir(self.test_root + 'deleted'))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'deleted/b.txt', b'b'))
+        self.index.refresh()
+        self.assertEqual(self.index.count(), 5)
+
+        self.assertTrue(self.client.delete(self.test_root + 'replaced'))
+        self.assertTrue(self.client.put_file_contents(self.test_root + 'replaced', b'c'))
+        stats = self.index.refresh()
+        self.assertEqual(stats['removed'], 1)
+        self.assertIsNone(self.index.get(self.test_root + 'replaced/a.txt'))
+        self.assertFalse(self.index.get(self.test_root + 'replaced').is_dir())
+
+        self.assertTrue(self.client.delete(self.test_root + 'deleted'))
+        stats = self.index.refresh(self.test_root + 'deleted')
+        self.assertEqual(stats['removed'], 2)
+        self.assertEqual(self.index.count(), 2)
+
+
+@unittest.skipIf(asyncio is None or owncloud.aio.aiohttp is None,
+                 "asyncio client requires Python 3 and aiohttp")
+class TestAsyncClient(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.client = owncloud.aio.AsyncClient(Config['owncloud_url'])
+        self.run_async(self.client.login(Config['owncloud_login'], Config['owncloud_password']))
+        self.test_root = '/' + Config['test_root'].strip('/') + '/'
+        self.assertTrue(self.run_async(self.client.mkdir(self.test_root)))
+
+    def tearDown(self):
+        self.run_async(self.client.delete(self.test_root))
+        self.run_async(self.client.logout())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def run_async(self, *coroutines):
+        if len(coroutines) == 1:
+            return self.loop.run_until_complete(coroutines[0])
+        return self.loop.run_until_complete(asyncio.gather(*coroutines))
+
+    def test_concurrent_file_access(self):
+        """Test concurrent uploads, listing and downloads"""
+        names = ['file%i.txt' % i for i in range(10)]
+        results = self.run_async(*[
+            self.client.put_file_contents(self.test_root + name, name.encode('utf-8'))
+            for name in names
+        ])
+        self.assertEqual(results, [True] * len(names))
+
+        listing = self.run_async(self.client.list(self.test_root))
+        self.assertEqual(sorted(f.get_name() for f in listing), names)
+
+        contents = self.run_async(*[
+            self.client.get_file_contents(self.test_root + name) for name in names
+        ])
+        self.assertEqual(contents, [name.encode('utf-8') for name in names])
+
+        infos = self.run_async(self.client.file_info_many(
+            [self.test_root + name for name in names] + [self.test_root + 'missing']
+        ))
+        self.assertEqual(infos[self.test_root + 'file3.txt'].get_size(), 9)
+        self.assertIsNone(infos[self.test_root + 'missing'])
+
+        with self.assertRaises(owncloud.HTTPResponseError) as e:
+            self.run_async(self.client.file_info(self.test_root + 'missing'))
+        self.assertEqual(e.exception.status_code, 404)
+
+    def test_put_directory(self):
+        """Test that uploading a directory opens at most as many files as
+        the connection pool has connections
+        """
+        client = owncloud.aio.AsyncClient(Config['owncloud_url'], pool_maxsize=2)
+        self.run_async(client.login(Config['owncloud_login'], Config['owncloud_password']))
+        local_dir = tempfile.mkdtemp()
+        try:
+            upload_dir = os.path.join(local_dir, 'upload')
+            os.mkdir(upload_dir)
+            names = ['file%i.txt' % i for i in range(10)]
+            for name in names:
+                with open(os.path.join(upload_dir, name), 'wb') as f:
+                    f.write(name.encode('utf-8'))
+
+            put_file = client.put_file
+            active = []
+            peak = []
+
+            async def counting_put_file(*args, **kwargs):
+                active.append(None)
+                peak.append(len(active))
+                try:
+                    return await put_file(*args, **kwargs)
+                finally:
+                    active.pop()
+
+            client.put_file = counting_put_file
+            self.assertTrue(self.run_async(client.put_directory(self.test_root, upload_dir)))
+            self.assertEqual(max(peak), 2)
+            listing = self.run_async(client.list(self.test_root + 'upload/'))
+            self.assertEqual(sorted(f.get_name() for f in listing), names)
+        finally:
+            shutil.rmtree(local_dir)
+            self.run_async(client.logout())
+
+    def test_share_and_capabilities(self):
+        """Test OCS requests"""
+        self.assertIsNotNone(self.run_async(self.client.get_version()))
+        self.assertIn('core', self.run_async(self.client.get_capabilities()))
+        share_info = self.run_async(self.client.share_file_with_link(self.test_root))
+        self.assertIsInstance(share_info, owncloud.ShareInfo)
+        self.assertTrue(self.run_async(self.client.is_shared(self.test_root)))
+        self.assertEqual(self.run_async(self.client.get_share(share_info.get_id())).get_id(),
+                         share_info.get_id())
+        self.run_async(self.client.delete_share(share_info.get_id()))
+
+    def test_apps_and_attributes(self):
+        """Test the app and private data requests built by Client"""
+        app_name = Config['app_name']
+        self.assertTrue(self.run_async(self.client.set_attribute(app_name, 'attr1', 'value1')))
+        self.assertEqual(self.run_async(self.client.get_attribute(app_name, 'attr1')), 'value1')
+        self.assertEqual(self.run_async(self.client.get_attribute(app_name)), [('attr1', 'value1')])
+        self.assertTrue(self.run_async(self.client.delete_attribute(app_name, 'attr1')))
+        self.assertIsNone(self.run_async(self.client.get_attribute(app_name, 'attr1')))
+
+        self.assertTrue(self.run_async(self.client.enable_app('activity')))
+        self.assertTrue(self.run_async(self.client.get_apps())['activity'])
+        self.assertTrue(self.run_async(self.client.disable_app('activity')))
+
+    def test_async_surface(self):
+        """Test that only the asynchronous methods are offered"""
+        self.assertFalse(hasattr(self.client, 'get_config'))
+        self.assertFalse(hasattr(self.client, 'add_event_hook'))
+        with self.assertRaises(TypeError) as e:
+            owncloud.aio.AsyncClient(Config['owncloud_url'], tracer=None)
+        self.assertIn('tracer', str(e.exception))
+
+    def test_no_deprecation_warnings(self):
+        """Test that requests are authenticated without deprecated APIs"""
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertTrue(self.run_async(self.client.file_info(self.test_root)).is_dir())
+        self.assertEqual(
+            [w for w in caught if issubclass(w.category, DeprecationWarning)], []
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
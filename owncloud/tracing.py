@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# vim: expandtab shiftwidth=4 softtabstop=4
+#
+"""Request tracing
+
+Records the requests of a client and its internal stages, like reading
+and uploading chunks or parsing responses, as spans with the thread they
+ran in, and exports them in the Chrome trace event format which Perfetto
+(https://ui.perfetto.dev) and chrome://tracing display as a timeline::
+
+    tracer = Tracer()
+    oc = owncloud.Client(url, tracer=tracer)
+    ...
+    tracer.export('trace.json')
+"""
+
+import json
+import os
+import threading
+
+from .owncloud import _clock
+
+
+class Span(object):
+    """Context manager recording a span with its tracer when exited"""
+
+    def __init__(self, tracer, name, category, args=None):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args or {}
+        self.start = None
+
+    def __enter__(self):
+        self.start = _clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.add_span(self.name, self.category, self.start,
+                             _clock() - self.start, self.args)
+        return False
+
+    def set(self, **args):
+        """Adds arguments to the span, shown with it in the timeline"""
+        self.args.update(args)
+
+
+class Tracer(object):
+    """Collects spans and exports them as Chrome trace
+
+    Pass it to :class:`owncloud.Client` with the ``tracer`` argument, which
+    also registers it as event hook recording a span for every request.
+    Instances are thread safe and can be shared by several clients.
+    """
+
+    def __init__(self, max_spans=100000):
+        """Instantiates a tracer
+
+        :param max_spans: maximum number of spans kept, further spans are
+            dropped and counted in :attr:`dropped`, defaults to 100000
+        """
+        self.max_spans = max_spans
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._spans = []
+        self._threads = {}
+        self._origin = _clock()
+
+    def span(self, name, category='client', args=None):
+        """Returns a context manager recording a span
+
+        :param name: name of the span
+        :param category: category of the span
+        :param args: dictionary of arguments shown with the span
+        :returns: :class:`Span` instance
+        """
+        return Span(self, name, category, args)
+
+    def add_span(self, name, category, start, duration, args=None):
+        """Records a span of the current thread
+
+        :param name: name of the span
+        :param category: category of the span
+        :param start: start time, a ``time.perf_counter()`` value
+        :param duration: duration in seconds
+        :param args: dictionary of arguments shown with the span
+        """
+        thread = threading.current_thread()
+        with self._lock:
+            if len(self._spans) >= self.max_spans:
+                self.dropped += 1
+                return
+            self._threads[thread.ident] = thread.name
+            self._spans.append(
+                (name, category, start, duration, thread.ident, args)
+            )
+
+    def __call__(self, event):
+        """Records the span of a request
+
+        :param event: :class:`owncloud.RequestEvent` instance
+        """
+        args = {
+            'url': event.url,
+            'status': event.status_code,
+            'retries': event.retries,
+            'bytes_sent': event.bytes_sent,
+            'bytes_received': event.bytes_received
+        }
+        for timing in ('pool_wait', 'connect', 'ttfb'):
+            if timing in event.timings:
+                args[timing + '_ms'] = event.timings[timing] * 1000
+        if event.error is not None:
+            args['error'] = type(event.error).__name__
+        self.add_span(event.operation, 'http', event.start,
+                      event.timings.get('total', 0.0), args)
+
+    def clear(self):
+        """Discards all recorded spans"""
+        with self._lock:
+            self._spans = []
+            self._threads = {}
+            self.dropped = 0
+
+    def to_chrome_trace(self):
+        """Returns the recorded spans in the Chrome trace event format
+
+        :returns: dictionary which serializes to a trace file
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self._spans)
+            threads = dict(self._threads)
+
+        events = []
+        for thread_id, thread_name in sorted(threads.items()):
+            events.append({
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': pid,
+                'tid': thread_id,
+                'args': {'name': thread_name}
+            })
+        for name, category, start, duration, thread_id, args in spans:
+            events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': (start - self._origin) * 1000000,
+                'dur': duration * 1000000,
+                'pid': pid,
+                'tid': thread_id,
+                'args': args or {}
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        """Writes the recorded spans to a Chrome trace file
+
+        :param path: path of the file to write
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)